@@ -0,0 +1,180 @@
+"""
+Benchmarks AuthClient.authorize_user offline. RS256 and RS512 keys are
+generated locally and served from the stub JWKS endpoint of the tests.
+Run from the repository root with:
+
+    python -m benchmarks.auth --requests 2000 --threads 8
+
+"verify" runs use distinct cookies with the verified-token cache
+turned off, so every authorization verifies both signatures. "cached"
+runs repeat the same cookies, so all but the first are cache hits.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import jwt
+
+from benchmarks.util import set_default_environment
+from tests.util import generate_rsa_key_pairs, public_jwk, serve_jwks
+
+
+ALGORITHMS = ["RS256", "RS512"]
+
+
+class SigningKey(NamedTuple):
+    kid: str
+    algorithm: str
+    private_key: bytes
+    public_key: bytes
+
+
+class Result(NamedTuple):
+    name: str
+    wall_seconds: float
+    latencies: list[float]
+
+    @property
+    def per_second(self) -> float:
+        return len(self.latencies) / self.wall_seconds
+
+    def percentile(self, percent: int) -> float:
+        return statistics.quantiles(self.latencies, n=100)[percent - 1]
+
+
+def generate_signing_keys(key_size: int) -> list[SigningKey]:
+    return [
+        SigningKey(
+            algorithm.lower(), algorithm, *generate_rsa_key_pairs(key_size)
+        )
+        for algorithm in ALGORITHMS
+    ]
+
+
+def _jwks(keys: list[SigningKey]) -> dict:
+    return {
+        "keys": [
+            public_jwk(key.public_key, key.kid, key.algorithm) for key in keys
+        ]
+    }
+
+
+def mint_cookies(key: SigningKey, user_number: int) -> tuple[str, str]:
+    expires = time.time() + 3600
+    user_id = f"0000-0000-0000-{user_number:04d}"
+    authorization = {
+        "aud": ["no.ssb.fdb", "datastore"],
+        "exp": expires,
+        "accreditation/role": "role/dataadministrator",
+        "sub": f"user{user_number}",
+        "user/uuid": user_id,
+    }
+    user_info = {
+        "aud": ["rose"],
+        "exp": expires,
+        "sub": f"user{user_number}",
+        "user/uuid": user_id,
+        "user/firstName": "Bench",
+        "user/lastName": f"Marksen{user_number}",
+    }
+    headers = {"kid": key.kid}
+    return (
+        jwt.encode(
+            authorization, key.private_key, key.algorithm, headers=headers
+        ),
+        jwt.encode(user_info, key.private_key, key.algorithm, headers=headers),
+    )
+
+
+def _run(
+    name: str, authorize, cookies: list[tuple[str, str]], threads: int
+) -> Result:
+    def timed(cookie_pair: tuple[str, str]) -> float:
+        start = time.perf_counter()
+        authorize(*cookie_pair)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if threads == 1:
+        latencies = [timed(cookie_pair) for cookie_pair in cookies]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies = list(executor.map(timed, cookies))
+    return Result(name, time.perf_counter() - start, latencies)
+
+
+def _parse_arguments(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark AuthClient.authorize_user offline"
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--key-size", type=int, default=2048)
+    return parser.parse_args(argv)
+
+
+def print_results(results: list[Result]) -> None:
+    header = f"{'benchmark':<28} {'auth/s':>10} {'p50 ms':>8} {'p99 ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result.name:<28} {result.per_second:>10.1f} "
+            f"{result.percentile(50) * 1000:>8.3f} "
+            f"{result.percentile(99) * 1000:>8.3f}"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    arguments = _parse_arguments(sys.argv[1:] if argv is None else argv)
+    keys = generate_signing_keys(arguments.key_size)
+    with serve_jwks(_jwks(keys)) as (jwks_url, _):
+        set_default_environment(JWKS_URL=jwks_url, JWT_AUTH="true")
+        # Imported here as job_service reads its configuration on import
+        from job_service.adapter.auth import AuthClient, VerifiedTokenCache
+
+        client = AuthClient()
+        results = []
+        for key in keys:
+            distinct = [
+                mint_cookies(key, number)
+                for number in range(arguments.requests)
+            ]
+            repeated = [distinct[0]] * arguments.requests
+            # Loads the signing keys outside of the measurements
+            client.authorize_user(*distinct[0])
+            for threads in sorted({1, arguments.threads}):
+                suffix = f", {threads} threads" if threads > 1 else ""
+                client.token_cache = VerifiedTokenCache(0)
+                results.append(
+                    _run(
+                        f"{key.algorithm} verify{suffix}",
+                        client.authorize_user,
+                        distinct,
+                        threads,
+                    )
+                )
+                client.token_cache = VerifiedTokenCache(1024)
+                results.append(
+                    _run(
+                        f"{key.algorithm} cached{suffix}",
+                        client.authorize_user,
+                        repeated,
+                        threads,
+                    )
+                )
+        print_results(results)
+        stats = client.signing_key_stats()
+        print(
+            f"Signing keys: {stats.requests} requests, "
+            f"{stats.fetches} JWKS fetches, "
+            f"{stats.cache_hits} cache hits"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Benchmarks listing the importable datasets in a synthetic input
+directory. Run from the repository root with:
+
+    python -m benchmarks.importable_datasets --datasets 2000
+
+Cold scans probe every tar file, restart scans read the probe results
+from the database catalogue, and warm scans are served by the
+in-memory index. The endpoint benchmark is a warm scan through the
+ASGI test client, including serialization of the response. Checksums
+are not computed, since hashing the files in the background would be
+measured along with the scans.
+"""
+
+import argparse
+import io
+import logging
+import os
+import random
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from benchmarks.util import (
+    Measurement,
+    measure,
+    print_measurements,
+    set_default_environment,
+)
+
+
+# Old enough that none of the files are treated as uploads in progress
+_MTIME_AGE_SECONDS = 3600
+
+
+def _add_member(tar: tarfile.TarFile, name: str, content: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    tar.addfile(info, io.BytesIO(content))
+
+
+def _write_dataset(
+    path: Path, dataset_name: str, members: int, member_size: int
+) -> None:
+    with tarfile.open(path, "w") as tar:
+        _add_member(
+            tar,
+            f"{dataset_name}.json",
+            b'{"dataStore": "benchmark"}',
+        )
+        chunks_dir = tarfile.TarInfo("chunks")
+        chunks_dir.type = tarfile.DIRTYPE
+        tar.addfile(chunks_dir)
+        for number in range(members):
+            _add_member(
+                tar,
+                f"chunks/{number}.csv.encr",
+                os.urandom(member_size),
+            )
+
+
+def create_input_directory(
+    input_dir: Path,
+    datasets: int,
+    members: int,
+    member_size: int,
+    corrupt_ratio: float,
+    archived_ratio: float,
+    seed: int = 0,
+) -> None:
+    """
+    Fills input_dir with tar files named DATASET_0, DATASET_1, ...
+    A share of them are corrupt, and a share are put in the archive
+    directory.
+    """
+    randomizer = random.Random(seed)
+    archive_dir = input_dir / "archive"
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    mtime = time.time() - _MTIME_AGE_SECONDS
+    for number in range(datasets):
+        dataset_name = f"DATASET_{number}"
+        is_archived = randomizer.random() < archived_ratio
+        path = (archive_dir if is_archived else input_dir) / (
+            f"{dataset_name}.tar"
+        )
+        if randomizer.random() < corrupt_ratio:
+            path.write_bytes(os.urandom(member_size + 512))
+        else:
+            _write_dataset(path, dataset_name, members, member_size)
+        os.utime(path, (mtime, mtime))
+
+
+def _parse_arguments(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the importable datasets scanner"
+    )
+    parser.add_argument("--datasets", type=int, default=500)
+    parser.add_argument(
+        "--members", type=int, default=20, help="chunks per dataset"
+    )
+    parser.add_argument(
+        "--member-size", type=int, default=4096, help="bytes per chunk"
+    )
+    parser.add_argument("--corrupt-ratio", type=float, default=0.05)
+    parser.add_argument("--archived-ratio", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--input-dir",
+        type=Path,
+        default=None,
+        help="existing directory to scan instead of a synthetic one",
+    )
+    return parser.parse_args(argv)
+
+
+def run(arguments: argparse.Namespace, input_dir: Path) -> list[Measurement]:
+    # Imported here as job_service reads its configuration on import
+    from job_service.adapter.local_storage.checksums import (
+        ChecksumStatus,
+        DatasetChecksum,
+        get_checksum_cache,
+    )
+
+    # Keep the request log lines out of the results
+    logging.disable(logging.INFO)
+
+    checksum_cache = get_checksum_cache()
+
+    def skip_checksum(_path, stat) -> DatasetChecksum:
+        return DatasetChecksum(
+            status=ChecksumStatus.PENDING, size=stat.st_size
+        )
+
+    with mock.patch.object(checksum_cache, "request", skip_checksum):
+        try:
+            return _measure_scans(arguments, input_dir)
+        finally:
+            # Nothing may read the input directory once it is removed
+            checksum_cache.shutdown()
+
+
+def _measure_scans(
+    arguments: argparse.Namespace, input_dir: Path
+) -> list[Measurement]:
+    from fastapi.testclient import TestClient
+
+    from job_service.adapter import db
+    from job_service.adapter.local_storage import input_directory
+    from job_service.adapter.local_storage.checksums import (
+        get_checksum_cache,
+    )
+    from job_service.app import app
+
+    def forget_index():
+        input_directory._DATASET_INDEX.clear()
+        get_checksum_cache().clear()
+
+    def forget_catalogue():
+        forget_index()
+        database_client = db.get_database_client()
+        for dir_path in (
+            input_directory.INPUT_DIR,
+            input_directory.ARCHIVE_DIR,
+        ):
+            paths = [
+                probe.path
+                for probe in database_client.get_dataset_probes(str(dir_path))
+            ]
+            if paths:
+                database_client.delete_dataset_probes(paths)
+
+    datasets = input_directory.get_importable_datasets()
+    count = len(datasets)
+    print(
+        f"{count} datasets in {input_dir}, "
+        f"{sum(1 for d in datasets if d.is_archived)} archived, "
+        f"{sum(1 for d in datasets if not d.has_data)} without data"
+    )
+
+    client = TestClient(app)
+
+    def get_endpoint():
+        response = client.get("/importable-datasets")
+        response.raise_for_status()
+
+    repeat = arguments.repeat
+    return [
+        measure(
+            "cold scan",
+            input_directory.get_importable_datasets,
+            count,
+            repeat,
+            setup=forget_catalogue,
+        ),
+        measure(
+            "restart scan (catalogue)",
+            input_directory.get_importable_datasets,
+            count,
+            repeat,
+            setup=forget_index,
+        ),
+        measure(
+            "warm scan",
+            input_directory.get_importable_datasets,
+            count,
+            repeat,
+        ),
+        measure("GET /importable-datasets", get_endpoint, count, repeat),
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    arguments = _parse_arguments(sys.argv[1:] if argv is None else argv)
+    with tempfile.TemporaryDirectory(prefix="dataset-benchmark-") as tmp:
+        input_dir = arguments.input_dir
+        if input_dir is None:
+            input_dir = Path(tmp) / "input"
+            start = time.perf_counter()
+            create_input_directory(
+                input_dir,
+                arguments.datasets,
+                arguments.members,
+                arguments.member_size,
+                arguments.corrupt_ratio,
+                arguments.archived_ratio,
+            )
+            print(
+                f"Created {arguments.datasets} tar files in "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+        set_default_environment(
+            INPUT_DIR=str(input_dir),
+            SQLITE_URL=str(Path(tmp) / "benchmark.db"),
+            JWT_AUTH="false",
+        )
+        print_measurements(run(arguments, input_dir), unit="datasets")
+
+
+if __name__ == "__main__":
+    main()
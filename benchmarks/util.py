@@ -0,0 +1,91 @@
+import os
+import statistics
+import time
+import tracemalloc
+from typing import Callable, NamedTuple
+
+
+def set_default_environment(**variables: str) -> None:
+    """
+    Sets the environment variables that job_service reads on import.
+    The given variables are always set, the other required ones only if
+    they are missing. Must be called before job_service is imported.
+    """
+    defaults = {
+        "INPUT_DIR": "tests/resources/input_directory",
+        "SQLITE_URL": "benchmark.db",
+        "JWKS_URL": "http://jwks.benchmark",
+        "DOCKER_HOST_NAME": "localhost",
+        "STACK": "benchmark",
+        "COMMIT_ID": "benchmark",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(variables)
+
+
+class Measurement(NamedTuple):
+    name: str
+    seconds: list[float]
+    items: int
+    peak_bytes: int
+
+    @property
+    def median_seconds(self) -> float:
+        return statistics.median(self.seconds)
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.median_seconds if self.median_seconds else 0
+
+    def percentile(self, percent: float) -> float:
+        ordered = sorted(self.seconds)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+
+def measure(
+    name: str,
+    function: Callable[[], object],
+    items: int,
+    repeat: int = 5,
+    setup: Callable[[], object] | None = None,
+) -> Measurement:
+    """
+    Runs function repeat times, calling setup before each run outside
+    of the timing. Peak memory is the largest Python allocation peak
+    of a single run, as reported by tracemalloc.
+    """
+    seconds = []
+    peak_bytes = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            function()
+            seconds.append(time.perf_counter() - start)
+            peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return Measurement(name, seconds, items, peak_bytes)
+
+
+def print_measurements(
+    measurements: list[Measurement], unit: str = "items"
+) -> None:
+    header = (
+        f"{'benchmark':<32} {'median ms':>10} {'max ms':>10} "
+        f"{unit + '/s':>14} {'peak MiB':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for measurement in measurements:
+        print(
+            f"{measurement.name:<32} "
+            f"{measurement.median_seconds * 1000:>10.2f} "
+            f"{max(measurement.seconds) * 1000:>10.2f} "
+            f"{measurement.items_per_second:>14.1f} "
+            f"{measurement.peak_bytes / 2**20:>9.2f}"
+        )
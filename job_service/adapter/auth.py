@@ -1,7 +1,13 @@
+import hashlib
 import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
 
 import jwt
-from jwt import MissingRequiredClaimError, PyJWKClient
+from jwt import MissingRequiredClaimError
 from jwt.exceptions import (
     InvalidSignatureError,
     ExpiredSignatureError,
@@ -9,6 +15,7 @@ from jwt.exceptions import (
     DecodeError,
 )
 
+from job_service.adapter.signing_keys import SigningKeyStats, SigningKeyStore
 from job_service.config import environment
 from job_service.exceptions import AuthError, InternalServerError
 from job_service.adapter.db.models import UserInfo
@@ -21,20 +28,174 @@ USER_LAST_NAME_KEY = "user/lastName"
 USER_ID_KEY = "user/uuid"
 
 
+class TokenCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class _CachedUser(NamedTuple):
+    user_info: UserInfo
+    expires_at: float
+    # Key id of the signing key the tokens were verified with
+    kid: str | None
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of users whose tokens have already been verified,
+    so that repeated requests with the same cookies skip the signature
+    verification. Entries are keyed by a hash of the cookies, and are
+    only returned until the earliest expiry of the tokens, or until the
+    signing key they were verified with is removed from the key set.
+    """
+
+    max_size: int
+    _lock: threading.Lock
+    _entries: OrderedDict[str, _CachedUser]
+    _hits: int
+    _misses: int
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> UserInfo | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.user_info
+
+    def put(
+        self,
+        key: str,
+        user_info: UserInfo,
+        expires_at: float,
+        kid: str | None,
+    ) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = _CachedUser(user_info, expires_at, kid)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> TokenCacheStats:
+        with self._lock:
+            return TokenCacheStats(
+                hits=self._hits, misses=self._misses, size=len(self._entries)
+            )
+
+    def retain_kids(self, kids: set[str | None]) -> None:
+        """
+        Drops the entries verified with keys that are not in kids. A
+        token without a key id is verified with the only key of the key
+        set, so its entries are kept while there is exactly one key.
+        """
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.kid is None:
+                    is_known = len(kids) == 1
+                else:
+                    is_known = entry.kid in kids
+                if not is_known:
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _token_cache_key(authorization_cookie: str, user_info_cookie: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(authorization_cookie.encode())
+    digest.update(b"\0")
+    digest.update(user_info_cookie.encode())
+    return digest.hexdigest()
+
+
+def _earliest_expiry(*decoded_tokens: dict) -> float | None:
+    """
+    Returns the earliest exp claim of the tokens, or None if any of them
+    does not expire, in which case the result is not cached.
+    """
+    expiries = [token.get("exp") for token in decoded_tokens]
+    if any(expiry is None for expiry in expiries):
+        return None
+    return min(float(expiry) for expiry in expiries)
+
+
 class AuthClient:
+    """
+    Verifies the authorization and user info cookies of a request.
+    One instance is shared by all requests, so that the signing keys
+    and verified tokens are shared too.
+    """
+
     valid_aud: str
-    jwks_client: PyJWKClient
+    signing_keys: SigningKeyStore
+    token_cache: VerifiedTokenCache
 
     def __init__(self):
         self.valid_aud = (
             "datastore-qa" if environment.get("STACK") == "qa" else "datastore"
         )
-        self.jwks_client = PyJWKClient(
-            environment.get("JWKS_URL"), lifespan=3000
+        jwks_file = environment.get("JWKS_FILE")
+        self.signing_keys = SigningKeyStore(
+            environment.get("JWKS_URL"),
+            Path(jwks_file) if jwks_file else None,
+            environment.get("JWKS_REFRESH_INTERVAL_SECONDS"),
+        )
+        self.token_cache = VerifiedTokenCache(
+            environment.get("AUTH_TOKEN_CACHE_SIZE")
+        )
+        self.signing_keys.add_reload_listener(self._forget_removed_keys)
+        self.signing_keys.add_reload_listener(self._log_stats)
+
+    def _forget_removed_keys(self, kids: set[str | None]) -> None:
+        self.token_cache.retain_kids(kids)
+
+    def _log_stats(self, _kids: set[str | None]) -> None:
+        """
+        Logs the totals of the token cache and the signing keys each
+        time the keys are loaded, which the refresh thread does every
+        JWKS_REFRESH_INTERVAL_SECONDS.
+        """
+        token_stats = self.token_cache.stats()
+        key_stats = self.signing_keys.stats()
+        logger.info(
+            f"Token cache: {token_stats.hits} hits, "
+            f"{token_stats.misses} misses "
+            f"({token_stats.hit_rate:.1%} hit rate), "
+            f"{token_stats.size} entries. "
+            f"Signing keys: {key_stats.requests} requests, "
+            f"{key_stats.cache_hits} cache hits, "
+            f"{key_stats.fetches} fetches, "
+            f"{key_stats.request_fetches} of them by requests"
         )
 
     def _get_signing_key(self, jwt_token: str):
-        return self.jwks_client.get_signing_key_from_jwt(jwt_token).key
+        kid = jwt.get_unverified_header(jwt_token).get("kid")
+        return self.signing_keys.get_signing_key(kid).key
+
+    def signing_key_stats(self) -> SigningKeyStats:
+        return self.signing_keys.stats()
 
     def authorize_user(
         self, authorization_cookie: str | None, user_info_cookie: str | None
@@ -52,7 +213,12 @@ class AuthClient:
             )
         if user_info_cookie is None:
             raise AuthError("Unauthorized. No user info token was provided")
+        cache_key = _token_cache_key(authorization_cookie, user_info_cookie)
+        cached_user_info = self.token_cache.get(cache_key)
+        if cached_user_info is not None:
+            return cached_user_info
         try:
+            kid = jwt.get_unverified_header(authorization_cookie).get("kid")
             signing_key = self._get_signing_key(authorization_cookie)
             decoded_authorization = jwt.decode(
                 authorization_cookie,
@@ -91,7 +257,7 @@ class AuthClient:
             user_id = decoded_user_info.get(USER_ID_KEY)
             first_name = decoded_user_info.get(USER_FIRST_NAME_KEY)
             last_name = decoded_user_info.get(USER_LAST_NAME_KEY)
-            return UserInfo(
+            user_info = UserInfo(
                 user_id=str(user_id),
                 first_name=str(first_name),
                 last_name=str(last_name),
@@ -111,7 +277,14 @@ class AuthClient:
             raise AuthError(f"Unauthorized: {e}") from e
         except Exception as e:
             raise InternalServerError(f"Internal Server Error {e}") from e
+        expires_at = _earliest_expiry(decoded_authorization, decoded_user_info)
+        if expires_at is not None:
+            self.token_cache.put(cache_key, user_info, expires_at, kid)
+        return user_info
+
+
+_AUTH_CLIENT = AuthClient()
 
 
 def get_auth_client() -> AuthClient:
-    return AuthClient()
+    return _AUTH_CLIENT
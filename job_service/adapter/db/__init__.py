@@ -1,8 +1,15 @@
+from datetime import datetime
 from typing import Protocol
 
 from job_service.adapter.db.sqlite import SqliteDbClient
 from job_service.config import environment
-from job_service.adapter.db.models import Job, JobStatus, Target, Operation
+from job_service.adapter.db.models import (
+    DatasetProbe,
+    Job,
+    JobStatus,
+    Target,
+    Operation,
+)
 
 
 class DatabaseClient(Protocol):
@@ -21,15 +28,47 @@ class DatabaseClient(Protocol):
         status: JobStatus | None,
         description: str | None,
         log: str | None,
+        worker_id: str | None = None,
     ) -> Job: ...
+    def claim_job(
+        self,
+        worker_id: str,
+        operations: list[Operation] | None,
+        lease_seconds: int,
+    ) -> Job | None: ...
+    def heartbeat_job(
+        self, job_id: str, worker_id: str, lease_seconds: int
+    ) -> Job: ...
+    def requeue_expired_jobs(self, max_claims: int) -> list[Job]: ...
     def set_maintenance_status(self, msg: str, paused: bool) -> dict: ...
     def get_latest_maintenance_status(self) -> dict: ...
-    def get_maintenance_history(self) -> list[dict]: ...
+    def get_maintenance_history(
+        self,
+        limit: int | None = None,
+        before: datetime | None = None,
+        after: datetime | None = None,
+    ) -> list[dict]: ...
+    def compact_maintenance_history(self, older_than: datetime) -> int: ...
     def initialize_maintenance(self) -> dict: ...
     def get_targets(self) -> list[Target]: ...
     def update_target(self, job: Job) -> None: ...
     def update_bump_targets(self, job: Job) -> None: ...
+    def get_dataset_probes(self, directory: str) -> list[DatasetProbe]: ...
+    def save_dataset_probes(self, probes: list[DatasetProbe]) -> None: ...
+    def delete_dataset_probes(self, paths: list[str]) -> None: ...
+    def move_dataset_probes(self, moved: dict[str, str]) -> None: ...
+    def save_dataset_checksum(
+        self,
+        path: str,
+        size: int,
+        mtime_ns: int,
+        sha256: str,
+        computed_at: datetime,
+    ) -> None: ...
 
 
 def get_database_client() -> DatabaseClient:
-    return SqliteDbClient(environment.get("SQLITE_URL"))
+    return SqliteDbClient(
+        environment.get("SQLITE_URL"),
+        environment.get("OPERATION_CONCURRENCY_LIMITS"),
+    )
@@ -35,6 +35,25 @@ class Operation(StrEnum):
     DELETE_ARCHIVE = "DELETE_ARCHIVE"
 
 
+# Higher values are picked first from the job queue. Small metadata
+# operations take seconds and should not wait behind large imports.
+DEFAULT_OPERATION_PRIORITY = {
+    Operation.SET_STATUS: 20,
+    Operation.PATCH_METADATA: 20,
+    Operation.DELETE_DRAFT: 20,
+    Operation.REMOVE: 20,
+    Operation.ROLLBACK_REMOVE: 20,
+    Operation.ADD: 10,
+    Operation.CHANGE: 10,
+    Operation.BUMP: 10,
+    Operation.DELETE_ARCHIVE: 10,
+}
+
+# A queued job gains one priority level for every interval it has waited,
+# so that low priority jobs are never starved.
+PRIORITY_AGING_SECONDS = 300
+
+
 class ReleaseStatus(StrEnum):
     DRAFT = "DRAFT"
     PENDING_RELEASE = "PENDING_RELEASE"
@@ -108,6 +127,10 @@ class Job(CamelModel, use_enum_values=True):
     log: Optional[List[Log]] = []
     created_at: str
     created_by: UserInfo
+    priority: Optional[int] = None
+    worker_id: Optional[str] = None
+    lease_expires_at: Optional[str] = None
+    wait_reason: Optional[str] = None
 
     def get_action(self) -> list[str]:
         match self.parameters.operation:
@@ -132,3 +155,25 @@ class Target(CamelModel, use_enum_values=True, extra="forbid"):
     status: JobStatus
     last_updated_by: UserInfo
     action: List[str]
+
+
+class DatasetProbe(CamelModel, extra="forbid"):
+    """
+    Result of probing a tar file in the input directory, valid as long
+    as the size and mtime of the file are unchanged.
+    """
+
+    path: str
+    directory: str
+    dataset_name: str
+    size: int
+    mtime_ns: int
+    member_count: int | None
+    has_data: bool
+    has_metadata: bool
+    is_archived: bool
+    probed_at: datetime
+    # SHA-256 of the file, once it has been computed for this size and
+    # mtime
+    sha256: str | None = None
+    checksum_computed_at: datetime | None = None
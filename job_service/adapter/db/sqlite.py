@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 import logging
 import json
@@ -8,9 +8,14 @@ import sqlite3
 from job_service.exceptions import (
     JobAlreadyCompleteException,
     JobExistsException,
+    JobLeaseException,
     NotFoundException,
+    OperationQuotaExceededException,
 )
 from job_service.adapter.db.models import (
+    DEFAULT_OPERATION_PRIORITY,
+    PRIORITY_AGING_SECONDS,
+    DatasetProbe,
     Job,
     JobStatus,
     Operation,
@@ -28,11 +33,28 @@ sqlite3.register_converter(
 )
 
 
+# Stored in PRAGMA user_version once the schema is up to date. Bump it
+# when the schema changes, so that existing databases are migrated.
+SCHEMA_VERSION = 3
+
+
+def _is_in_progress(status: str) -> bool:
+    return status not in [
+        JobStatus.QUEUED,
+        JobStatus.COMPLETED,
+        JobStatus.FAILED,
+    ]
+
+
 class SqliteDbClient:
     db_path: Path
+    operation_limits: dict[str, int]
 
-    def __init__(self, db_url: str):
+    def __init__(
+        self, db_url: str, operation_limits: dict[str, int] | None = None
+    ):
         self.db_path = Path(db_url.replace("sqlite://", ""))
+        self.operation_limits = operation_limits or {}
         self._ensure_schema()
 
     def _conn(self) -> sqlite3.Connection:
@@ -44,66 +66,317 @@ class SqliteDbClient:
         conn.execute("PRAGMA foreign_keys = ON")
         return conn
 
+    def _schema_version(self, cursor: sqlite3.Cursor) -> int:
+        return cursor.execute("PRAGMA user_version").fetchone()[0]
+
     def _ensure_schema(self):
+        """
+        Creates and migrates the schema unless it is up to date. The
+        migration runs in a single write transaction, so that clients
+        created concurrently do not migrate the same database twice and
+        other connections never see a half migrated schema.
+        """
         conn = self._conn()
         try:
             cursor = conn.cursor()
+            if self._schema_version(cursor) == SCHEMA_VERSION:
+                return
+            cursor.execute("BEGIN IMMEDIATE")
+            if self._schema_version(cursor) == SCHEMA_VERSION:
+                conn.rollback()
+                return
+            self._migrate(cursor)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _migrate(self, cursor: sqlite3.Cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS job (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                target TEXT,
+                datastore_id INTEGER,
+                status TEXT,
+                created_at TIMESTAMP,
+                created_by TEXT,
+                parameters TEXT,
+                operation TEXT,
+                worker_id TEXT,
+                lease_expires_at TIMESTAMP,
+                claim_count INTEGER DEFAULT 0,
+                priority INTEGER,
+                submitted_by TEXT,
+                FOREIGN KEY(datastore_id) REFERENCES datastore(datastore_id)
+            )
+        """)
+        if self._add_column_if_missing(cursor, "job", "operation", "TEXT"):
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS job (
-                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    target TEXT,
-                    datastore_id INTEGER,
-                    status TEXT,
-                    created_at TIMESTAMP,
-                    created_by TEXT,
-                    parameters TEXT,
-                    FOREIGN KEY(datastore_id) REFERENCES datastore(datastore_id)
-                )
+                UPDATE job
+                SET operation = json_extract(parameters, '$.operation')
             """)
+        self._add_column_if_missing(cursor, "job", "worker_id", "TEXT")
+        self._add_column_if_missing(
+            cursor, "job", "lease_expires_at", "TIMESTAMP"
+        )
+        self._add_column_if_missing(
+            cursor, "job", "claim_count", "INTEGER DEFAULT 0"
+        )
+        if self._add_column_if_missing(cursor, "job", "priority", "INTEGER"):
+            priority_cases = " ".join(
+                f"WHEN '{operation}' THEN {priority}"
+                for operation, priority in DEFAULT_OPERATION_PRIORITY.items()
+            )
+            cursor.execute(f"""
+                UPDATE job
+                SET priority = CASE operation {priority_cases} ELSE 0 END
+            """)
+        if self._add_column_if_missing(cursor, "job", "submitted_by", "TEXT"):
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS maintenance (
-                    maintenance_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    datastore_id INTEGER,
-                    msg TEXT,
-                    paused BOOLEAN,
-                    timestamp TIMESTAMP,
-                    FOREIGN KEY(datastore_id) REFERENCES datastore(datastore_id)
-                )
+                UPDATE job
+                SET submitted_by = json_extract(created_by, '$.userId')
             """)
+        cursor.execute("DROP INDEX IF EXISTS job_queue_idx")
+        # Only the status column is used when claiming a job, to find the
+        # queued jobs. Their effective priority depends on the time of the
+        # claim, so they are sorted on every claim.
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS job_fair_queue_idx
+            ON job (status, operation, submitted_by, priority DESC, job_id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS job_lease_idx
+            ON job (lease_expires_at)
+            WHERE lease_expires_at IS NOT NULL
+        """)
+        counter_table_exists = cursor.execute(
+            """
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'table' AND name = 'operation_in_progress'
+            """
+        ).fetchone()
+        if not counter_table_exists:
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS target (
-                    name TEXT,
-                    datastore_id INTEGER,
-                    status TEXT,
-                    action TEXT,
-                    last_updated_at TIMESTAMP,
-                    last_updated_by TEXT,
-                    PRIMARY KEY (name, datastore_id)
-                    FOREIGN KEY(datastore_id) REFERENCES datastore(datastore_id)
+                CREATE TABLE operation_in_progress (
+                    operation TEXT PRIMARY KEY,
+                    in_progress INTEGER NOT NULL DEFAULT 0
                 )
             """)
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS job_log (
-                    job_log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    job_id INTEGER,
-                    msg TEXT,
-                    at TIMESTAMP,
-                    FOREIGN KEY(job_id) REFERENCES job(job_id) ON DELETE CASCADE
-                )
+                INSERT INTO operation_in_progress (operation, in_progress)
+                SELECT operation, COUNT(*) FROM job
+                WHERE status NOT IN ('queued', 'completed', 'failed')
+                    AND operation IS NOT NULL
+                GROUP BY operation
             """)
-            conn.commit()
+        user_counter_table_exists = cursor.execute(
+            """
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'table' AND name = 'user_in_progress'
+            """
+        ).fetchone()
+        if not user_counter_table_exists:
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS datastore (
-                    datastore_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    rdn TEXT,
-                    description TEXT,
-                    directory TEXT,
-                    name TEXT
+                CREATE TABLE user_in_progress (
+                    submitted_by TEXT PRIMARY KEY,
+                    in_progress INTEGER NOT NULL DEFAULT 0
                 )
             """)
-            conn.commit()
-        finally:
-            conn.close()
+            cursor.execute("""
+                INSERT INTO user_in_progress (submitted_by, in_progress)
+                SELECT COALESCE(submitted_by, ''), COUNT(*) FROM job
+                WHERE status NOT IN ('queued', 'completed', 'failed')
+                GROUP BY COALESCE(submitted_by, '')
+            """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS maintenance (
+                maintenance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                datastore_id INTEGER,
+                msg TEXT,
+                paused BOOLEAN,
+                timestamp TIMESTAMP,
+                FOREIGN KEY(datastore_id) REFERENCES datastore(datastore_id)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS maintenance_timestamp_idx
+            ON maintenance (datastore_id, timestamp)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS target (
+                name TEXT,
+                datastore_id INTEGER,
+                status TEXT,
+                action TEXT,
+                last_updated_at TIMESTAMP,
+                last_updated_by TEXT,
+                PRIMARY KEY (name, datastore_id)
+                FOREIGN KEY(datastore_id) REFERENCES datastore(datastore_id)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS job_log (
+                job_log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id INTEGER,
+                msg TEXT,
+                at TIMESTAMP,
+                FOREIGN KEY(job_id) REFERENCES job(job_id) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS importable_dataset (
+                path TEXT PRIMARY KEY,
+                directory TEXT,
+                name TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                member_count INTEGER,
+                has_data BOOLEAN,
+                has_metadata BOOLEAN,
+                archived BOOLEAN,
+                probed_at TIMESTAMP,
+                sha256 TEXT,
+                checksum_computed_at TIMESTAMP
+            )
+        """)
+        self._add_column_if_missing(
+            cursor, "importable_dataset", "sha256", "TEXT"
+        )
+        self._add_column_if_missing(
+            cursor, "importable_dataset", "checksum_computed_at", "TIMESTAMP"
+        )
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS importable_dataset_directory_idx
+            ON importable_dataset (directory)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS datastore (
+                datastore_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rdn TEXT,
+                description TEXT,
+                directory TEXT,
+                name TEXT
+            )
+        """)
+
+    def _add_column_if_missing(
+        self,
+        cursor: sqlite3.Cursor,
+        table: str,
+        column: str,
+        column_type: str,
+    ) -> bool:
+        """
+        Adds a column to tables created by an earlier version of the
+        schema. Returns True if the column was added.
+        """
+        columns = [
+            row["name"]
+            for row in cursor.execute(f"PRAGMA table_info({table})")
+        ]
+        if column not in columns:
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"
+            )
+            return True
+        return False
+
+    def _in_progress_counts(self, cursor: sqlite3.Cursor) -> dict[str, int]:
+        return {
+            row["operation"]: row["in_progress"]
+            for row in cursor.execute(
+                "SELECT operation, in_progress FROM operation_in_progress"
+            )
+        }
+
+    def _limited_in_progress_counts(
+        self, cursor: sqlite3.Cursor
+    ) -> dict[str, int] | None:
+        if not self.operation_limits:
+            return None
+        return self._in_progress_counts(cursor)
+
+    def _adjust_in_progress(
+        self,
+        cursor: sqlite3.Cursor,
+        operation: str,
+        submitted_by: str | None,
+        delta: int,
+    ):
+        """
+        Keeps the in progress counters per operation and per submitting
+        user up to date. Must be called in the transaction that changes
+        the status of the job.
+        """
+        if delta == 0:
+            return
+        cursor.execute(
+            """
+            INSERT INTO operation_in_progress (operation, in_progress)
+            VALUES (?, MAX(?, 0))
+            ON CONFLICT(operation) DO UPDATE SET
+                in_progress = MAX(in_progress + ?, 0)
+            """,
+            (operation, delta, delta),
+        )
+        cursor.execute(
+            """
+            INSERT INTO user_in_progress (submitted_by, in_progress)
+            VALUES (?, MAX(?, 0))
+            ON CONFLICT(submitted_by) DO UPDATE SET
+                in_progress = MAX(in_progress + ?, 0)
+            """,
+            (submitted_by or "", delta, delta),
+        )
+
+    def _quota_wait_reason(
+        self, operation: str, in_progress: dict[str, int]
+    ) -> str | None:
+        """
+        Returns why a job with the supplied operation has to wait, or None
+        if the operation is below its concurrency limit.
+        """
+        limit = self.operation_limits.get(operation)
+        if limit is None or in_progress.get(operation, 0) < limit:
+            return None
+        return (
+            f"Waiting for a free {operation} slot: "
+            f"{in_progress.get(operation, 0)} of {limit} "
+            f"{operation} jobs in progress"
+        )
+
+    def _job_from_row(
+        self,
+        job_row: sqlite3.Row,
+        in_progress: dict[str, int] | None = None,
+    ) -> Job:
+        lease_expires_at = job_row["lease_expires_at"]
+        parameters = json.loads(job_row["parameters"])
+        wait_reason = None
+        if in_progress is not None and job_row["status"] == JobStatus.QUEUED:
+            wait_reason = self._quota_wait_reason(
+                parameters["operation"], in_progress
+            )
+        return Job(
+            job_id=str(job_row["job_id"]),
+            status=job_row["status"],
+            parameters=parameters,
+            created_at=job_row["created_at"].isoformat(),
+            created_by=json.loads(job_row["created_by"]),
+            log=[
+                Log(at=row["at"], message=row["message"])
+                for row in json.loads(job_row["logs_json"])
+            ],
+            priority=job_row["priority"],
+            worker_id=job_row["worker_id"],
+            lease_expires_at=(
+                lease_expires_at.isoformat() if lease_expires_at else None
+            ),
+            wait_reason=wait_reason,
+        )
 
     def _get_job_row_with_logs(
         self, cursor: sqlite3.Cursor, job_id: int | str
@@ -117,6 +390,10 @@ class SqliteDbClient:
                 j.parameters,
                 j.created_at,
                 j.created_by,
+                j.priority,
+                j.submitted_by,
+                j.worker_id,
+                j.lease_expires_at,
                 COALESCE((
                     SELECT json_group_array(
                         json_object(
@@ -152,16 +429,8 @@ class SqliteDbClient:
             if not job_row:
                 raise NotFoundException(f"No job found for jobId: {job_id}")
 
-            return Job(
-                job_id=str(job_row["job_id"]),
-                status=job_row["status"],
-                parameters=json.loads(job_row["parameters"]),
-                created_at=job_row["created_at"].isoformat(),
-                created_by=json.loads(job_row["created_by"]),
-                log=[
-                    Log(at=row["at"], message=row["message"])
-                    for row in json.loads(job_row["logs_json"])
-                ],
+            return self._job_from_row(
+                job_row, self._limited_in_progress_counts(cursor)
             )
         finally:
             conn.close()
@@ -197,6 +466,9 @@ class SqliteDbClient:
                     j.parameters,
                     j.created_at,
                     j.created_by,
+                    j.priority,
+                    j.worker_id,
+                    j.lease_expires_at,
                     COALESCE((
                         SELECT json_group_array(
                             json_object(
@@ -217,18 +489,9 @@ class SqliteDbClient:
             ).fetchall()
             if not job_rows:
                 return []
+            in_progress = self._limited_in_progress_counts(cursor)
             return [
-                Job(
-                    job_id=str(job_row["job_id"]),
-                    status=job_row["status"],
-                    parameters=json.loads(job_row["parameters"]),
-                    created_at=job_row["created_at"].isoformat(),
-                    created_by=json.loads(job_row["created_by"]),
-                    log=[
-                        Log(at=row["at"], message=row["message"])
-                        for row in json.loads(job_row["logs_json"])
-                    ],
-                )
+                self._job_from_row(job_row, in_progress)
                 for job_row in job_rows
             ]
         finally:
@@ -251,6 +514,9 @@ class SqliteDbClient:
                     j.parameters,
                     j.created_at,
                     j.created_by,
+                    j.priority,
+                    j.worker_id,
+                    j.lease_expires_at,
                     COALESCE((
                         SELECT json_group_array(
                             json_object(
@@ -272,18 +538,9 @@ class SqliteDbClient:
             ).fetchall()
             if not job_rows:
                 return []
+            in_progress = self._limited_in_progress_counts(cursor)
             return [
-                Job(
-                    job_id=str(job_row["job_id"]),
-                    status=job_row["status"],
-                    parameters=json.loads(job_row["parameters"]),
-                    created_at=job_row["created_at"].isoformat(),
-                    created_by=json.loads(job_row["created_by"]),
-                    log=[
-                        Log(at=row["at"], message=row["message"])
-                        for row in json.loads(job_row["logs_json"])
-                    ],
-                )
+                self._job_from_row(job_row, in_progress)
                 for job_row in job_rows
             ]
         finally:
@@ -312,9 +569,9 @@ class SqliteDbClient:
                 cursor.execute(
                     """
                     INSERT INTO job
-                    (target, datastore_id, status, parameters, created_at, created_by)
+                    (target, datastore_id, status, parameters, created_at, created_by, operation, priority, submitted_by)
                     VALUES
-                    ( ?, ?, ?, ?, ?, ?)
+                    ( ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """,
                     (
                         new_job.parameters.target,
@@ -327,6 +584,9 @@ class SqliteDbClient:
                         json.dumps(
                             new_job.created_by.model_dump(by_alias=True)
                         ),
+                        new_job.parameters.operation,
+                        new_job.priority,
+                        new_job.created_by.user_id,
                     ),
                 )
                 job_id = cursor.lastrowid
@@ -350,10 +610,14 @@ class SqliteDbClient:
         status: JobStatus | None,
         description: str | None,
         log: str | None,
+        worker_id: str | None = None,
     ) -> Job:
         """
         Updates job with supplied job_id with new status, log, or description.
         Ensures atomic, isolated update.
+        If worker_id is supplied, raises JobLeaseException unless the job is
+        leased to that worker, so that a worker whose lease expired can not
+        update a job that has been requeued or claimed by another worker.
         """
         conn = self._conn()
         try:
@@ -366,6 +630,13 @@ class SqliteDbClient:
                 raise JobAlreadyCompleteException(
                     f"Job with id {job_id} has already been completed"
                 )
+            if worker_id is not None and (
+                job_row["worker_id"] != worker_id
+                or job_row["lease_expires_at"] is None
+            ):
+                raise JobLeaseException(
+                    f"Job with id {job_id} is not leased to worker {worker_id}"
+                )
             if description is not None:
                 cursor.execute(
                     "UPDATE job SET parameters = json_set(parameters, '$.description', ?) WHERE job_id = ?",
@@ -380,10 +651,43 @@ class SqliteDbClient:
                 )
 
             if status is not None:
+                operation = json.loads(job_row["parameters"])["operation"]
+                in_progress_delta = int(_is_in_progress(status)) - int(
+                    _is_in_progress(job_row["status"])
+                )
+                if in_progress_delta > 0:
+                    wait_reason = self._quota_wait_reason(
+                        operation, self._in_progress_counts(cursor)
+                    )
+                    if wait_reason is not None:
+                        raise OperationQuotaExceededException(
+                            f"Job with id {job_id} can not be set to "
+                            f"{status}. {wait_reason}"
+                        )
+                self._adjust_in_progress(
+                    cursor,
+                    operation,
+                    job_row["submitted_by"],
+                    in_progress_delta,
+                )
                 cursor.execute(
                     "UPDATE job SET status = ? WHERE job_id = ?",
                     (status, job_id),
                 )
+                if status == JobStatus.QUEUED:
+                    # Back in the queue, so no worker holds it any more
+                    cursor.execute(
+                        """
+                        UPDATE job SET worker_id = NULL, lease_expires_at = NULL
+                        WHERE job_id = ?
+                        """,
+                        (job_id,),
+                    )
+                elif status in [JobStatus.COMPLETED, JobStatus.FAILED]:
+                    cursor.execute(
+                        "UPDATE job SET lease_expires_at = NULL WHERE job_id = ?",
+                        (job_id,),
+                    )
                 cursor.execute(
                     """
                     INSERT INTO job_log (job_id, msg, at)
@@ -406,16 +710,8 @@ class SqliteDbClient:
                 raise Exception(
                     f"Could not find job with id {job_id} after update"
                 )
-            return Job(
-                job_id=str(job_row["job_id"]),
-                status=job_row["status"],
-                parameters=json.loads(job_row["parameters"]),
-                created_at=job_row["created_at"].isoformat(),
-                created_by=json.loads(job_row["created_by"]),
-                log=[
-                    Log(at=row["at"], message=row["message"])
-                    for row in json.loads(job_row["logs_json"])
-                ],
+            return self._job_from_row(
+                job_row, self._limited_in_progress_counts(cursor)
             )
         except sqlite3.Error as e:
             conn.rollback()
@@ -426,6 +722,284 @@ class SqliteDbClient:
         finally:
             conn.close()
 
+    def _select_next_queued_job(
+        self,
+        cursor: sqlite3.Cursor,
+        operations: list[Operation] | None,
+        now: datetime,
+    ) -> sqlite3.Row | None:
+        """
+        Picks the next job from the queue. Priority grows with time
+        spent waiting, and only the job with the highest such priority
+        in each (operation, submitting user) queue is considered. The
+        head with the highest priority wins. Ties go to the operation
+        and user with the fewest jobs in progress, and then to the
+        oldest job. Heads of operations at their concurrency limit are
+        skipped. Fairness between users only applies to jobs of equal
+        priority, so a job submitted with a higher priority is picked
+        before the jobs of other users. The queued jobs are ranked on
+        every claim, so the cost grows with the length of the queue.
+        """
+        operation_filter = ""
+        if operations is not None:
+            operation_filter = (
+                f"AND operation IN ({','.join(['?'] * len(operations))})"
+            )
+        queue_heads = cursor.execute(
+            f"""
+            SELECT
+                head.job_id,
+                head.operation,
+                head.submitted_by
+            FROM (
+                SELECT
+                    job_id,
+                    operation,
+                    submitted_by,
+                    effective_priority,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY operation, submitted_by
+                        ORDER BY effective_priority DESC, job_id ASC
+                    ) AS queue_position
+                FROM (
+                    SELECT
+                        job_id,
+                        operation,
+                        submitted_by,
+                        COALESCE(priority, 0) + CAST(
+                            MAX(julianday(?) - julianday(created_at), 0)
+                            * 86400 / ? AS INTEGER
+                        ) AS effective_priority
+                    FROM job
+                    WHERE status = 'queued' {operation_filter}
+                )
+            ) AS head
+            LEFT JOIN operation_in_progress
+                ON operation_in_progress.operation = head.operation
+            LEFT JOIN user_in_progress
+                ON user_in_progress.submitted_by
+                    = COALESCE(head.submitted_by, '')
+            WHERE head.queue_position = 1
+            ORDER BY
+                head.effective_priority DESC,
+                COALESCE(operation_in_progress.in_progress, 0)
+                    + COALESCE(user_in_progress.in_progress, 0) ASC,
+                head.job_id ASC
+            """,
+            [
+                now,
+                PRIORITY_AGING_SECONDS,
+                *[str(operation) for operation in operations or []],
+            ],
+        ).fetchall()
+        if not queue_heads:
+            return None
+        in_progress = self._in_progress_counts(cursor)
+        return next(
+            (
+                head
+                for head in queue_heads
+                if self._quota_wait_reason(head["operation"], in_progress)
+                is None
+            ),
+            None,
+        )
+
+    def claim_job(
+        self,
+        worker_id: str,
+        operations: list[Operation] | None,
+        lease_seconds: int,
+    ) -> Job | None:
+        """
+        Atomically claims the next queued job matching the supplied
+        operations for worker_id. The claimed job is set to initiated
+        with a lease expiring after lease_seconds.
+        Returns None if there are no matching queued jobs.
+        """
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            now = datetime.now()
+            queued_row = self._select_next_queued_job(cursor, operations, now)
+            if queued_row is None:
+                conn.rollback()
+                return None
+            job_id = queued_row["job_id"]
+            self._adjust_in_progress(
+                cursor, queued_row["operation"], queued_row["submitted_by"], 1
+            )
+            cursor.execute(
+                """
+                UPDATE job
+                SET
+                    status = ?,
+                    worker_id = ?,
+                    lease_expires_at = ?,
+                    claim_count = COALESCE(claim_count, 0) + 1
+                WHERE job_id = ?
+                """,
+                (
+                    JobStatus.INITIATED,
+                    worker_id,
+                    now + timedelta(seconds=lease_seconds),
+                    job_id,
+                ),
+            )
+            cursor.execute(
+                """
+                INSERT INTO job_log (job_id, msg, at)
+                VALUES (?, ?, ?)
+                """,
+                (
+                    job_id,
+                    f"Set status: {JobStatus.INITIATED}, "
+                    f"claimed by worker {worker_id}",
+                    now,
+                ),
+            )
+            conn.commit()
+            job_row = self._get_job_row_with_logs(cursor, job_id)
+            if job_row is None:
+                raise Exception(
+                    f"Could not find job with id {job_id} after claim"
+                )
+            return self._job_from_row(job_row)
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def heartbeat_job(
+        self, job_id: str, worker_id: str, lease_seconds: int
+    ) -> Job:
+        """
+        Extends the lease of a job held by worker_id.
+        Raises NotFoundException if no such job is found, and
+        JobLeaseException if the job is no longer leased to worker_id.
+        """
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE job SET lease_expires_at = ?
+                WHERE job_id = ?
+                    AND worker_id = ?
+                    AND lease_expires_at IS NOT NULL
+                    AND status NOT IN ('completed', 'failed')
+                """,
+                (
+                    datetime.now() + timedelta(seconds=lease_seconds),
+                    int(job_id),
+                    worker_id,
+                ),
+            )
+            if cursor.rowcount == 0:
+                job_row = self._get_job_row_with_logs(cursor, job_id)
+                if job_row is None:
+                    raise NotFoundException(
+                        f"Could not find job with id {job_id}"
+                    )
+                raise JobLeaseException(
+                    f"Job with id {job_id} is not leased to worker {worker_id}"
+                )
+            conn.commit()
+            job_row = self._get_job_row_with_logs(cursor, job_id)
+            if job_row is None:
+                raise Exception(
+                    f"Could not find job with id {job_id} after heartbeat"
+                )
+            return self._job_from_row(job_row)
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def requeue_expired_jobs(self, max_claims: int) -> list[Job]:
+        """
+        Releases jobs whose lease has expired. Jobs that have been
+        claimed fewer than max_claims times are put back in the queue,
+        the rest are set to failed. Returns the released jobs.
+        Only jobs claimed with claim_job have a lease, jobs started by
+        updating their status are not recovered.
+        """
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            now = datetime.now()
+            expired_rows = cursor.execute(
+                """
+                SELECT
+                    job_id,
+                    worker_id,
+                    claim_count,
+                    status,
+                    operation,
+                    submitted_by
+                FROM job
+                WHERE lease_expires_at IS NOT NULL
+                    AND lease_expires_at < ?
+                    AND status NOT IN ('completed', 'failed')
+                """,
+                (now,),
+            ).fetchall()
+            for expired_row in expired_rows:
+                if (expired_row["claim_count"] or 0) < max_claims:
+                    status = JobStatus.QUEUED
+                    msg = (
+                        f"Lease for worker {expired_row['worker_id']} "
+                        f"expired. Set status: {status}"
+                    )
+                else:
+                    status = JobStatus.FAILED
+                    msg = (
+                        f"Lease for worker {expired_row['worker_id']} "
+                        f"expired after {expired_row['claim_count']} "
+                        f"claims. Set status: {status}"
+                    )
+                if _is_in_progress(expired_row["status"]):
+                    self._adjust_in_progress(
+                        cursor,
+                        expired_row["operation"],
+                        expired_row["submitted_by"],
+                        -1,
+                    )
+                cursor.execute(
+                    """
+                    UPDATE job
+                    SET status = ?, worker_id = NULL, lease_expires_at = NULL
+                    WHERE job_id = ?
+                    """,
+                    (status, expired_row["job_id"]),
+                )
+                cursor.execute(
+                    """
+                    INSERT INTO job_log (job_id, msg, at)
+                    VALUES (?, ?, ?)
+                    """,
+                    (expired_row["job_id"], msg, now),
+                )
+            conn.commit()
+            released_jobs = []
+            for expired_row in expired_rows:
+                job_row = self._get_job_row_with_logs(
+                    cursor, expired_row["job_id"]
+                )
+                if job_row is not None:
+                    released_jobs.append(self._job_from_row(job_row))
+            return released_jobs
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
     def initialize_maintenance(self) -> dict:
         """
         Inserts an initial maintenance status row if table is empty
@@ -502,20 +1076,40 @@ class SqliteDbClient:
         finally:
             conn.close()
 
-    def get_maintenance_history(self) -> list:
+    def get_maintenance_history(
+        self,
+        limit: int | None = None,
+        before: datetime | None = None,
+        after: datetime | None = None,
+    ) -> list:
         """
-        Returns full history of maintenance entries, initializing if needed.
+        Returns history of maintenance entries, newest first, optionally
+        limited to entries in the (after, before) time range.
+        Initializes the maintenance status if there are no entries at all.
         """
+        where_conditions = ["datastore_id = ?"]
+        params: list = [1]
+        if before is not None:
+            where_conditions.append("timestamp < ?")
+            params.append(before)
+        if after is not None:
+            where_conditions.append("timestamp > ?")
+            params.append(after)
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
         conn = self._conn()
         try:
             cursor = conn.cursor()
             cursor.execute(
-                """
+                f"""
                 SELECT msg, paused, timestamp FROM maintenance
-                WHERE datastore_id = ?
+                WHERE {" AND ".join(where_conditions)}
                 ORDER BY timestamp DESC
+                {limit_clause}
                 """,
-                (1,),
+                params,
             )
             rows = cursor.fetchall()
             if rows:
@@ -527,8 +1121,42 @@ class SqliteDbClient:
                     }
                     for row in rows
                 ]
-            else:
+            elif before is None and after is None:
                 return [self.initialize_maintenance()]
+            else:
+                return []
+        finally:
+            conn.close()
+
+    def compact_maintenance_history(self, older_than: datetime) -> int:
+        """
+        Deletes maintenance entries older than the supplied timestamp,
+        always keeping the latest entry. Returns number of deleted entries.
+        """
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                DELETE FROM maintenance
+                WHERE datastore_id = ?
+                    AND timestamp < ?
+                    AND maintenance_id != (
+                        SELECT maintenance_id FROM maintenance
+                        WHERE datastore_id = ?
+                        ORDER BY timestamp DESC
+                        LIMIT 1
+                    )
+                """,
+                (1, older_than, 1),
+            )
+            deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+        except Exception as e:
+            conn.rollback()
+            raise e
         finally:
             conn.close()
 
@@ -667,3 +1295,148 @@ class SqliteDbClient:
             raise e
         finally:
             conn.close()
+
+    def get_dataset_probes(self, directory: str) -> list[DatasetProbe]:
+        """
+        Returns the stored probe results for tar files in a directory.
+        """
+        conn = self._conn()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT * FROM importable_dataset WHERE directory = ?",
+                (directory,),
+            )
+            return [
+                DatasetProbe(
+                    path=row["path"],
+                    directory=row["directory"],
+                    dataset_name=row["name"],
+                    size=row["size"],
+                    mtime_ns=row["mtime_ns"],
+                    member_count=row["member_count"],
+                    has_data=bool(row["has_data"]),
+                    has_metadata=bool(row["has_metadata"]),
+                    is_archived=bool(row["archived"]),
+                    probed_at=row["probed_at"],
+                    sha256=row["sha256"],
+                    checksum_computed_at=row["checksum_computed_at"],
+                )
+                for row in cursor.fetchall()
+            ]
+        finally:
+            conn.close()
+
+    def save_dataset_probes(self, probes: list[DatasetProbe]) -> None:
+        """
+        Inserts or replaces probe results, keyed by path.
+        """
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO importable_dataset (
+                    path, directory, name, size, mtime_ns, member_count,
+                    has_data, has_metadata, archived, probed_at, sha256,
+                    checksum_computed_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        probe.path,
+                        probe.directory,
+                        probe.dataset_name,
+                        probe.size,
+                        probe.mtime_ns,
+                        probe.member_count,
+                        probe.has_data,
+                        probe.has_metadata,
+                        probe.is_archived,
+                        probe.probed_at,
+                        probe.sha256,
+                        probe.checksum_computed_at,
+                    )
+                    for probe in probes
+                ],
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def delete_dataset_probes(self, paths: list[str]) -> None:
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "DELETE FROM importable_dataset WHERE path = ?",
+                [(path,) for path in paths],
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def move_dataset_probes(self, moved: dict[str, str]) -> None:
+        """
+        Moves the probe results of files renamed to the archive
+        directory, keyed by their old path.
+        """
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for source, destination in moved.items():
+                conn.execute(
+                    "DELETE FROM importable_dataset WHERE path = ?",
+                    (destination,),
+                )
+                conn.execute(
+                    """
+                    UPDATE importable_dataset
+                    SET path = ?, directory = ?, archived = 1
+                    WHERE path = ?
+                    """,
+                    (destination, str(Path(destination).parent), source),
+                )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def save_dataset_checksum(
+        self,
+        path: str,
+        size: int,
+        mtime_ns: int,
+        sha256: str,
+        computed_at: datetime,
+    ) -> None:
+        """
+        Stores the checksum of a file with its probe result, unless the
+        probe result is for another size or mtime of the file.
+        """
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """
+                UPDATE importable_dataset
+                SET sha256 = ?, checksum_computed_at = ?
+                WHERE path = ? AND size = ? AND mtime_ns = ?
+                """,
+                (sha256, computed_at, path, size, mtime_ns),
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
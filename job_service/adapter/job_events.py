@@ -0,0 +1,140 @@
+import json
+import threading
+import uuid
+from collections import deque
+from enum import StrEnum
+
+from job_service.adapter.db.models import Job
+from job_service.adapter.notifier import ChangeNotifier
+from job_service.model.camelcase_model import CamelModel
+
+
+class JobEventType(StrEnum):
+    CREATED = "created"
+    STATUS = "status"
+    LOG = "log"
+    TARGET = "target"
+    # Sent by the stream, not published, when the events after the
+    # Last-Event-ID of a client are no longer known. The client has to
+    # fetch the jobs again.
+    RESET = "reset"
+
+
+class JobEvent(CamelModel, use_enum_values=True):
+    event_id: int
+    event_type: JobEventType
+    job_id: str
+    data: dict
+    epoch: str
+
+    def to_sse(self) -> str:
+        return (
+            f"id: {self.epoch}-{self.event_id}\n"
+            f"event: {self.event_type}\n"
+            f"data: {json.dumps(self.data)}\n\n"
+        )
+
+
+class JobEventBroker:
+    """
+    In-process buffer of recently published job events. Subscribers
+    read everything after the last event id they have seen, so a
+    reconnecting client can resume as long as its events are still
+    in the buffer. Event ids are prefixed with an epoch that is new for
+    every process, since the counter starts over on restart.
+    """
+
+    epoch: str
+    _lock: threading.Lock
+    _events: deque[JobEvent]
+    _last_event_id: int
+    notifier: ChangeNotifier
+
+    def __init__(self, history_size: int = 1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=history_size)
+        self._last_event_id = 0
+        self.notifier = ChangeNotifier()
+
+    @property
+    def last_event_id(self) -> int:
+        with self._lock:
+            return self._last_event_id
+
+    def publish(
+        self, event_type: JobEventType, job_id: str | int, data: dict
+    ) -> JobEvent:
+        with self._lock:
+            self._last_event_id += 1
+            event = JobEvent(
+                event_id=self._last_event_id,
+                event_type=event_type,
+                job_id=str(job_id),
+                data=data,
+                epoch=self.epoch,
+            )
+            self._events.append(event)
+        self.notifier.notify_all()
+        return event
+
+    def publish_status(self, job: Job) -> JobEvent:
+        return self.publish(
+            JobEventType.STATUS,
+            job.job_id,
+            {"jobId": job.job_id, "status": job.status},
+        )
+
+    def publish_target(self, job: Job) -> JobEvent:
+        return self.publish(
+            JobEventType.TARGET,
+            job.job_id,
+            {
+                "jobId": job.job_id,
+                "name": job.parameters.target,
+                "status": job.status,
+                "action": job.get_action(),
+            },
+        )
+
+    def resume_after(self, last_event_id: str) -> int | None:
+        """
+        Returns the counter to resume after for a Last-Event-ID sent by a
+        client, or None if the events after it are not known. That is
+        the case for ids from another process, and for ids whose next
+        event is no longer in the buffer.
+        """
+        epoch, _, counter = last_event_id.partition("-")
+        if epoch != self.epoch or not counter.isdigit():
+            return None
+        resume_after = int(counter)
+        with self._lock:
+            if resume_after > self._last_event_id:
+                return None
+            if self._events and resume_after < self._events[0].event_id - 1:
+                return None
+        return resume_after
+
+    def reset_event(self, last_event_id: int) -> JobEvent:
+        return JobEvent(
+            event_id=last_event_id,
+            event_type=JobEventType.RESET,
+            job_id="",
+            data={},
+            epoch=self.epoch,
+        )
+
+    def events_after(self, last_event_id: int) -> list[JobEvent]:
+        with self._lock:
+            return [
+                event
+                for event in self._events
+                if event.event_id > last_event_id
+            ]
+
+
+_JOB_EVENT_BROKER = JobEventBroker()
+
+
+def get_job_event_broker() -> JobEventBroker:
+    return _JOB_EVENT_BROKER
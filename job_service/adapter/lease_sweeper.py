@@ -0,0 +1,71 @@
+import logging
+import threading
+
+from job_service.adapter import db
+from job_service.adapter.db.models import Job
+from job_service.adapter.job_events import (
+    JobEventBroker,
+    get_job_event_broker,
+)
+
+
+logger = logging.getLogger()
+
+
+class LeaseSweeper:
+    """
+    Background thread that periodically releases jobs whose worker
+    stopped sending heartbeats, so that their targets are not blocked.
+    """
+
+    interval_seconds: float
+    max_claims: int
+    broker: JobEventBroker
+    _stop_event: threading.Event
+    _thread: threading.Thread | None
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        max_claims: int,
+        broker: JobEventBroker | None = None,
+    ):
+        self.interval_seconds = interval_seconds
+        self.max_claims = max_claims
+        self.broker = broker or get_job_event_broker()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def sweep(self) -> list[Job]:
+        database_client = db.get_database_client()
+        released_jobs = database_client.requeue_expired_jobs(self.max_claims)
+        for job in released_jobs:
+            logger.warning(
+                f"Lease expired for job {job.job_id}, set status: {job.status}"
+            )
+            database_client.update_target(job)
+            self.broker.publish_status(job)
+            self.broker.publish_target(job)
+        return released_jobs
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.exception(e)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="lease-sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,247 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from enum import StrEnum
+from pathlib import Path
+from typing import List, NamedTuple
+
+from job_service.adapter import db
+from job_service.config import environment
+from job_service.model.camelcase_model import CamelModel
+
+
+logger = logging.getLogger()
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+# Time before a checksum that failed is computed again on request, as
+# the file may have been unreadable for a while only
+FAILED_RETRY_SECONDS = 60.0
+
+
+class ChecksumStatus(StrEnum):
+    PENDING = "PENDING"
+    COMPLETE = "COMPLETE"
+    FAILED = "FAILED"
+
+
+class DatasetChecksum(CamelModel, use_enum_values=True):
+    status: ChecksumStatus
+    sha256: str | None = None
+    size: int
+    computed_at: datetime | None = None
+
+
+class _ChecksumEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    checksum: DatasetChecksum
+    # Monotonic time of the failure, for FAILED checksums
+    failed_at: float | None = None
+
+
+def _is_current(entry: _ChecksumEntry | None, stat: os.stat_result) -> bool:
+    return (
+        entry is not None
+        and entry.size == stat.st_size
+        and entry.mtime_ns == stat.st_mtime_ns
+    )
+
+
+def _should_retry(entry: _ChecksumEntry) -> bool:
+    return (
+        entry.failed_at is not None
+        and time.monotonic() - entry.failed_at >= FAILED_RETRY_SECONDS
+    )
+
+
+def _save_checksum(
+    path: Path, stat: os.stat_result, checksum: DatasetChecksum
+) -> None:
+    """
+    Stores a computed checksum with the probe result of the file in the
+    database, so that it survives restarts. The catalogue is only an
+    optimization, so database errors are logged and ignored.
+    """
+    try:
+        db.get_database_client().save_dataset_checksum(
+            str(path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            checksum.sha256,
+            checksum.computed_at,
+        )
+    except Exception as e:
+        logger.warning(f"Couldn't save checksum for {path}: {str(e)}")
+
+
+def _sha256(path: Path) -> str:
+    """
+    Hashes a file with large sequential reads into a reused buffer, so
+    that memory use does not depend on the size of the file.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while size := f.readinto(buffer):
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+class ChecksumCache:
+    """
+    SHA-256 checksums of tar files in the input directory, computed in
+    the background on a bounded thread pool. A checksum is only reused
+    while the size and mtime of the file are unchanged. Lookups never
+    wait for a checksum to be computed. Computed checksums are saved to
+    the dataset catalogue, and restored from it with store. Failed
+    checksums are computed again on request after FAILED_RETRY_SECONDS.
+    """
+
+    _lock: threading.Lock
+    _entries: dict[Path, _ChecksumEntry]
+    _executor: ThreadPoolExecutor
+
+    def __init__(self, max_workers: int):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="dataset-checksum"
+        )
+
+    def request(self, path: Path, stat: os.stat_result) -> DatasetChecksum:
+        """
+        Returns the checksum of a file, and starts computing it if it is
+        missing or outdated, or if it failed a while ago.
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if _is_current(entry, stat) and not _should_retry(entry):
+                return entry.checksum
+            checksum = DatasetChecksum(
+                status=ChecksumStatus.PENDING, size=stat.st_size
+            )
+            self._entries[path] = _ChecksumEntry(
+                stat.st_size, stat.st_mtime_ns, checksum
+            )
+        self._executor.submit(self._compute, path, stat)
+        return checksum
+
+    def store(
+        self, path: Path, stat: os.stat_result, checksum: DatasetChecksum
+    ) -> None:
+        """
+        Adds a checksum computed earlier for the supplied size and mtime
+        of a file, unless a checksum for them is already known.
+        """
+        with self._lock:
+            if not _is_current(self._entries.get(path), stat):
+                self._entries[path] = _ChecksumEntry(
+                    stat.st_size, stat.st_mtime_ns, checksum
+                )
+
+    def lookup(
+        self, path: Path, stat: os.stat_result
+    ) -> DatasetChecksum | None:
+        """
+        Returns the checksum of a file if it is known for the supplied
+        size and mtime, without computing it.
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+        return entry.checksum if _is_current(entry, stat) else None
+
+    def _compute(self, path: Path, stat: os.stat_result) -> None:
+        try:
+            sha256 = _sha256(path)
+            current = os.stat(path)
+        except OSError as e:
+            logger.warning(f"Couldn't compute checksum for {path}: {str(e)}")
+            self._complete(
+                path,
+                stat,
+                DatasetChecksum(
+                    status=ChecksumStatus.FAILED, size=stat.st_size
+                ),
+            )
+            return
+        if (current.st_size, current.st_mtime_ns) != (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            # Changed while it was read, computed again on next request
+            with self._lock:
+                if _is_current(self._entries.get(path), stat):
+                    del self._entries[path]
+            return
+        checksum = DatasetChecksum(
+            status=ChecksumStatus.COMPLETE,
+            sha256=sha256,
+            size=stat.st_size,
+            computed_at=datetime.now(),
+        )
+        self._complete(path, stat, checksum)
+        _save_checksum(path, stat, checksum)
+
+    def _complete(
+        self, path: Path, stat: os.stat_result, checksum: DatasetChecksum
+    ) -> None:
+        with self._lock:
+            entry = self._entries.get(path)
+            # Keep the entry of a newer version of the file
+            if _is_current(entry, stat):
+                self._entries[path] = entry._replace(
+                    checksum=checksum,
+                    failed_at=(
+                        time.monotonic()
+                        if checksum.status == ChecksumStatus.FAILED
+                        else None
+                    ),
+                )
+
+    def prune(self, dir_path: Path, existing_paths: set[Path]) -> None:
+        """
+        Forgets files in dir_path that no longer exist.
+        """
+        with self._lock:
+            for path in list(self._entries):
+                if path.parent == dir_path and path not in existing_paths:
+                    del self._entries[path]
+
+    def apply_changes(
+        self, removed: List[Path], moved: dict[Path, Path]
+    ) -> None:
+        """
+        Forgets removed files and moves the entries of renamed files,
+        whose content is unchanged.
+        """
+        with self._lock:
+            for path in removed:
+                self._entries.pop(path, None)
+            for source, destination in moved.items():
+                entry = self._entries.pop(source, None)
+                if entry is not None:
+                    self._entries[destination] = entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self) -> None:
+        """
+        Waits for the checksums being computed. No checksums can be
+        requested afterwards.
+        """
+        self._executor.shutdown(wait=True)
+
+
+_CHECKSUM_CACHE = ChecksumCache(environment.get("DATASET_CHECKSUM_WORKERS"))
+
+
+def get_checksum_cache() -> ChecksumCache:
+    return _CHECKSUM_CACHE
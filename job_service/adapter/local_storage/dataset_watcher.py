@@ -0,0 +1,272 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from job_service.adapter.local_storage import input_directory
+from job_service.adapter.local_storage.input_directory import (
+    ImportableDataset,
+)
+from job_service.config import environment
+
+
+logger = logging.getLogger()
+
+# Events from <sys/inotify.h> that can change the list of datasets.
+# IN_MODIFY is left out so that files being written do not trigger a
+# rescan for every block, IN_CLOSE_WRITE is sent when they are done.
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_WATCH_MASK = (
+    _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+)
+
+# Events that arrive within this many seconds of each other are
+# handled with a single rescan
+_DEBOUNCE_SECONDS = 0.1
+_SELECT_TIMEOUT_SECONDS = 1.0
+
+
+class _Inotify:
+    """
+    Minimal ctypes binding to the Linux inotify API. Only used to learn
+    that something changed in a watched directory, the events are not
+    parsed.
+    """
+
+    fd: int
+    _libc: ctypes.CDLL
+    _watched: set[Path]
+
+    def __init__(self, libc: ctypes.CDLL, fd: int):
+        self._libc = libc
+        self.fd = fd
+        self._watched = set()
+
+    @classmethod
+    def create(cls) -> "_Inotify | None":
+        library = ctypes.util.find_library("c")
+        if library is None:
+            return None
+        try:
+            libc = ctypes.CDLL(library, use_errno=True)
+            inotify_init1 = libc.inotify_init1
+        except (OSError, AttributeError):
+            return None
+        fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def watch(self, path: Path) -> None:
+        if path in self._watched or not path.is_dir():
+            return
+        wd = self._libc.inotify_add_watch(
+            self.fd, os.fsencode(path), _WATCH_MASK
+        )
+        if wd < 0:
+            errno = ctypes.get_errno()
+            logger.warning(
+                f"Could not watch {path}: {os.strerror(errno)}, "
+                "relying on polling"
+            )
+            return
+        self._watched.add(path)
+
+    def forget_missing(self) -> None:
+        self._watched = {path for path in self._watched if path.is_dir()}
+
+    def wait(self, timeout: float) -> bool:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        return bool(readable)
+
+    def drain(self) -> None:
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DatasetWatcher:
+    """
+    Background thread that keeps an in-memory list of the importable
+    datasets. The input and archive directories are rescanned when
+    inotify reports a change, and in any case every interval_seconds,
+    since inotify is not available everywhere and does not see changes
+    made by other hosts on network mounts. Rescans are cheap as only
+    changed files are probed again.
+    """
+
+    interval_seconds: float
+    _lock: threading.Lock
+    _datasets: List[ImportableDataset] | None
+    # Incremented by apply_changes, so that scans that started before a
+    # change are not stored over it
+    _generation: int
+    _stop_event: threading.Event
+    _thread: threading.Thread | None
+
+    def __init__(self, interval_seconds: float = 30):
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._datasets = None
+        self._generation = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def datasets(self) -> List[ImportableDataset] | None:
+        """
+        The importable datasets from the latest scan, or None if the
+        watcher is not running.
+        """
+        with self._lock:
+            return self._datasets
+
+    def refresh(self) -> bool:
+        """
+        Rescans the input and archive directories if the watcher is
+        running. Returns False if changes were applied during the scan,
+        in which case the scan is discarded, as it may not include them.
+        """
+        if self._thread is None:
+            return True
+        with self._lock:
+            generation = self._generation
+        datasets = input_directory.get_importable_datasets()
+        with self._lock:
+            if self._thread is None:
+                return True
+            if self._generation != generation:
+                return False
+            self._datasets = datasets
+            return True
+
+    def apply_changes(self, deleted: List[str], archived: List[str]) -> None:
+        """
+        Removes deleted live datasets from the list, and moves archived
+        ones to the archived datasets. Used to show changes made through
+        the API right away, without rescanning on the request thread.
+        """
+        deleted_names = set(deleted)
+        archived_names = set(archived)
+        with self._lock:
+            self._generation += 1
+            if self._datasets is None:
+                return
+            live = []
+            archive = []
+            for dataset in self._datasets:
+                if dataset.is_archived:
+                    archive.append(dataset)
+                elif dataset.dataset_name in archived_names:
+                    archive.append(
+                        dataset.model_copy(update={"is_archived": True})
+                    )
+                elif dataset.dataset_name not in deleted_names:
+                    live.append(dataset)
+            archive.sort(key=lambda dataset: dataset.dataset_name)
+            self._datasets = live + archive
+
+    def _refresh_safely(self) -> bool:
+        try:
+            return self.refresh()
+        except Exception as e:
+            logger.exception(e)
+            return True
+
+    def _watch_directories(self, inotify: _Inotify) -> None:
+        inotify.forget_missing()
+        inotify.watch(input_directory.INPUT_DIR)
+        inotify.watch(input_directory.ARCHIVE_DIR)
+
+    def _wait_seconds(self) -> float:
+        """
+        Files that are still being uploaded show up as datasets once
+        they are settled, and files that are still being probed once
+        the probe is done. Neither causes a filesystem event.
+        """
+        datasets = self.datasets or []
+        if any(
+            dataset.is_uploading or dataset.is_probing for dataset in datasets
+        ):
+            settle_seconds = environment.get("DATASET_UPLOAD_SETTLE_SECONDS")
+            return min(self.interval_seconds, max(settle_seconds, 1))
+        return self.interval_seconds
+
+    def _wait_for_change(self, inotify: _Inotify | None) -> None:
+        wait_seconds = self._wait_seconds()
+        if inotify is None:
+            self._stop_event.wait(wait_seconds)
+            return
+        deadline = time.monotonic() + wait_seconds
+        while not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if inotify.wait(min(remaining, _SELECT_TIMEOUT_SECONDS)):
+                self._stop_event.wait(_DEBOUNCE_SECONDS)
+                inotify.drain()
+                return
+
+    def _run(self):
+        inotify = _Inotify.create()
+        if inotify is None:
+            logger.info("inotify is not available, polling input directory")
+        try:
+            while not self._stop_event.is_set():
+                if inotify is not None:
+                    self._watch_directories(inotify)
+                if self._refresh_safely():
+                    self._wait_for_change(inotify)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="dataset-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._thread = None
+            self._datasets = None
+
+
+_DATASET_WATCHER = DatasetWatcher(
+    environment.get("DATASET_WATCH_INTERVAL_SECONDS")
+)
+
+
+def get_dataset_watcher() -> DatasetWatcher:
+    return _DATASET_WATCHER
@@ -2,10 +2,29 @@ import logging
 import os
 import tarfile
 import string
+import threading
+import time
+from datetime import datetime
+from enum import StrEnum
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
 from tarfile import ReadError
-from typing import List
+from typing import Iterator, List, NamedTuple
 
+from job_service.adapter import db
+from job_service.adapter.db.models import DatasetProbe
+from job_service.adapter.local_storage.checksums import (
+    ChecksumStatus,
+    DatasetChecksum,
+    get_checksum_cache,
+)
+from job_service.adapter.local_storage.tar_probe import (
+    CompressedTarFile,
+    NotATarFile,
+    TarMemberReader,
+    iter_tar_members,
+)
 from job_service.config import environment
 from job_service.model.camelcase_model import CamelModel
 from job_service.exceptions import NotFoundException, NameValidationError
@@ -21,14 +40,11 @@ class ImportableDataset(CamelModel, extra="forbid"):
     has_metadata: bool
     has_data: bool
     is_archived: bool = False
-
-
-def _has_data(tar: tarfile.TarFile) -> bool:
-    return "chunks" in tar.getnames()
-
-
-def _has_metadata(tar: tarfile.TarFile, dataset_name: str) -> bool:
-    return f"{dataset_name}.json" in tar.getnames()
+    size: int | None = None
+    member_count: int | None = None
+    sha256: str | None = None
+    is_uploading: bool | None = None
+    is_probing: bool | None = None
 
 
 def _validate_dataset_name(dataset_name: str) -> bool:
@@ -44,54 +60,806 @@ def _validate_dataset_name(dataset_name: str) -> bool:
     )
 
 
-def get_datasets_in_directory(
-    dir_path: Path, is_archived: bool = False
-) -> List[ImportableDataset]:
-    datasets = []
+def _invalid_name_message(dataset_name: str) -> str:
+    return (
+        f'"{dataset_name}" contains invalid characters. '
+        'Please use only uppercase A-Z, numbers 0-9 or "_"'
+    )
+
+
+class _IndexEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    dataset: ImportableDataset | None
+
+
+class ImportableDatasetIndex:
+    """
+    In-process cache of probed tar files. An entry is only reused while
+    the size and mtime of the file are unchanged, so files are re-probed
+    when they are replaced or modified. Files that could not be read, or
+    that are not importable datasets, are cached as None.
+    """
+
+    _lock: threading.Lock
+    _entries: dict[Path, _IndexEntry]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def lookup(self, path: Path, stat: os.stat_result) -> _IndexEntry | None:
+        with self._lock:
+            entry = self._entries.get(path)
+        if (
+            entry is None
+            or entry.size != stat.st_size
+            or entry.mtime_ns != stat.st_mtime_ns
+        ):
+            return None
+        return entry
+
+    def store(
+        self,
+        path: Path,
+        stat: os.stat_result,
+        dataset: ImportableDataset | None,
+    ) -> None:
+        with self._lock:
+            self._entries[path] = _IndexEntry(
+                stat.st_size, stat.st_mtime_ns, dataset
+            )
+
+    def prune(self, dir_path: Path, existing_paths: set[Path]) -> None:
+        """
+        Forgets files in dir_path that no longer exist.
+        """
+        with self._lock:
+            for path in list(self._entries):
+                if path.parent == dir_path and path not in existing_paths:
+                    del self._entries[path]
+
+    def apply_changes(
+        self, removed: List[Path], moved: dict[Path, Path]
+    ) -> None:
+        """
+        Forgets removed files and moves the entries of files renamed to
+        the archive directory, so that they are not probed again.
+        """
+        with self._lock:
+            for path in removed:
+                self._entries.pop(path, None)
+            for source, destination in moved.items():
+                entry = self._entries.pop(source, None)
+                if entry is None:
+                    continue
+                dataset = entry.dataset
+                if dataset is not None:
+                    dataset = dataset.model_copy(update={"is_archived": True})
+                self._entries[destination] = entry._replace(dataset=dataset)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_DATASET_INDEX = ImportableDatasetIndex()
+
+# Shared by all requests so that the number of files probed at once is
+# bounded, also when several requests scan the input directory.
+_PROBE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=environment.get("DATASET_PROBE_WORKERS"),
+    thread_name_prefix="dataset-probe",
+)
 
-    for item in os.listdir(dir_path):
-        item_path = dir_path / item
-        dataset_name, ext = os.path.splitext(item)
+# Directory listings do not share the probe executor, so that they are
+# not queued behind the probes of other requests.
+_LISTING_EXECUTOR = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="dataset-listing"
+)
+
+
+def _scan_members(path: Path, names: set[str]) -> tuple[set[str], int | None]:
+    """
+    Reads member headers of a tar file until all the supplied names are
+    found, so that the cost depends on where the members are rather than
+    on the size of the archive. Returns the names found, and the number
+    of members if the whole archive was read, otherwise None. Only the
+    headers that are read are checked for truncation.
+    """
+    found = set()
+    member_count = 0
+    try:
+        members = iter_tar_members(path)
         try:
-            if ext == ".tar" and tarfile.is_tarfile(item_path):
-                tar = tarfile.open(item_path)
-                importable_dataset = ImportableDataset(
-                    dataset_name=dataset_name,
-                    has_data=_has_data(tar),
-                    has_metadata=_has_metadata(tar, dataset_name),
-                    is_archived=is_archived,
+            for member in members:
+                member_count += 1
+                if member.name in names:
+                    found.add(member.name)
+                    if found == names:
+                        return found, None
+        finally:
+            members.close()
+    except CompressedTarFile:
+        found.clear()
+        member_count = 0
+        # Stops decompressing once the names are found
+        with tarfile.open(path) as tar:
+            for member in tar:
+                member_count += 1
+                name = member.name.rstrip("/")
+                if name in names:
+                    found.add(name)
+                    if found == names:
+                        return found, None
+    return found, member_count
+
+
+def _probe_dataset(
+    item_path: Path,
+    dataset_name: str,
+    is_archived: bool,
+    size: int | None = None,
+) -> ImportableDataset | None:
+    metadata_name = f"{dataset_name}.json"
+    try:
+        found, member_count = _scan_members(
+            item_path, {"chunks", metadata_name}
+        )
+    except NotATarFile:
+        return None
+    except ReadError as e:
+        logger.warning(f"Couldn't read tarfile for {dataset_name}: {str(e)}")
+        return None
+    if metadata_name not in found:
+        return None
+    return ImportableDataset(
+        dataset_name=dataset_name,
+        has_data="chunks" in found,
+        has_metadata=True,
+        is_archived=is_archived,
+        size=size,
+        member_count=member_count,
+    )
+
+
+class _TarFile(NamedTuple):
+    path: Path
+    dataset_name: str
+    stat: os.stat_result
+    uploading: bool = False
+    # Whether the size is the same as in the previous scan
+    size_settled: bool = True
+
+
+# Uploads are written to <name>.tar.part and renamed when done, or are
+# written to <name>.tar while <name>.lock or <name>.tar.lock exists.
+PARTIAL_SUFFIX = ".part"
+LOCK_SUFFIX = ".lock"
+
+# Sizes of the tar files found by the previous scan of each directory
+_PREVIOUS_SIZES: dict[Path, dict[Path, int]] = {}
+_PREVIOUS_SIZES_LOCK = threading.Lock()
+
+
+def _split_tar_name(file_name: str) -> tuple[str, bool] | None:
+    """
+    Returns the dataset name of a tar file, and whether the file name
+    marks an upload in progress. Returns None for other files.
+    """
+    stem, ext = os.path.splitext(file_name)
+    if ext == ".tar":
+        return stem, False
+    if ext == PARTIAL_SUFFIX and stem.endswith(".tar"):
+        return stem.removesuffix(".tar"), True
+    return None
+
+
+def _list_tar_files(dir_path: Path) -> List[_TarFile]:
+    """
+    Lists the tar files in a directory. Files are marked as uploading
+    if they are named or locked as such, or if they were modified less
+    than DATASET_UPLOAD_SETTLE_SECONDS ago. Files whose size is not the
+    same as in the previous scan of the directory are not settled
+    either, which _submit_probes checks before probing them. A settle
+    time of 0 turns off both checks.
+    """
+    settle_seconds = environment.get("DATASET_UPLOAD_SETTLE_SECONDS")
+    settled_before_ns = (
+        time.time_ns() - int(settle_seconds * 1e9)
+        if settle_seconds > 0
+        else None
+    )
+    tar_files = []
+    file_names = set()
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            file_names.add(entry.name)
+            tar_name = _split_tar_name(entry.name)
+            if tar_name is None or not entry.is_file():
+                continue
+            dataset_name, uploading = tar_name
+            stat = entry.stat()
+            tar_files.append(
+                _TarFile(
+                    dir_path / entry.name,
+                    dataset_name,
+                    stat,
+                    uploading
+                    or (
+                        settled_before_ns is not None
+                        and stat.st_mtime_ns > settled_before_ns
+                    ),
+                )
+            )
+    tar_files = [
+        tar_file._replace(uploading=True)
+        if f"{tar_file.dataset_name}{LOCK_SUFFIX}" in file_names
+        or f"{tar_file.dataset_name}.tar{LOCK_SUFFIX}" in file_names
+        else tar_file
+        for tar_file in tar_files
+    ]
+    sizes = {tar_file.path: tar_file.stat.st_size for tar_file in tar_files}
+    with _PREVIOUS_SIZES_LOCK:
+        previous_sizes = _PREVIOUS_SIZES.get(dir_path, {})
+        _PREVIOUS_SIZES[dir_path] = sizes
+    if settled_before_ns is not None:
+        tar_files = [
+            tar_file._replace(
+                size_settled=previous_sizes.get(tar_file.path)
+                == tar_file.stat.st_size
+            )
+            for tar_file in tar_files
+        ]
+    existing_paths = set(sizes)
+    _DATASET_INDEX.prune(dir_path, existing_paths)
+    get_checksum_cache().prune(dir_path, existing_paths)
+    return sorted(tar_files, key=lambda tar_file: tar_file.path.name)
+
+
+class _Probe(NamedTuple):
+    tar_file: _TarFile
+    is_archived: bool
+    future: Future
+    # True if the file was probed, rather than found in the index or
+    # the catalogue
+    probed: bool
+
+
+def _uploading_dataset(
+    tar_file: _TarFile, is_archived: bool
+) -> ImportableDataset:
+    return ImportableDataset(
+        dataset_name=tar_file.dataset_name,
+        has_metadata=False,
+        has_data=False,
+        is_archived=is_archived,
+        size=tar_file.stat.st_size,
+        is_uploading=True,
+    )
+
+
+def _index_probe_result(tar_file: _TarFile):
+    def store(future: Future) -> None:
+        if future.exception() is None:
+            _DATASET_INDEX.store(tar_file.path, tar_file.stat, future.result())
+
+    return store
+
+
+def _completed_future(dataset: ImportableDataset | None) -> Future:
+    future = Future()
+    future.set_result(dataset)
+    return future
+
+
+def _to_catalogue_entry(
+    tar_file: _TarFile, is_archived: bool, dataset: ImportableDataset | None
+) -> DatasetProbe:
+    return DatasetProbe(
+        path=str(tar_file.path),
+        directory=str(tar_file.path.parent),
+        dataset_name=tar_file.dataset_name,
+        size=tar_file.stat.st_size,
+        mtime_ns=tar_file.stat.st_mtime_ns,
+        member_count=dataset.member_count if dataset is not None else None,
+        has_data=dataset is not None and dataset.has_data,
+        has_metadata=dataset is not None,
+        is_archived=is_archived,
+        probed_at=datetime.now(),
+    )
+
+
+def _from_catalogue_entry(probe: DatasetProbe) -> ImportableDataset | None:
+    if not probe.has_metadata:
+        return None
+    return ImportableDataset(
+        dataset_name=probe.dataset_name,
+        has_data=probe.has_data,
+        has_metadata=True,
+        is_archived=probe.is_archived,
+        size=probe.size,
+        member_count=probe.member_count,
+    )
+
+
+def _load_catalogue(
+    dir_path: Path, tar_files: List[_TarFile]
+) -> dict[str, DatasetProbe]:
+    """
+    Returns the probe results stored in the database for a directory,
+    and deletes those for files that no longer exist. The catalogue is
+    only an optimization, so database errors are logged and ignored.
+    """
+    try:
+        database_client = db.get_database_client()
+        catalogue = {
+            probe.path: probe
+            for probe in database_client.get_dataset_probes(str(dir_path))
+        }
+        existing_paths = {str(tar_file.path) for tar_file in tar_files}
+        removed_paths = [
+            path for path in catalogue if path not in existing_paths
+        ]
+        if removed_paths:
+            database_client.delete_dataset_probes(removed_paths)
+        return catalogue
+    except Exception as e:
+        logger.warning(f"Couldn't read dataset catalogue: {str(e)}")
+        return {}
+
+
+def _save_to_catalogue(probes: List[DatasetProbe]) -> None:
+    if not probes:
+        return
+    try:
+        db.get_database_client().save_dataset_probes(probes)
+    except Exception as e:
+        logger.warning(f"Couldn't update dataset catalogue: {str(e)}")
+
+
+def _move_in_catalogue(removed: List[Path], moved: dict[Path, Path]) -> None:
+    if not removed and not moved:
+        return
+    try:
+        database_client = db.get_database_client()
+        if removed:
+            database_client.delete_dataset_probes(
+                [str(path) for path in removed]
+            )
+        if moved:
+            database_client.move_dataset_probes(
+                {
+                    str(source): str(destination)
+                    for source, destination in moved.items()
+                }
+            )
+    except Exception as e:
+        logger.warning(f"Couldn't update dataset catalogue: {str(e)}")
+
+
+def _submit_probes(
+    dir_path: Path,
+    tar_files: List[_TarFile],
+    is_archived: bool,
+    prefix: str = "",
+) -> List[_Probe]:
+    """
+    Starts probing the tar files that are neither in the index nor in
+    the catalogue. Files that are already known, and files that are
+    still being uploaded, get a completed future. Unknown files are not
+    probed until their size is settled. Files not matching the prefix
+    are not probed.
+    """
+    probes = []
+    catalogue = None
+    for tar_file in tar_files:
+        if not tar_file.dataset_name.startswith(prefix):
+            continue
+        if tar_file.uploading:
+            # Partial tar files cannot be read, so they are not probed
+            # until the upload is done
+            probes.append(
+                _Probe(
+                    tar_file,
+                    is_archived,
+                    _completed_future(
+                        _uploading_dataset(tar_file, is_archived)
+                    ),
+                    False,
+                )
+            )
+            continue
+        index_entry = _DATASET_INDEX.lookup(tar_file.path, tar_file.stat)
+        if index_entry is not None:
+            probes.append(
+                _Probe(
+                    tar_file,
+                    is_archived,
+                    _completed_future(index_entry.dataset),
+                    False,
                 )
-                if importable_dataset.has_metadata:
-                    datasets.append(importable_dataset)
-        except ReadError as e:
+            )
+            continue
+        if catalogue is None:
+            catalogue = _load_catalogue(dir_path, tar_files)
+        stored = catalogue.get(str(tar_file.path))
+        if (
+            stored is not None
+            and stored.size == tar_file.stat.st_size
+            and stored.mtime_ns == tar_file.stat.st_mtime_ns
+        ):
+            dataset = _from_catalogue_entry(stored)
+            _DATASET_INDEX.store(tar_file.path, tar_file.stat, dataset)
+            if stored.sha256 is not None:
+                get_checksum_cache().store(
+                    tar_file.path,
+                    tar_file.stat,
+                    DatasetChecksum(
+                        status=ChecksumStatus.COMPLETE,
+                        sha256=stored.sha256,
+                        size=stored.size,
+                        computed_at=stored.checksum_computed_at,
+                    ),
+                )
+            probes.append(
+                _Probe(
+                    tar_file, is_archived, _completed_future(dataset), False
+                )
+            )
+            continue
+        if not tar_file.size_settled:
+            probes.append(
+                _Probe(
+                    tar_file,
+                    is_archived,
+                    _completed_future(
+                        _uploading_dataset(tar_file, is_archived)
+                    ),
+                    False,
+                )
+            )
+            continue
+        future = _PROBE_EXECUTOR.submit(
+            _probe_dataset,
+            tar_file.path,
+            tar_file.dataset_name,
+            is_archived,
+            tar_file.stat.st_size,
+        )
+        future.add_done_callback(_index_probe_result(tar_file))
+        probes.append(_Probe(tar_file, is_archived, future, True))
+    return probes
+
+
+def _probe_deadline() -> float:
+    return time.monotonic() + environment.get("DATASET_PROBE_TIMEOUT_SECONDS")
+
+
+def _collect_probes(
+    probes: List[_Probe], deadline: float
+) -> List[ImportableDataset]:
+    """
+    Waits for the probes until the deadline, and saves the new probe
+    results to the catalogue. A file that is not probed by then is
+    returned without metadata and marked as probing, and is indexed
+    once its probe completes. A file that fails to be probed is logged
+    and left out. Checksums are requested once the probe results are
+    saved, since they are stored with them.
+    """
+    done, _ = wait(
+        [probe.future for probe in probes],
+        timeout=max(deadline - time.monotonic(), 0),
+    )
+    datasets = []
+    catalogue_entries = []
+    checksum_files = []
+    for probe in probes:
+        dataset_name = probe.tar_file.dataset_name
+        if probe.future not in done:
+            logger.warning(f"Timed out probing tarfile for {dataset_name}")
+            if _validate_dataset_name(dataset_name):
+                datasets.append(
+                    ImportableDataset(
+                        dataset_name=dataset_name,
+                        has_metadata=False,
+                        has_data=False,
+                        is_archived=probe.is_archived,
+                        size=probe.tar_file.stat.st_size,
+                        is_probing=True,
+                    )
+                )
+            continue
+        if probe.future.exception() is not None:
             logger.warning(
-                f"Couldn't read tarfile for {dataset_name}: {str(e)}"
+                f"Couldn't probe tarfile for {dataset_name}: "
+                f"{str(probe.future.exception())}"
+            )
+            continue
+        dataset = probe.future.result()
+        if probe.probed:
+            catalogue_entries.append(
+                _to_catalogue_entry(probe.tar_file, probe.is_archived, dataset)
+            )
+        if dataset is not None and _validate_dataset_name(
+            dataset.dataset_name
+        ):
+            if not dataset.is_uploading:
+                checksum_files.append(probe.tar_file)
+            datasets.append(dataset)
+    _save_to_catalogue(catalogue_entries)
+    for tar_file in checksum_files:
+        get_checksum_cache().request(tar_file.path, tar_file.stat)
+    return datasets
+
+
+def get_datasets_in_directory(
+    dir_path: Path, is_archived: bool = False, prefix: str = ""
+) -> List[ImportableDataset]:
+    deadline = _probe_deadline()
+    return _collect_probes(
+        _submit_probes(
+            dir_path, _list_tar_files(dir_path), is_archived, prefix
+        ),
+        deadline,
+    )
+
+
+def get_importable_datasets(
+    prefix: str = "", include_archived: bool = True
+) -> List[ImportableDataset]:
+    """
+    Returns names of all valid datasets in input directory.
+    Live and archived datasets are scanned concurrently, and returned
+    sorted by file name with the live datasets first. The archive
+    directory is not scanned unless include_archived is set. Datasets
+    that are not probed within DATASET_PROBE_TIMEOUT_SECONDS are marked
+    as probing.
+    """
+    deadline = _probe_deadline()
+    archive_listing = (
+        _LISTING_EXECUTOR.submit(_list_tar_files, ARCHIVE_DIR)
+        if include_archived and ARCHIVE_DIR.exists()
+        else None
+    )
+    probes = _submit_probes(
+        INPUT_DIR, _list_tar_files(INPUT_DIR), False, prefix
+    )
+    if archive_listing is not None:
+        try:
+            archived_tar_files = archive_listing.result(
+                timeout=max(deadline - time.monotonic(), 0)
             )
+            probes += _submit_probes(
+                ARCHIVE_DIR, archived_tar_files, True, prefix
+            )
+        except FutureTimeoutError:
+            logger.warning("Timed out listing the archive directory")
+    return _collect_probes(probes, deadline)
+
+
+def dataset_path(dataset_name: str, is_archived: bool = False) -> Path:
+    return (ARCHIVE_DIR if is_archived else INPUT_DIR) / f"{dataset_name}.tar"
+
+
+def with_checksum(dataset: ImportableDataset) -> ImportableDataset:
+    """
+    Adds the checksum of the dataset if it has been computed for the
+    current size and mtime of the file.
+    """
+    path = dataset_path(dataset.dataset_name, dataset.is_archived)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return dataset
+    checksum = get_checksum_cache().lookup(path, stat)
+    if checksum is None or checksum.sha256 is None:
+        return dataset
+    return dataset.model_copy(update={"sha256": checksum.sha256})
+
+
+def _find_dataset_file(dataset_name: str) -> tuple[Path, os.stat_result]:
+    if not _validate_dataset_name(dataset_name):
+        raise NameValidationError(_invalid_name_message(dataset_name))
+    for is_archived in (False, True):
+        path = dataset_path(dataset_name, is_archived)
+        try:
+            return path, os.stat(path)
+        except FileNotFoundError:
             continue
+    raise NotFoundException(f"File {dataset_name} not found")
+
+
+def get_dataset_checksum(dataset_name: str) -> DatasetChecksum:
+    """
+    Returns the checksum of a live dataset, or of an archived dataset
+    if there is no live dataset with the name. The checksum is computed
+    in the background, and has status PENDING until it is done.
+    """
+    path, stat = _find_dataset_file(dataset_name)
+    return get_checksum_cache().request(path, stat)
+
+
+def _read_compressed_member(path: Path, name: str) -> Iterator[bytes]:
+    tar = tarfile.open(path)
+    try:
+        member_file = tar.extractfile(name)
+        if member_file is None:
+            # Not a regular file, like the uncompressed reader
+            raise KeyError(name)
+    except BaseException:
+        tar.close()
+        raise
+
+    def read_chunks() -> Iterator[bytes]:
+        try:
+            while chunk := member_file.read(65536):
+                yield chunk
+        finally:
+            tar.close()
+
+    return read_chunks()
+
+
+def open_dataset_metadata(dataset_name: str) -> Iterator[bytes]:
+    """
+    Returns the chunks of the metadata JSON of a dataset, read straight
+    from the tar file without extracting it. Live datasets take
+    precedence over archived ones. The returned iterator has a close()
+    method that releases the file if it is not read to the end.
+    """
+    path, _ = _find_dataset_file(dataset_name)
+    metadata_name = f"{dataset_name}.json"
+    try:
+        try:
+            return TarMemberReader(path, metadata_name)
+        except CompressedTarFile:
+            return _read_compressed_member(path, metadata_name)
+    except KeyError as e:
+        raise NotFoundException(
+            f"Dataset {dataset_name} has no metadata"
+        ) from e
+    except ReadError as e:
+        raise NotFoundException(
+            f"Couldn't read tarfile for {dataset_name}: {str(e)}"
+        ) from e
+
+
+def filter_importable_datasets(
+    datasets: List[ImportableDataset],
+    prefix: str = "",
+    include_archived: bool = True,
+    has_data: bool | None = None,
+) -> List[ImportableDataset]:
     return [
         dataset
         for dataset in datasets
-        if _validate_dataset_name(dataset.dataset_name)
+        if dataset.dataset_name.startswith(prefix)
+        and (include_archived or not dataset.is_archived)
+        and (has_data is None or dataset.has_data == has_data)
     ]
 
 
-def get_importable_datasets() -> List[ImportableDataset]:
+def dataset_cursor(dataset: ImportableDataset) -> str:
     """
-    Returns names of all valid datasets in input directory.
+    Position of a dataset in the sorted list of importable datasets,
+    used to page through it.
     """
-    datasets = get_datasets_in_directory(INPUT_DIR)
-    if ARCHIVE_DIR.exists():
-        datasets += get_datasets_in_directory(ARCHIVE_DIR, is_archived=True)
-    return datasets
+    return (
+        f"archive/{dataset.dataset_name}"
+        if dataset.is_archived
+        else dataset.dataset_name
+    )
+
+
+def datasets_after_cursor(
+    datasets: List[ImportableDataset], cursor: str
+) -> List[ImportableDataset]:
+    is_archived = cursor.startswith("archive/")
+    position = (is_archived, cursor.removeprefix("archive/"))
+    return [
+        dataset
+        for dataset in datasets
+        if (dataset.is_archived, dataset.dataset_name) > position
+    ]
 
 
 def delete_importable_datasets(dataset_name):
     if not _validate_dataset_name(dataset_name):
-        raise NameValidationError(
-            f'"{dataset_name}" contains invalid characters. '
-            'Please use only uppercase A-Z, numbers 0-9 or "_"'
-        )
+        raise NameValidationError(_invalid_name_message(dataset_name))
     try:
         os.remove(f"{INPUT_DIR}/{dataset_name}.tar")
     except (FileNotFoundError, OSError) as e:
         raise NotFoundException(f"File {dataset_name} not found") from e
+
+
+class BulkAction(StrEnum):
+    DELETE = "DELETE"
+    ARCHIVE = "ARCHIVE"
+
+
+class BulkResultStatus(StrEnum):
+    DELETED = "DELETED"
+    ARCHIVED = "ARCHIVED"
+    NOT_FOUND = "NOT_FOUND"
+    INVALID_NAME = "INVALID_NAME"
+    ALREADY_ARCHIVED = "ALREADY_ARCHIVED"
+    FAILED = "FAILED"
+
+
+class BulkResult(CamelModel, use_enum_values=True):
+    dataset_name: str
+    status: BulkResultStatus
+    message: str | None = None
+
+
+def _apply_bulk_action(
+    action: BulkAction,
+    dataset_name: str,
+    removed: List[Path],
+    moved: dict[Path, Path],
+) -> BulkResult:
+    if not dataset_name or not _validate_dataset_name(dataset_name):
+        return BulkResult(
+            dataset_name=dataset_name,
+            status=BulkResultStatus.INVALID_NAME,
+            message=_invalid_name_message(dataset_name),
+        )
+    path = INPUT_DIR / f"{dataset_name}.tar"
+    try:
+        if action == BulkAction.DELETE:
+            os.remove(path)
+            removed.append(path)
+            return BulkResult(
+                dataset_name=dataset_name, status=BulkResultStatus.DELETED
+            )
+        archive_path = ARCHIVE_DIR / f"{dataset_name}.tar"
+        if archive_path.exists():
+            return BulkResult(
+                dataset_name=dataset_name,
+                status=BulkResultStatus.ALREADY_ARCHIVED,
+                message=f"{dataset_name} already exists in the archive",
+            )
+        # Same filesystem, so the move is an atomic rename
+        os.rename(path, archive_path)
+        moved[path] = archive_path
+        return BulkResult(
+            dataset_name=dataset_name, status=BulkResultStatus.ARCHIVED
+        )
+    except FileNotFoundError:
+        return BulkResult(
+            dataset_name=dataset_name,
+            status=BulkResultStatus.NOT_FOUND,
+            message=f"File {dataset_name} not found",
+        )
+    except OSError as e:
+        logger.warning(f"Bulk {action} failed for {dataset_name}: {str(e)}")
+        return BulkResult(
+            dataset_name=dataset_name,
+            status=BulkResultStatus.FAILED,
+            message=str(e),
+        )
+
+
+def apply_bulk_action(
+    action: BulkAction, dataset_names: List[str]
+) -> List[BulkResult]:
+    """
+    Deletes live datasets, or moves them to the archive directory.
+    Returns one result per dataset name, in the order of the names.
+    The dataset index, the checksums and the catalogue are updated once
+    all files are handled, so that moved files are not probed or hashed
+    again.
+    """
+    if action == BulkAction.ARCHIVE:
+        ARCHIVE_DIR.mkdir(exist_ok=True)
+    removed: List[Path] = []
+    moved: dict[Path, Path] = {}
+    results = [
+        _apply_bulk_action(action, dataset_name, removed, moved)
+        for dataset_name in dataset_names
+    ]
+    _DATASET_INDEX.apply_changes(removed, moved)
+    get_checksum_cache().apply_changes(removed, moved)
+    _move_in_catalogue(removed, moved)
+    return results
@@ -0,0 +1,200 @@
+import os
+from pathlib import Path
+from tarfile import ReadError
+from typing import Iterator, NamedTuple
+
+BLOCK_SIZE = 512
+
+# Magic bytes of compressed archives that tarfile.open reads transparently
+_COMPRESSION_MAGIC = (b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")
+
+# Type flags of members whose content is stored after the header
+_REGULAR_TYPES = (b"0", b"\0", b"7")
+
+
+class NotATarFile(ReadError): ...
+
+
+class CompressedTarFile(ReadError): ...
+
+
+class TarMember(NamedTuple):
+    name: str
+    offset_data: int
+    size: int
+    # False for directories, links and other members without content
+    is_file: bool = True
+
+
+def _parse_number(field: bytes) -> int:
+    if field and field[0] & 0x80:
+        # GNU base-256 encoding for large values
+        value = field[0] & 0x7F
+        for byte in field[1:]:
+            value = (value << 8) | byte
+        return value
+    digits = field.split(b"\0", 1)[0].strip()
+    return int(digits, 8) if digits else 0
+
+
+def _parse_string(field: bytes) -> str:
+    return field.split(b"\0", 1)[0].decode("utf-8", "surrogateescape")
+
+
+def _has_valid_checksum(header: bytes) -> bool:
+    try:
+        stored = _parse_number(header[148:156])
+    except ValueError:
+        return False
+    unsigned = sum(header[:148]) + 8 * 0x20 + sum(header[156:])
+    signed = sum(
+        byte - 256 if byte > 127 else byte
+        for byte in header[:148] + b" " * 8 + header[156:]
+    )
+    return stored in (unsigned, signed)
+
+
+def _parse_pax_path(data: bytes) -> str | None:
+    path = None
+    position = 0
+    while position < len(data):
+        space = data.find(b" ", position)
+        if space == -1:
+            break
+        try:
+            length = int(data[position:space])
+        except ValueError as e:
+            raise ReadError("invalid pax header") from e
+        if length <= 0:
+            raise ReadError("invalid pax header")
+        key, _, value = data[space + 1 : position + length - 1].partition(b"=")
+        if key == b"path":
+            path = value.decode("utf-8", "surrogateescape")
+        position += length
+    return path
+
+
+def _iter_headers(fd: int, path: Path) -> Iterator[TarMember]:
+    file_size = os.fstat(fd).st_size
+    offset = 0
+    next_name = None
+    while True:
+        header = os.pread(fd, BLOCK_SIZE, offset)
+        if offset == 0 and header.startswith(_COMPRESSION_MAGIC):
+            raise CompressedTarFile(f"{path} is a compressed archive")
+        if (
+            len(header) < BLOCK_SIZE
+            or header == b"\0" * BLOCK_SIZE
+            or not _has_valid_checksum(header)
+        ):
+            # Like tarfile, treat anything but a valid header after
+            # the first member as the end of the archive.
+            if offset == 0:
+                raise NotATarFile(f"{path} is not a tar file")
+            return
+        size = _parse_number(header[124:136])
+        typeflag = header[156:157]
+        offset_data = offset + BLOCK_SIZE
+        if offset_data + size > file_size:
+            # Like tarfile, a member whose data runs past the end of the
+            # file means that the archive is truncated
+            raise ReadError("unexpected end of data")
+        offset = offset_data + -(-size // BLOCK_SIZE) * BLOCK_SIZE
+
+        if typeflag in (b"x", b"L"):
+            data = os.pread(fd, size, offset_data)
+            if len(data) < size:
+                raise ReadError("unexpected end of data")
+            next_name = (
+                _parse_pax_path(data)
+                if typeflag == b"x"
+                else _parse_string(data)
+            )
+            continue
+        if typeflag in (b"g", b"K"):
+            continue
+
+        name = next_name
+        next_name = None
+        if name is None:
+            name = _parse_string(header[0:100])
+            prefix = _parse_string(header[345:500])
+            if header[257:262] == b"ustar" and prefix:
+                name = f"{prefix}/{name}"
+        yield TarMember(
+            name.rstrip("/"), offset_data, size, typeflag in _REGULAR_TYPES
+        )
+
+
+def iter_tar_members(path: Path) -> Iterator[TarMember]:
+    """
+    Yields the members of an uncompressed tar file by reading only the
+    512-byte member headers with os.pread. Pax and GNU long names are
+    resolved, and directory names are returned without their trailing
+    slash. The file is closed when the generator is exhausted or closed.
+
+    Raises NotATarFile if the file does not start with a tar header,
+    CompressedTarFile for compressed archives and ReadError if an
+    extended header is corrupt or the data of a member is truncated.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        yield from _iter_headers(fd, path)
+    finally:
+        os.close(fd)
+
+
+class TarMemberReader:
+    """
+    Reads one member of an uncompressed tar file in chunks, without
+    reading the rest of the archive. The file is opened when the reader
+    is created, so the member is read from the same file even if it is
+    replaced in the meantime. The file is closed when all chunks are
+    read, or by close().
+
+    Raises KeyError if there is no regular file with the name, and the
+    same errors as iter_tar_members.
+    """
+
+    member: TarMember
+    chunk_size: int
+    _fd: int | None
+
+    def __init__(self, path: Path, name: str, chunk_size: int = 65536):
+        self.chunk_size = chunk_size
+        self._fd = os.open(path, os.O_RDONLY)
+        try:
+            member = next(
+                (
+                    member
+                    for member in _iter_headers(self._fd, path)
+                    if member.name == name
+                ),
+                None,
+            )
+            if member is None or not member.is_file:
+                raise KeyError(name)
+        except BaseException:
+            self.close()
+            raise
+        self.member = member
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            offset = self.member.offset_data
+            end = offset + self.member.size
+            while offset < end and self._fd is not None:
+                chunk = os.pread(
+                    self._fd, min(self.chunk_size, end - offset), offset
+                )
+                if not chunk:
+                    raise ReadError("unexpected end of data")
+                offset += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+
+class ChangeNotifier:
+    """
+    Wakes up coroutines waiting for a change to be published.
+    Changes can be published from any thread (sync endpoints run in
+    a threadpool), while waiters may live on any running event loop.
+    """
+
+    _lock: threading.Lock
+    _version: int
+    _waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Future]]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._waiters = set()
+
+    @property
+    def version(self) -> int:
+        """
+        Incremented on every notification. Read it before checking
+        state, and pass it to wait() so that a change published in
+        between is not missed.
+        """
+        with self._lock:
+            return self._version
+
+    async def wait(self, timeout: float, version: int | None = None) -> bool:
+        """
+        Waits until notify_all is called or the timeout expires.
+        Returns True if woken by a notification, False on timeout.
+        Returns immediately if the version has moved past the supplied one.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            if version is not None and version != self._version:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def notify_all(self) -> None:
+        with self._lock:
+            self._version += 1
+            waiters = list(self._waiters)
+            self._waiters.clear()
+        for loop, future in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_set_done, future)
+
+    @property
+    def waiting(self) -> int:
+        with self._lock:
+            return len(self._waiters)
+
+
+def _set_done(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,230 @@
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from jwt import PyJWK, PyJWKClient, PyJWKSet
+
+from job_service.exceptions import AuthError
+
+
+logger = logging.getLogger()
+
+# Minimum time between refreshes that requests trigger, so that tokens
+# with made up key ids or an unavailable JWKS_URL do not cause a fetch
+# for every request
+REFRESH_COOLDOWN_SECONDS = 30.0
+FETCH_TIMEOUT_SECONDS = 10.0
+
+
+class SigningKeyStats(NamedTuple):
+    requests: int
+    # All loads of the key set, also those by the refresh thread
+    fetches: int
+    # Loads that a request had to wait for
+    request_fetches: int
+
+    @property
+    def cache_hits(self) -> int:
+        return self.requests - self.request_fetches
+
+
+class SigningKeyStore:
+    """
+    Signing keys from JWKS_URL, or from a local JWKS file if one is
+    configured, indexed by key id. While the refresh thread runs the
+    keys are reloaded every refresh_interval_seconds. Keys that are
+    older than that are still used, and reloaded in the background, so
+    requests do not wait for the JWKS endpoint once keys are loaded,
+    also when it is slow or unavailable. Requests only wait for a
+    reload before the first keys are loaded, and when a token has an
+    unknown key id, which is how key rotation shows up.
+    """
+
+    jwks_url: str
+    jwks_file: Path | None
+    refresh_interval_seconds: float
+    _jwks_client: PyJWKClient | None
+    _lock: threading.Lock
+    _load_lock: threading.Lock
+    _keys: dict[str | None, PyJWK]
+    _loaded_at: float | None
+    _last_request_refresh: float | None
+    _requests: int
+    _fetches: int
+    _request_fetches: int
+    _reload_listeners: list[Callable[[set[str | None]], None]]
+    _stop_event: threading.Event
+    _thread: threading.Thread | None
+
+    def __init__(
+        self,
+        jwks_url: str,
+        jwks_file: Path | None = None,
+        refresh_interval_seconds: float = 3000,
+    ):
+        self.jwks_url = jwks_url
+        self.jwks_file = jwks_file
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._jwks_client = (
+            PyJWKClient(
+                jwks_url, cache_jwk_set=False, timeout=FETCH_TIMEOUT_SECONDS
+            )
+            if jwks_file is None
+            else None
+        )
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._keys = {}
+        self._loaded_at = None
+        self._last_request_refresh = None
+        self._requests = 0
+        self._fetches = 0
+        self._request_fetches = 0
+        self._reload_listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _read_jwks(self) -> dict:
+        if self.jwks_file is not None:
+            return json.loads(self.jwks_file.read_text())
+        return self._jwks_client.fetch_data()
+
+    def add_reload_listener(
+        self, listener: Callable[[set[str | None]], None]
+    ) -> None:
+        """
+        Calls listener with the key ids of the key set each time it is
+        loaded, so that results verified with removed keys can be
+        dropped.
+        """
+        self._reload_listeners.append(listener)
+
+    def _load(self, for_request: bool = False) -> None:
+        """
+        Replaces all keys with the current key set, so that keys removed
+        from the key set are no longer accepted. Callers must hold
+        _load_lock.
+        """
+        with self._lock:
+            self._fetches += 1
+            if for_request:
+                self._request_fetches += 1
+        key_set = PyJWKSet.from_dict(self._read_jwks())
+        keys = {key.key_id: key for key in key_set.keys}
+        with self._lock:
+            self._keys = keys
+            self._loaded_at = time.monotonic()
+        for listener in self._reload_listeners:
+            listener(set(keys))
+
+    def refresh(self) -> None:
+        with self._load_lock:
+            self._load()
+
+    def _find(self, kid: str | None) -> PyJWK | None:
+        with self._lock:
+            if kid is None and len(self._keys) == 1:
+                return next(iter(self._keys.values()))
+            return self._keys.get(kid)
+
+    def _claim_request_refresh(self) -> bool:
+        """
+        Returns whether a request may refresh the keys now, and if so
+        starts a new cooldown. Must be called holding _lock.
+        """
+        now = time.monotonic()
+        if (
+            self._last_request_refresh is not None
+            and now - self._last_request_refresh < REFRESH_COOLDOWN_SECONDS
+        ):
+            return False
+        self._last_request_refresh = now
+        return True
+
+    def _refresh_for_unknown_kid(self, kid: str | None) -> None:
+        with self._load_lock:
+            # Loaded by another request while this one waited
+            if self._find(kid) is not None:
+                return
+            with self._lock:
+                is_loaded = self._loaded_at is not None
+                if is_loaded and not self._claim_request_refresh():
+                    return
+            if not is_loaded:
+                self._load(for_request=True)
+                return
+            try:
+                self._load(for_request=True)
+            except Exception as e:
+                logger.warning(f"Couldn't refresh signing keys: {str(e)}")
+
+    def _revalidate(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"Couldn't refresh signing keys: {str(e)}")
+
+    def _revalidate_if_stale(self) -> None:
+        with self._lock:
+            is_stale = (
+                self._loaded_at is not None
+                and time.monotonic() - self._loaded_at
+                >= self.refresh_interval_seconds
+            )
+            if not is_stale or not self._claim_request_refresh():
+                return
+        threading.Thread(
+            target=self._revalidate, name="signing-key-refresh", daemon=True
+        ).start()
+
+    def get_signing_key(self, kid: str | None) -> PyJWK:
+        with self._lock:
+            self._requests += 1
+        key = self._find(kid)
+        if key is None:
+            self._refresh_for_unknown_kid(kid)
+            key = self._find(kid)
+        if key is None:
+            raise AuthError(f"Unauthorized: Unknown signing key {kid}")
+        self._revalidate_if_stale()
+        return key
+
+    def stats(self) -> SigningKeyStats:
+        """
+        How many signing keys were requested, how many times the key set
+        was loaded, and how many of those loads requests waited for.
+        """
+        with self._lock:
+            return SigningKeyStats(
+                requests=self._requests,
+                fetches=self._fetches,
+                request_fetches=self._request_fetches,
+            )
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            wait_seconds = self.refresh_interval_seconds
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Couldn't refresh signing keys: {str(e)}")
+                wait_seconds = min(wait_seconds, REFRESH_COOLDOWN_SECONDS)
+            self._stop_event.wait(wait_seconds)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="signing-key-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
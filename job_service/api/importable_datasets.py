@@ -1,7 +1,17 @@
 import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from pydantic import Field
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
 
-from fastapi import APIRouter
 from job_service.adapter.local_storage import input_directory
+from job_service.adapter.local_storage.dataset_watcher import (
+    DatasetWatcher,
+    get_dataset_watcher,
+)
+from job_service.model.camelcase_model import CamelModel
 
 
 logger = logging.getLogger()
@@ -9,16 +19,103 @@ logger = logging.getLogger()
 router = APIRouter()
 
 
+class BulkImportableDatasetsRequest(CamelModel, extra="forbid"):
+    action: input_directory.BulkAction
+    dataset_names: List[str] = Field(min_length=1, max_length=1000)
+
+
 @router.get("/importable-datasets")
-def get_importable_datasets():
-    datasets = input_directory.get_importable_datasets()
+def get_importable_datasets(
+    response: Response,
+    prefix: str = Query(""),
+    includeArchived: bool = Query(True),
+    hasData: Optional[bool] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    watcher: DatasetWatcher = Depends(get_dataset_watcher),
+):
+    """
+    Returns the importable datasets, sorted by name with the live
+    datasets first. If there are more than limit datasets, the
+    X-Next-Cursor header holds the cursor of the next page.
+    """
+    datasets = watcher.datasets
+    if datasets is None:
+        datasets = input_directory.get_importable_datasets(
+            prefix=prefix, include_archived=includeArchived
+        )
+    datasets = input_directory.filter_importable_datasets(
+        datasets,
+        prefix=prefix,
+        include_archived=includeArchived,
+        has_data=hasData,
+    )
+    if cursor is not None:
+        datasets = input_directory.datasets_after_cursor(datasets, cursor)
+    if limit is not None and len(datasets) > limit:
+        datasets = datasets[:limit]
+        response.headers["X-Next-Cursor"] = input_directory.dataset_cursor(
+            datasets[-1]
+        )
     return [
-        dataset.model_dump(exclude_none=True, by_alias=True)
+        input_directory.with_checksum(dataset).model_dump(
+            exclude_none=True, by_alias=True
+        )
         for dataset in datasets
     ]
 
 
+@router.get("/importable-datasets/{dataset_name}/checksum")
+def get_importable_dataset_checksum(dataset_name: str):
+    checksum = input_directory.get_dataset_checksum(dataset_name)
+    return checksum.model_dump(exclude_none=True, by_alias=True)
+
+
 @router.delete("/importable-datasets/{dataset_name}")
-def delete_importable_datasets(dataset_name: str):
+def delete_importable_datasets(
+    dataset_name: str,
+    watcher: DatasetWatcher = Depends(get_dataset_watcher),
+):
     input_directory.delete_importable_datasets(dataset_name)
+    watcher.apply_changes(deleted=[dataset_name], archived=[])
     return {"message": f"OK, {dataset_name} deleted"}
+
+
+@router.post("/importable-datasets/bulk")
+def bulk_importable_datasets(
+    bulk_request: BulkImportableDatasetsRequest,
+    watcher: DatasetWatcher = Depends(get_dataset_watcher),
+):
+    """
+    Deletes or archives several datasets. Returns a result per dataset,
+    so that a missing dataset does not fail the whole request.
+    """
+    results = input_directory.apply_bulk_action(
+        bulk_request.action, bulk_request.dataset_names
+    )
+    watcher.apply_changes(
+        deleted=[
+            result.dataset_name
+            for result in results
+            if result.status == input_directory.BulkResultStatus.DELETED
+        ],
+        archived=[
+            result.dataset_name
+            for result in results
+            if result.status == input_directory.BulkResultStatus.ARCHIVED
+        ],
+    )
+    return [
+        result.model_dump(exclude_none=True, by_alias=True)
+        for result in results
+    ]
+
+
+@router.get("/importable-datasets/{dataset_name}/metadata")
+def get_importable_dataset_metadata(dataset_name: str):
+    chunks = input_directory.open_dataset_metadata(dataset_name)
+    return StreamingResponse(
+        chunks,
+        media_type="application/json",
+        background=BackgroundTask(chunks.close),
+    )
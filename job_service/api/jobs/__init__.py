@@ -1,13 +1,22 @@
 import logging
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from fastapi import APIRouter, Query, Cookie, Depends
+from fastapi import APIRouter, Query, Cookie, Depends, Header, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from job_service.adapter import auth
+from job_service.adapter.job_events import (
+    JobEventBroker,
+    JobEventType,
+    get_job_event_broker,
+)
 from job_service.config import environment
 from job_service.exceptions import BumpingDisabledException
 from job_service.adapter.db.models import JobStatus, Operation
 from job_service.api.jobs.models import (
+    ClaimJobRequest,
+    JobHeartbeatRequest,
     NewJobsRequest,
     UpdateJobRequest,
 )
@@ -17,6 +26,54 @@ logger = logging.getLogger()
 
 router = APIRouter()
 
+KEEP_ALIVE_SECONDS = 15
+
+
+async def _stream_job_events(
+    request: Request,
+    broker: JobEventBroker,
+    last_event_id: int,
+    job_id: str | None = None,
+    reset: bool = False,
+) -> AsyncIterator[str]:
+    if reset:
+        yield broker.reset_event(last_event_id).to_sse()
+    while not await request.is_disconnected():
+        version = broker.notifier.version
+        events = broker.events_after(last_event_id)
+        for event in events:
+            last_event_id = event.event_id
+            if job_id is None or event.job_id == job_id:
+                yield event.to_sse()
+        if not events and not await broker.notifier.wait(
+            KEEP_ALIVE_SECONDS, version
+        ):
+            yield ": keep-alive\n\n"
+
+
+def _event_stream_response(
+    request: Request,
+    broker: JobEventBroker,
+    last_event_id: str | None,
+    job_id: str | None = None,
+) -> StreamingResponse:
+    """
+    Streams the events after last_event_id. If the events after it are
+    not known, the stream starts with a reset event, and continues with
+    new events.
+    """
+    resume_after = None
+    if last_event_id is not None:
+        resume_after = broker.resume_after(last_event_id)
+    reset = last_event_id is not None and resume_after is None
+    if resume_after is None:
+        resume_after = broker.last_event_id
+    return StreamingResponse(
+        _stream_job_events(request, broker, resume_after, job_id, reset),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @router.get("/jobs")
 def get_jobs(
@@ -44,6 +101,7 @@ def new_job(
     user_info: str | None = Cookie(None, alias="user-info"),
     database_client: db.DatabaseClient = Depends(db.get_database_client),
     auth_client: auth.AuthClient = Depends(auth.get_auth_client),
+    broker: JobEventBroker = Depends(get_job_event_broker),
 ):
     parsed_user_info = auth_client.authorize_user(authorization, user_info)
     response_list = []
@@ -61,6 +119,11 @@ def new_job(
                 job = database_client.new_job(
                     job_request.generate_job_from_request("", parsed_user_info)
                 )
+                broker.publish(
+                    JobEventType.CREATED,
+                    job.job_id,
+                    job.model_dump(exclude_none=True, by_alias=True),
+                )
                 response_list.append(
                     {
                         "status": "queued",
@@ -69,6 +132,7 @@ def new_job(
                     }
                 )
             database_client.update_target(job)
+            broker.publish_target(job)
         except BumpingDisabledException as e:
             logger.exception(e)
             response_list.append(
@@ -83,6 +147,57 @@ def new_job(
     return response_list
 
 
+@router.post("/jobs/claim")
+def claim_job(
+    validated_body: ClaimJobRequest,
+    database_client: db.DatabaseClient = Depends(db.get_database_client),
+    broker: JobEventBroker = Depends(get_job_event_broker),
+):
+    """
+    Claims the oldest queued job matching the requested operations for
+    the calling worker. Responds with 204 if there is nothing to claim.
+    """
+    job = database_client.claim_job(
+        validated_body.worker_id,
+        validated_body.operations,
+        validated_body.lease_seconds,
+    )
+    if job is None:
+        return Response(status_code=204)
+    broker.publish_status(job)
+    database_client.update_target(job)
+    broker.publish_target(job)
+    return job.model_dump(exclude_none=True, by_alias=True)
+
+
+@router.get("/jobs/events")
+async def get_job_events(
+    request: Request,
+    last_event_id: str | None = Header(None, alias="Last-Event-ID"),
+    broker: JobEventBroker = Depends(get_job_event_broker),
+):
+    """
+    Server-Sent Events stream of job changes. Clients reconnecting with
+    a Last-Event-ID header get the buffered events they missed, or a
+    reset event if those are no longer known.
+    """
+    return _event_stream_response(request, broker, last_event_id)
+
+
+@router.get("/jobs/{job_id}/events")
+async def get_events_for_job(
+    job_id: str,
+    request: Request,
+    last_event_id: str | None = Header(None, alias="Last-Event-ID"),
+    database_client: db.DatabaseClient = Depends(db.get_database_client),
+    broker: JobEventBroker = Depends(get_job_event_broker),
+):
+    job = await run_in_threadpool(database_client.get_job, job_id)
+    return _event_stream_response(
+        request, broker, last_event_id, str(job.job_id)
+    )
+
+
 @router.get("/jobs/{job_id}")
 def get_job(
     job_id: str,
@@ -98,14 +213,40 @@ def update_job(
     job_id: str,
     validated_body: UpdateJobRequest,
     database_client: db.DatabaseClient = Depends(db.get_database_client),
+    broker: JobEventBroker = Depends(get_job_event_broker),
 ):
     job = database_client.update_job(
         job_id,
         validated_body.status,
         validated_body.description,
         validated_body.log,
+        validated_body.worker_id,
     )
+    if validated_body.status is not None:
+        broker.publish_status(job)
+    if validated_body.log is not None:
+        broker.publish(
+            JobEventType.LOG,
+            job.job_id,
+            {"jobId": job.job_id, "message": validated_body.log},
+        )
     database_client.update_target(job)
+    broker.publish_target(job)
     if job.parameters.target == "DATASTORE" and job.status == "completed":
         database_client.update_bump_targets(job)
     return {"message": f"Updated job with jobId {job_id}"}
+
+
+@router.put("/jobs/{job_id}/heartbeat")
+def heartbeat_job(
+    job_id: str,
+    validated_body: JobHeartbeatRequest,
+    database_client: db.DatabaseClient = Depends(db.get_database_client),
+):
+    job = database_client.heartbeat_job(
+        job_id, validated_body.worker_id, validated_body.lease_seconds
+    )
+    return {
+        "message": f"Extended lease for job with jobId {job_id}",
+        "leaseExpiresAt": job.lease_expires_at,
+    }
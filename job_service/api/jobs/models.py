@@ -1,11 +1,12 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import model_validator
+from pydantic import Field, model_validator
 
 from job_service.model.camelcase_model import CamelModel
 from job_service.adapter.db.models import JobStatus, Operation, ReleaseStatus
 from job_service.adapter.db.models import (
+    DEFAULT_OPERATION_PRIORITY,
     DatastoreVersion,
     Job,
     JobParameters,
@@ -21,6 +22,7 @@ class NewJobRequest(CamelModel, extra="forbid", use_enum_values=True):
     bump_manifesto: Optional[DatastoreVersion] = None
     bump_from_version: Optional[str] = None
     bump_to_version: Optional[str] = None
+    priority: Optional[int] = Field(default=None, ge=0, le=100)
 
     @model_validator(mode="after")
     def check_command_type(self: "NewJobRequest"):  # pylint: disable=no-self-argument
@@ -83,6 +85,11 @@ class NewJobRequest(CamelModel, extra="forbid", use_enum_values=True):
             parameters=job_parameters,
             created_at=datetime.now().isoformat(),
             created_by=user_info,
+            priority=(
+                self.priority
+                if self.priority is not None
+                else DEFAULT_OPERATION_PRIORITY[Operation(self.operation)]
+            ),
         )
 
 
@@ -94,3 +101,17 @@ class UpdateJobRequest(CamelModel, extra="forbid"):
     status: Optional[JobStatus] = None
     description: Optional[str] = None
     log: Optional[str] = None
+    # Set by workers that claimed the job, to check that they still
+    # hold the lease
+    worker_id: Optional[str] = Field(default=None, min_length=1)
+
+
+class ClaimJobRequest(CamelModel, extra="forbid"):
+    worker_id: str = Field(min_length=1)
+    operations: Optional[List[Operation]] = None
+    lease_seconds: int = Field(default=300, gt=0, le=24 * 60 * 60)
+
+
+class JobHeartbeatRequest(CamelModel, extra="forbid"):
+    worker_id: str = Field(min_length=1)
+    lease_seconds: int = Field(default=300, gt=0, le=24 * 60 * 60)
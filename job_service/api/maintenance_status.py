@@ -1,19 +1,44 @@
+import asyncio
 import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from starlette.concurrency import run_in_threadpool
 
-from fastapi import APIRouter, Depends
 from job_service.adapter import db
+from job_service.adapter.notifier import ChangeNotifier
+from job_service.config import environment
 from job_service.model.camelcase_model import CamelModel
 
 logger = logging.getLogger()
 
 router = APIRouter()
 
+MAX_WAIT_SECONDS = 60
+
+maintenance_status_notifier = ChangeNotifier()
+
 
 class MaintenanceStatusRequest(CamelModel, extra="forbid"):
     msg: str
     paused: bool
 
 
+def _as_naive_datetime(timestamp: datetime | str) -> datetime:
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+def _changed_after(document: dict, after: datetime) -> bool:
+    return _as_naive_datetime(document["timestamp"]) > _as_naive_datetime(
+        after
+    )
+
+
 @router.post("/maintenance-status")
 def set_status(
     maintenance_status_request: MaintenanceStatusRequest,
@@ -22,14 +47,44 @@ def set_status(
     new_status = database_client.set_maintenance_status(
         maintenance_status_request.msg, maintenance_status_request.paused
     )
+    maintenance_status_notifier.notify_all()
+    retention_days = environment.get("MAINTENANCE_HISTORY_RETENTION_DAYS")
+    if retention_days > 0:
+        database_client.compact_maintenance_history(
+            datetime.now() - timedelta(days=retention_days)
+        )
     return new_status
 
 
 @router.get("/maintenance-status")
-def get_status(
+async def get_status(
+    waitForChangeAfter: Optional[datetime] = Query(None),
+    timeout: float = Query(30, ge=0, le=MAX_WAIT_SECONDS),
     database_client: db.DatabaseClient = Depends(db.get_database_client),
 ):
-    document = database_client.get_latest_maintenance_status()
+    """
+    Returns the latest maintenance status. If waitForChangeAfter is
+    given, the request is held until a status newer than that timestamp
+    is set, or until the timeout (in seconds) expires.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    version = maintenance_status_notifier.version
+    document = await run_in_threadpool(
+        database_client.get_latest_maintenance_status
+    )
+    while waitForChangeAfter is not None and not _changed_after(
+        document, waitForChangeAfter
+    ):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        if not await maintenance_status_notifier.wait(remaining, version):
+            break
+        version = maintenance_status_notifier.version
+        document = await run_in_threadpool(
+            database_client.get_latest_maintenance_status
+        )
     if "paused" in document and document["paused"]:
         logger.info(
             f"GET /maintenance-status, paused: {document['paused']}, msg: {document['msg']}"
@@ -39,7 +94,14 @@ def get_status(
 
 @router.get("/maintenance-history")
 def get_history(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    before: Optional[datetime] = Query(None),
+    after: Optional[datetime] = Query(None),
     database_client: db.DatabaseClient = Depends(db.get_database_client),
 ):
-    documents = database_client.get_maintenance_history()
+    documents = database_client.get_maintenance_history(
+        limit=limit,
+        before=_as_naive_datetime(before) if before else None,
+        after=_as_naive_datetime(after) if after else None,
+    )
     return documents
@@ -1,4 +1,5 @@
 import logging
+from contextlib import asynccontextmanager
 
 from starlette.status import HTTP_400_BAD_REQUEST
 from fastapi import FastAPI, Request
@@ -11,26 +12,57 @@ from job_service.api import targets
 from job_service.api import importable_datasets
 from job_service.api import maintenance_status
 from job_service.api import observability
+from job_service.adapter import auth
+from job_service.adapter.lease_sweeper import LeaseSweeper
+from job_service.adapter.local_storage.dataset_watcher import (
+    get_dataset_watcher,
+)
+from job_service.config import environment
 from job_service.exceptions import (
     AuthError,
     InternalServerError,
     JobExistsException,
+    JobLeaseException,
     NotFoundException,
+    OperationQuotaExceededException,
     NameValidationError,
 )
+from job_service.config.compression import setup_compression
 from job_service.config.logging import setup_logging
 
 
 logger = logging.getLogger()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    log_handler.start()
+    lease_sweeper = LeaseSweeper(
+        environment.get("LEASE_SWEEP_INTERVAL_SECONDS"),
+        environment.get("MAX_JOB_CLAIMS"),
+    )
+    lease_sweeper.start()
+    dataset_watcher = get_dataset_watcher()
+    dataset_watcher.start()
+    signing_keys = auth.get_auth_client().signing_keys
+    if environment.get("JWT_AUTH"):
+        signing_keys.start()
+    yield
+    signing_keys.stop()
+    dataset_watcher.stop()
+    lease_sweeper.stop()
+    log_handler.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(jobs.router)
 app.include_router(importable_datasets.router)
 app.include_router(targets.router)
 app.include_router(maintenance_status.router)
 app.include_router(observability.router)
 
-setup_logging(app)
+log_handler = setup_logging(app)
+setup_compression(app)
 
 
 @app.exception_handler(NotFoundException)
@@ -51,6 +83,20 @@ def handle_job_exists(_req: Request, e: JobExistsException):
     return JSONResponse(status_code=400, content={"message": str(e)})
 
 
+@app.exception_handler(JobLeaseException)
+def handle_job_lease_error(_req: Request, e: JobLeaseException):
+    logger.warning(e, exc_info=True)
+    return JSONResponse(status_code=409, content={"message": str(e)})
+
+
+@app.exception_handler(OperationQuotaExceededException)
+def handle_operation_quota_exceeded(
+    _req: Request, e: OperationQuotaExceededException
+):
+    logger.warning(e, exc_info=True)
+    return JSONResponse(status_code=409, content={"message": str(e)})
+
+
 @app.exception_handler(AuthError)
 def handle_auth_error(_req: Request, e: AuthError):
     logger.warning(e, exc_info=True)
@@ -0,0 +1,93 @@
+import zlib
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class DeflateResponder(IdentityResponder):
+    content_encoding = "deflate"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, compresslevel: int):
+        super().__init__(app, minimum_size)
+        self.compressor = zlib.compressobj(compresslevel)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.compress(body)
+        if not more_body:
+            compressed += self.compressor.flush()
+        return compressed
+
+
+def _preferred_encoding(accept_encoding: str) -> str | None:
+    """
+    Picks gzip or deflate from an Accept-Encoding header, honouring
+    q-values. Returns None if neither is accepted.
+    """
+    accepted = {}
+    for entry in accept_encoding.lower().split(","):
+        encoding, *params = [part.strip() for part in entry.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[encoding] = quality
+    candidates = [
+        (accepted.get(encoding, accepted.get("*", 0.0)), encoding)
+        for encoding in ["deflate", "gzip"]
+    ]
+    quality, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with gzip or deflate, depending on what the
+    client accepts. Responses smaller than minimum_size, event streams
+    and requests to excluded path prefixes are sent uncompressed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        compresslevel: int = 5,
+        excluded_paths: tuple[str, ...] = (),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(
+            self.excluded_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        encoding = _preferred_encoding(
+            Headers(scope=scope).get("Accept-Encoding", "")
+        )
+        if encoding == "gzip":
+            responder = GZipResponder(
+                self.app, self.minimum_size, compresslevel=self.compresslevel
+            )
+        elif encoding == "deflate":
+            responder = DeflateResponder(
+                self.app, self.minimum_size, self.compresslevel
+            )
+        else:
+            responder = self.app
+        await responder(scope, receive, send)
+
+
+def setup_compression(app, minimum_size: int = 1000, compresslevel: int = 5):
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=minimum_size,
+        compresslevel=compresslevel,
+        excluded_paths=("/health",),
+    )
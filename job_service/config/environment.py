@@ -1,11 +1,39 @@
 import os
 
 
+def _parse_operation_limits(value: str) -> dict[str, int]:
+    """
+    Parses limits on the form "ADD=2,CHANGE=2,BUMP=1".
+    """
+    limits = {}
+    for entry in value.split(","):
+        if entry.strip():
+            operation, limit = entry.split("=")
+            limits[operation.strip()] = int(limit)
+    return limits
+
+
+def _parse_sample_rates(value: str) -> dict[str, float]:
+    """
+    Parses sample rates on the form "/health/alive=0,/jobs=0.1".
+    """
+    rates = {}
+    for entry in value.split(","):
+        if entry.strip():
+            route, rate = entry.split("=")
+            rates[route.strip()] = float(rate)
+    return rates
+
+
 def _initialize_environment() -> dict:
     return {
         "INPUT_DIR": os.environ["INPUT_DIR"],
         "SQLITE_URL": os.environ["SQLITE_URL"],
         "JWKS_URL": os.environ["JWKS_URL"],
+        "JWKS_FILE": os.environ.get("JWKS_FILE"),
+        "JWKS_REFRESH_INTERVAL_SECONDS": float(
+            os.environ.get("JWKS_REFRESH_INTERVAL_SECONDS", "3000")
+        ),
         "DOCKER_HOST_NAME": os.environ["DOCKER_HOST_NAME"],
         "STACK": os.environ["STACK"],
         "JWT_AUTH": (
@@ -17,6 +45,46 @@ def _initialize_environment() -> dict:
             else False
         ),
         "COMMIT_ID": os.environ["COMMIT_ID"],
+        "LEASE_SWEEP_INTERVAL_SECONDS": float(
+            os.environ.get("LEASE_SWEEP_INTERVAL_SECONDS", "30")
+        ),
+        "MAX_JOB_CLAIMS": int(os.environ.get("MAX_JOB_CLAIMS", "3")),
+        "MAINTENANCE_HISTORY_RETENTION_DAYS": int(
+            os.environ.get("MAINTENANCE_HISTORY_RETENTION_DAYS", "0")
+        ),
+        "DATASET_PROBE_WORKERS": int(
+            os.environ.get("DATASET_PROBE_WORKERS", "8")
+        ),
+        "DATASET_PROBE_TIMEOUT_SECONDS": float(
+            os.environ.get("DATASET_PROBE_TIMEOUT_SECONDS", "10")
+        ),
+        "DATASET_UPLOAD_SETTLE_SECONDS": float(
+            os.environ.get("DATASET_UPLOAD_SETTLE_SECONDS", "30")
+        ),
+        "DATASET_CHECKSUM_WORKERS": int(
+            os.environ.get("DATASET_CHECKSUM_WORKERS", "2")
+        ),
+        "DATASET_WATCH_INTERVAL_SECONDS": float(
+            os.environ.get("DATASET_WATCH_INTERVAL_SECONDS", "30")
+        ),
+        "AUTH_TOKEN_CACHE_SIZE": int(
+            os.environ.get("AUTH_TOKEN_CACHE_SIZE", "1024")
+        ),
+        "LOG_QUEUE_SIZE": int(os.environ.get("LOG_QUEUE_SIZE", "10000")),
+        "ACCESS_LOG_SAMPLE_RATES": _parse_sample_rates(
+            os.environ.get(
+                "ACCESS_LOG_SAMPLE_RATES", "/health/alive=0,/health/ready=0"
+            )
+        ),
+        "ACCESS_LOG_SLOW_MS": int(
+            os.environ.get("ACCESS_LOG_SLOW_MS", "1000")
+        ),
+        "ACCESS_LOG_SUMMARY_INTERVAL_SECONDS": float(
+            os.environ.get("ACCESS_LOG_SUMMARY_INTERVAL_SECONDS", "60")
+        ),
+        "OPERATION_CONCURRENCY_LIMITS": _parse_operation_limits(
+            os.environ.get("OPERATION_CONCURRENCY_LIMITS", "")
+        ),
     }
 
 
@@ -1,10 +1,15 @@
 import re
 import sys
+import copy
 import uuid
 import json
+import queue
+import random
 import logging
+import threading
 import datetime
-from time import perf_counter_ns
+from logging.handlers import QueueHandler, QueueListener
+from time import monotonic, perf_counter_ns
 from typing import Callable
 
 from fastapi import Request
@@ -22,6 +27,17 @@ response_status: ContextVar[int] = ContextVar("response_status")
 response_time_ms: ContextVar[int] = ContextVar("response_time_ms")
 
 
+def _request_context() -> dict:
+    return {
+        "method": method.get(""),
+        "responseTime": response_time_ms.get(""),
+        "source_host": remote_host.get(""),
+        "statusCode": response_status.get(""),
+        "url": url.get(""),
+        "xRequestId": re.sub(r"[^\w\-]", "", correlation_id.get("")),
+    }
+
+
 class MicrodataJSONFormatter(logging.Formatter):
     def __init__(self):
         self.host = environment.get("DOCKER_HOST_NAME")
@@ -32,6 +48,10 @@ class MicrodataJSONFormatter(logging.Formatter):
         stack_trace = ""
         if record.exc_info is not None:
             stack_trace = self.formatException(record.exc_info)
+        # Records from the log queue carry the context of their request
+        context = getattr(record, "request_context", None)
+        if context is None:
+            context = _request_context()
         return json.dumps(
             {
                 "@timestamp": datetime.datetime.fromtimestamp(
@@ -46,21 +66,184 @@ class MicrodataJSONFormatter(logging.Formatter):
                 "level": record.levelno,
                 "levelName": record.levelname,
                 "loggerName": record.name,
-                "method": method.get(""),
-                "responseTime": response_time_ms.get(""),
+                "method": context["method"],
+                "responseTime": context["responseTime"],
                 "schemaVersion": "v3",
                 "serviceName": "job-service",
                 "serviceVersion": self.commit_id,
-                "source_host": remote_host.get(""),
-                "statusCode": response_status.get(""),
+                "source_host": context["source_host"],
+                "statusCode": context["statusCode"],
                 "thread": record.threadName,
-                "url": url.get(""),
-                "xRequestId": re.sub(r"[^\w\-]", "", correlation_id.get("")),
+                "url": context["url"],
+                "xRequestId": context["xRequestId"],
             }
         )
 
 
-def setup_logging(app, log_level=logging.INFO):
+class _LogQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Waits for room in the bounded queue, so that no records are
+        # dropped on shutdown
+        self.queue.put(self._sentinel)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Puts log records on a bounded queue that a listener thread writes
+    with target, so that requests do not wait for slow log consumers.
+    Records are dropped and counted when the queue is full. While the
+    listener is not running records are written directly, since the
+    app is loaded before gunicorn forks the worker processes and
+    threads do not survive the fork.
+    """
+
+    target: logging.Handler
+    dropped: int
+    _unreported_drops: int
+    _listener: QueueListener | None
+
+    def __init__(self, target: logging.Handler, max_size: int):
+        super().__init__(queue.Queue(max_size))
+        self.target = target
+        self.dropped = 0
+        self._unreported_drops = 0
+        self._listener = None
+
+    def start(self) -> None:
+        with self.lock:
+            if self._listener is not None:
+                return
+            self._listener = _LogQueueListener(self.queue, self.target)
+            self._listener.start()
+
+    def stop(self) -> None:
+        """
+        Writes the queued records and stops the listener.
+        """
+        with self.lock:
+            listener = self._listener
+            self._listener = None
+        if listener is not None:
+            listener.stop()
+        self.target.flush()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Copies the request context and the message to the record, as
+        they are not available in the listener thread. Exceptions are
+        formatted by the listener.
+        """
+        record = copy.copy(record)
+        record.request_context = _request_context()
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def _drop_report(self) -> logging.LogRecord:
+        record = logging.LogRecord(
+            name="root",
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg=(
+                f"Dropped {self._unreported_drops} log records, "
+                "the log queue was full"
+            ),
+            args=None,
+            exc_info=None,
+        )
+        return self.prepare(record)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._listener is None:
+            self.target.handle(record)
+            return
+        try:
+            prepared = self.prepare(record)
+            # The drop counters are shared by all request threads
+            with self.lock:
+                if self._unreported_drops:
+                    self.queue.put_nowait(self._drop_report())
+                    self._unreported_drops = 0
+                self.queue.put_nowait(prepared)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+                self._unreported_drops += 1
+        except Exception:
+            self.handleError(record)
+
+
+class AccessLogSampler:
+    """
+    Decides which requests get a "responded" log line. Requests to a
+    route are logged with the sample rate configured for it, 1.0 if
+    none is. Failed and slow requests are always logged. Suppressed
+    lines are counted per route, and summarized every
+    summary_interval_seconds.
+    """
+
+    sample_rates: dict[str, float]
+    slow_ms: int
+    summary_interval_seconds: float
+    _lock: threading.Lock
+    _suppressed: dict[str, int]
+    _summarized_at: float
+
+    def __init__(
+        self,
+        sample_rates: dict[str, float],
+        slow_ms: int,
+        summary_interval_seconds: float,
+    ):
+        self.sample_rates = sample_rates
+        self.slow_ms = slow_ms
+        self.summary_interval_seconds = summary_interval_seconds
+        self._lock = threading.Lock()
+        self._suppressed = {}
+        self._summarized_at = monotonic()
+
+    def should_log(self, route: str, status_code: int, time_ms: int) -> bool:
+        if status_code >= 400 or time_ms >= self.slow_ms:
+            return True
+        sample_rate = self.sample_rates.get(route, 1.0)
+        if sample_rate >= 1.0 or random.random() < sample_rate:
+            return True
+        with self._lock:
+            self._suppressed[route] = self._suppressed.get(route, 0) + 1
+        return False
+
+    def take_summaries(self) -> list[str]:
+        """
+        Returns a summary line per route with suppressed log lines, if
+        the summary interval has passed, and starts a new interval.
+        """
+        with self._lock:
+            elapsed = monotonic() - self._summarized_at
+            if elapsed < self.summary_interval_seconds:
+                return []
+            suppressed = self._suppressed
+            self._suppressed = {}
+            self._summarized_at = monotonic()
+        return [
+            f"Suppressed {count} access log lines for {route} "
+            f"in the last {elapsed:.0f} seconds"
+            for route, count in sorted(suppressed.items())
+        ]
+
+
+def _route_path(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", request.url.path)
+
+
+def setup_logging(app, log_level=logging.INFO) -> QueueLogHandler:
+    """
+    Sets up JSON logging and the request logging middleware. Returns
+    the log handler, whose listener must be started in each process
+    that serves requests.
+    """
     logger = logging.getLogger()
     logger.setLevel(log_level)
 
@@ -68,10 +251,23 @@ def setup_logging(app, log_level=logging.INFO):
 
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+    queue_handler = QueueLogHandler(
+        stream_handler, environment.get("LOG_QUEUE_SIZE")
+    )
+    logger.addHandler(queue_handler)
+
+    access_log_sampler = AccessLogSampler(
+        environment.get("ACCESS_LOG_SAMPLE_RATES"),
+        environment.get("ACCESS_LOG_SLOW_MS"),
+        environment.get("ACCESS_LOG_SUMMARY_INTERVAL_SECONDS"),
+    )
 
     @app.middleware("http")
     async def add_process_time_header(request: Request, call_next: Callable):
+        # Logged before the request context is set, as the summaries
+        # are not about this request
+        for summary in access_log_sampler.take_summaries():
+            logger.info(summary)
         request_start_time.set(perf_counter_ns())
         corr_id = request.headers.get("X-Request-ID", None)
         if corr_id is None:
@@ -94,5 +290,10 @@ def setup_logging(app, log_level=logging.INFO):
         response_time_ms.set(response_time)
         response_status.set(response.status_code)
         response.headers["X-Request-ID"] = correlation_id.get()
-        logger.info("responded")
+        if access_log_sampler.should_log(
+            _route_path(request), response.status_code, response_time
+        ):
+            logger.info("responded")
         return response
+
+    return queue_handler
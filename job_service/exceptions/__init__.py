@@ -7,6 +7,12 @@ class JobExistsException(Exception): ...
 class JobAlreadyCompleteException(Exception): ...
 
 
+class JobLeaseException(Exception): ...
+
+
+class OperationQuotaExceededException(Exception): ...
+
+
 class NoSuchImportableDataset(Exception): ...
 
 
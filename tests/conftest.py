@@ -10,6 +10,7 @@ os.environ["DOCKER_HOST_NAME"] = "localhost"
 os.environ["STACK"] = "local"
 os.environ["BUMP_ENABLED"] = "true"
 os.environ["COMMIT_ID"] = "abc123"
+os.environ["DATASET_UPLOAD_SETTLE_SECONDS"] = "0"
 os.environ["MIGRATION_CONFIG_PATH"] = "tests/resources/migration_config.json"
 
 
@@ -1,18 +1,23 @@
 import os
 import json
 import sqlite3
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 import pytest
 from pytest_mock import MockFixture
 
 from job_service.adapter.db.sqlite import (
     JobAlreadyCompleteException,
+    JobLeaseException,
     NotFoundException,
+    OperationQuotaExceededException,
     SqliteDbClient,
     JobExistsException,
 )
 from job_service.adapter.db.models import (
+    DatasetProbe,
     Job,
     JobStatus,
     Operation,
@@ -157,8 +162,8 @@ def setup_function():
     )
     cursor.execute(
         """
-        INSERT INTO job (target, datastore_id, status, created_at, created_by, parameters)
-        VALUES (?, ?, ?, ?, ?, ?)
+        INSERT INTO job (target, datastore_id, status, created_at, created_by, parameters, operation)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
         """,
         (
             JOB["parameters"]["target"],
@@ -167,6 +172,7 @@ def setup_function():
             JOB["created_at"],
             json.dumps(JOB["created_by"]),
             json.dumps(JOB["parameters"]),
+            JOB["parameters"]["operation"],
         ),
     )
     job_id = cursor.lastrowid
@@ -184,8 +190,8 @@ def setup_function():
         )
     cursor.execute(
         """
-        INSERT INTO job (target, datastore_id, status, created_at, created_by, parameters)
-        VALUES (?, ?, ?, ?, ?, ?)
+        INSERT INTO job (target, datastore_id, status, created_at, created_by, parameters, operation)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
     """,
         (
             JOB2["parameters"]["target"],
@@ -194,6 +200,7 @@ def setup_function():
             JOB2["created_at"],
             json.dumps(JOB2["created_by"]),
             json.dumps(JOB2["parameters"]),
+            JOB2["parameters"]["operation"],
         ),
     )
     for target in TARGET_LIST:
@@ -286,6 +293,310 @@ def test_update_job():
         )
 
 
+def test_claim_job():
+    assert (
+        sqlite_client.claim_job(
+            "worker-1", operations=[Operation.CHANGE], lease_seconds=60
+        )
+        is None
+    )
+    claimed_job = sqlite_client.claim_job(
+        "worker-1", operations=[Operation.ADD], lease_seconds=60
+    )
+    assert claimed_job
+    assert claimed_job.job_id == "2"
+    assert claimed_job.status == "initiated"
+    assert claimed_job.worker_id == "worker-1"
+    assert (
+        datetime.fromisoformat(claimed_job.lease_expires_at) > datetime.now()
+    )
+    assert (claimed_job.log or [])[0].message == (
+        "Set status: initiated, claimed by worker worker-1"
+    )
+    assert claimed_job == sqlite_client.get_job(2)
+    assert (
+        sqlite_client.claim_job("worker-2", operations=None, lease_seconds=60)
+        is None
+    )
+
+
+def _new_job(
+    operation: Operation,
+    target: str,
+    user_id: str = "123-123-123",
+    **kwargs,
+) -> Job:
+    return sqlite_client.new_job(
+        NewJobRequest(
+            operation=operation, target=target, **kwargs
+        ).generate_job_from_request(
+            "", UserInfo(**{**USER_INFO_DICT, "userId": user_id})
+        )
+    )
+
+
+def test_claim_job_by_priority():
+    add_job = _new_job(Operation.ADD, "NEW_DATASET")
+    set_status_job = _new_job(
+        Operation.SET_STATUS,
+        "OTHER_NEW_DATASET",
+        release_status="PENDING_RELEASE",
+    )
+    assert set_status_job.priority > add_job.priority
+    claimed_job = sqlite_client.claim_job(
+        "worker-1", operations=None, lease_seconds=60
+    )
+    assert claimed_job.job_id == set_status_job.job_id
+
+
+def test_claim_job_aging():
+    conn = sqlite3.connect(sqlite_file)
+    conn.execute(
+        "UPDATE job SET created_at = ?, priority = 0 WHERE job_id = 2",
+        (datetime.now() - timedelta(days=1),),
+    )
+    conn.commit()
+    conn.close()
+    _new_job(Operation.PATCH_METADATA, "NEW_DATASET")
+    claimed_job = sqlite_client.claim_job(
+        "worker-1", operations=None, lease_seconds=60
+    )
+    assert claimed_job.job_id == "2"
+
+
+def test_claim_job_aging_within_user_queue():
+    old_job = _new_job(Operation.ADD, "NEW_DATASET", "user")
+    new_job = _new_job(Operation.ADD, "OTHER_NEW_DATASET", "user")
+    conn = sqlite3.connect(sqlite_file)
+    conn.execute(
+        "UPDATE job SET created_at = ?, priority = 0 WHERE job_id = ?",
+        (datetime.now() - timedelta(days=1), int(old_job.job_id)),
+    )
+    conn.commit()
+    conn.close()
+    assert new_job.priority > 0
+    claimed_job = sqlite_client.claim_job(
+        "worker-1", operations=[Operation.ADD], lease_seconds=60
+    )
+    assert claimed_job.job_id == old_job.job_id
+
+
+def _user_in_progress() -> dict[str, int]:
+    conn = sqlite3.connect(sqlite_file)
+    counts = dict(
+        conn.execute("SELECT submitted_by, in_progress FROM user_in_progress")
+    )
+    conn.close()
+    return counts
+
+
+def test_user_in_progress_counts():
+    user_job = _new_job(Operation.PATCH_METADATA, "NEW_DATASET", "user")
+    claimed_job = sqlite_client.claim_job(
+        "worker-1", operations=[Operation.PATCH_METADATA], lease_seconds=60
+    )
+    assert claimed_job.job_id == user_job.job_id
+    assert _user_in_progress()["user"] == 1
+    sqlite_client.update_job(
+        user_job.job_id,
+        status=JobStatus("completed"),
+        description=None,
+        log=None,
+    )
+    assert _user_in_progress()["user"] == 0
+
+
+def test_claim_job_fair_across_users():
+    busy_user_job = _new_job(Operation.ADD, "NEW_DATASET", "busy-user")
+    _new_job(Operation.ADD, "OTHER_NEW_DATASET", "busy-user")
+    other_user_job = _new_job(Operation.ADD, "THIRD_DATASET", "other-user")
+    claimed_job = sqlite_client.claim_job(
+        "worker-1", operations=[Operation.ADD], lease_seconds=60
+    )
+    assert claimed_job.job_id == busy_user_job.job_id
+    claimed_job = sqlite_client.claim_job(
+        "worker-2", operations=[Operation.ADD], lease_seconds=60
+    )
+    assert claimed_job.job_id == other_user_job.job_id
+
+
+def test_operation_concurrency_limits():
+    limited_client = SqliteDbClient(f"sqlite://{sqlite_file}", {"ADD": 1})
+    claimed_job = limited_client.claim_job(
+        "worker-1", operations=[Operation.ADD], lease_seconds=60
+    )
+    assert claimed_job.job_id == "2"
+    waiting_job = _new_job(Operation.ADD, "NEW_DATASET")
+    assert (
+        limited_client.claim_job(
+            "worker-1", operations=[Operation.ADD], lease_seconds=60
+        )
+        is None
+    )
+    assert limited_client.get_job(waiting_job.job_id).wait_reason == (
+        "Waiting for a free ADD slot: 1 of 1 ADD jobs in progress"
+    )
+    with pytest.raises(OperationQuotaExceededException):
+        limited_client.update_job(
+            waiting_job.job_id,
+            status=JobStatus("validating"),
+            description=None,
+            log=None,
+        )
+
+    limited_client.update_job(
+        "2", status=JobStatus("completed"), description=None, log=None
+    )
+    assert limited_client.get_job(waiting_job.job_id).wait_reason is None
+    claimed_job = limited_client.claim_job(
+        "worker-1", operations=[Operation.ADD], lease_seconds=60
+    )
+    assert claimed_job.job_id == waiting_job.job_id
+
+
+def test_heartbeat_job():
+    claimed_job = sqlite_client.claim_job(
+        "worker-1", operations=None, lease_seconds=1
+    )
+    assert claimed_job
+    job = sqlite_client.heartbeat_job("2", "worker-1", lease_seconds=600)
+    assert job.lease_expires_at > claimed_job.lease_expires_at
+
+    with pytest.raises(JobLeaseException):
+        sqlite_client.heartbeat_job("2", "worker-2", lease_seconds=600)
+    with pytest.raises(JobLeaseException):
+        sqlite_client.heartbeat_job("1", "worker-1", lease_seconds=600)
+    with pytest.raises(NotFoundException):
+        sqlite_client.heartbeat_job("33", "worker-1", lease_seconds=600)
+
+    sqlite_client.update_job(
+        "2", status=JobStatus("completed"), description=None, log=None
+    )
+    with pytest.raises(JobLeaseException):
+        sqlite_client.heartbeat_job("2", "worker-1", lease_seconds=600)
+
+
+def _expire_lease(job_id: int):
+    conn = sqlite3.connect(sqlite_file)
+    conn.execute(
+        "UPDATE job SET lease_expires_at = ? WHERE job_id = ?",
+        (datetime(2000, 1, 1).isoformat(), job_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_requeue_expired_jobs():
+    sqlite_client.claim_job("worker-1", operations=None, lease_seconds=600)
+    assert sqlite_client.requeue_expired_jobs(max_claims=2) == []
+
+    _expire_lease(2)
+    released_jobs = sqlite_client.requeue_expired_jobs(max_claims=2)
+    assert len(released_jobs) == 1
+    assert released_jobs[0].status == "queued"
+    assert released_jobs[0].worker_id is None
+    assert released_jobs[0].lease_expires_at is None
+
+    sqlite_client.claim_job("worker-2", operations=None, lease_seconds=600)
+    _expire_lease(2)
+    released_jobs = sqlite_client.requeue_expired_jobs(max_claims=2)
+    assert len(released_jobs) == 1
+    assert released_jobs[0].status == "failed"
+    assert (released_jobs[0].log or [])[-1].message == (
+        "Lease for worker worker-2 expired after 2 claims. Set status: failed"
+    )
+
+
+def test_update_job_checks_lease():
+    sqlite_client.claim_job("worker-1", operations=None, lease_seconds=600)
+    job = sqlite_client.update_job(
+        "2", JobStatus("decrypting"), None, None, worker_id="worker-1"
+    )
+    assert job.status == "decrypting"
+    with pytest.raises(JobLeaseException):
+        sqlite_client.update_job(
+            "2", JobStatus("validating"), None, None, worker_id="worker-2"
+        )
+
+    # A requeued job can not be moved on by the worker that lost it
+    _expire_lease(2)
+    sqlite_client.requeue_expired_jobs(max_claims=2)
+    with pytest.raises(JobLeaseException):
+        sqlite_client.update_job(
+            "2", JobStatus("validating"), None, None, worker_id="worker-1"
+        )
+    assert sqlite_client.get_job("2").status == "queued"
+
+
+def test_update_job_to_queued_releases_lease():
+    sqlite_client.claim_job("worker-1", operations=None, lease_seconds=600)
+    job = sqlite_client.update_job("2", JobStatus("queued"), None, None)
+    assert job.worker_id is None
+    assert job.lease_expires_at is None
+    claimed_job = sqlite_client.claim_job(
+        "worker-2", operations=None, lease_seconds=600
+    )
+    assert claimed_job.job_id == "2"
+
+
+def _create_old_job_table():
+    os.remove(sqlite_file)
+    conn = sqlite3.connect(sqlite_file)
+    conn.execute("""
+        CREATE TABLE job (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target TEXT,
+            datastore_id INTEGER,
+            status TEXT,
+            created_at TIMESTAMP,
+            created_by TEXT,
+            parameters TEXT
+        )
+    """)
+    conn.execute(
+        """
+        INSERT INTO job (target, datastore_id, status, created_at, created_by, parameters)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            JOB2["parameters"]["target"],
+            1,
+            JOB2["status"],
+            JOB2["created_at"],
+            json.dumps(JOB2["created_by"]),
+            json.dumps(JOB2["parameters"]),
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_schema_migration_adds_job_columns():
+    _create_old_job_table()
+    migrated_client = SqliteDbClient(f"sqlite://{sqlite_file}")
+    claimed_job = migrated_client.claim_job(
+        "worker-1", operations=[Operation.ADD], lease_seconds=60
+    )
+    assert claimed_job
+    assert claimed_job.worker_id == "worker-1"
+
+
+def test_concurrent_schema_migration():
+    _create_old_job_table()
+    barrier = threading.Barrier(8)
+
+    def create_client():
+        barrier.wait()
+        return SqliteDbClient(f"sqlite://{sqlite_file}")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: create_client(), range(8)))
+    claimed_job = clients[0].claim_job(
+        "worker-1", operations=[Operation.ADD], lease_seconds=60
+    )
+    assert claimed_job.parameters.operation == Operation.ADD
+
+
 def test_new_job_different_created_at():
     job1 = NewJobRequest(
         operation=Operation.ADD, target="NEW_DATASET"
@@ -371,6 +682,48 @@ def test_set_and_get_maintenance_status():
     ]
 
 
+def test_get_maintenance_history_paging():
+    statuses = [
+        sqlite_client.set_maintenance_status(msg=f"test{i}", paused=False)
+        for i in range(5)
+    ]
+    newest_first = list(reversed(statuses))
+    assert sqlite_client.get_maintenance_history(limit=2) == newest_first[:2]
+    assert (
+        sqlite_client.get_maintenance_history(
+            limit=2, before=newest_first[1]["timestamp"]
+        )
+        == newest_first[2:4]
+    )
+    assert (
+        sqlite_client.get_maintenance_history(
+            after=newest_first[2]["timestamp"]
+        )
+        == newest_first[:2]
+    )
+    assert (
+        sqlite_client.get_maintenance_history(
+            after=newest_first[0]["timestamp"]
+        )
+        == []
+    )
+
+
+def test_compact_maintenance_history():
+    for i in range(3):
+        sqlite_client.set_maintenance_status(msg=f"test{i}", paused=False)
+    assert sqlite_client.compact_maintenance_history(datetime(2000, 1, 1)) == 0
+    assert (
+        sqlite_client.compact_maintenance_history(
+            datetime.now() + timedelta(days=1)
+        )
+        == 2
+    )
+    history = sqlite_client.get_maintenance_history()
+    assert len(history) == 1
+    assert history[0]["msg"] == "test2"
+
+
 def test_get_targets():
     targets = sqlite_client.get_targets()
     target_names = [target.name for target in targets]
@@ -419,3 +772,75 @@ def test_update_targets_bump():
             if target.name == "OTHER_DATASET"
         ]
     )
+
+
+def _dataset_probe(path: str, size: int = 10240) -> DatasetProbe:
+    return DatasetProbe(
+        path=path,
+        directory=os.path.dirname(path),
+        dataset_name=os.path.splitext(os.path.basename(path))[0],
+        size=size,
+        mtime_ns=1_700_000_000_000_000_000,
+        member_count=5,
+        has_data=True,
+        has_metadata=True,
+        is_archived=False,
+        probed_at=datetime.now(),
+    )
+
+
+def test_dataset_probes():
+    sqlite_client.save_dataset_probes(
+        [
+            _dataset_probe("input/MY_DATASET.tar"),
+            _dataset_probe("input/OTHER_DATASET.tar"),
+            _dataset_probe("input/archive/MY_DATASET.tar"),
+        ]
+    )
+    probes = sqlite_client.get_dataset_probes("input")
+    assert sorted(probe.path for probe in probes) == [
+        "input/MY_DATASET.tar",
+        "input/OTHER_DATASET.tar",
+    ]
+    assert probes[0] == _dataset_probe(probes[0].path).model_copy(
+        update={"probed_at": probes[0].probed_at}
+    )
+
+    sqlite_client.save_dataset_probes(
+        [_dataset_probe("input/MY_DATASET.tar", size=20480)]
+    )
+    sqlite_client.delete_dataset_probes(["input/OTHER_DATASET.tar"])
+    probes = sqlite_client.get_dataset_probes("input")
+    assert [(probe.path, probe.size) for probe in probes] == [
+        ("input/MY_DATASET.tar", 20480)
+    ]
+
+
+def test_dataset_checksums():
+    sqlite_client.save_dataset_probes([_dataset_probe("input/MY_DATASET.tar")])
+    computed_at = datetime.now()
+    # Checksums of another version of the file are not stored
+    sqlite_client.save_dataset_checksum(
+        "input/MY_DATASET.tar",
+        20480,
+        1_700_000_000_000_000_000,
+        "old",
+        computed_at,
+    )
+    assert sqlite_client.get_dataset_probes("input")[0].sha256 is None
+    sqlite_client.save_dataset_checksum(
+        "input/MY_DATASET.tar",
+        10240,
+        1_700_000_000_000_000_000,
+        "abc",
+        computed_at,
+    )
+
+    sqlite_client.move_dataset_probes(
+        {"input/MY_DATASET.tar": "input/archive/MY_DATASET.tar"}
+    )
+    assert sqlite_client.get_dataset_probes("input") == []
+    [probe] = sqlite_client.get_dataset_probes("input/archive")
+    assert probe.is_archived
+    assert probe.sha256 == "abc"
+    assert probe.checksum_computed_at == computed_at
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import time
+
+from job_service.adapter.local_storage import checksums
+from job_service.adapter.local_storage.checksums import (
+    ChecksumCache,
+    DatasetChecksum,
+)
+
+
+def _wait_for_checksum(
+    cache: ChecksumCache, path, stat: os.stat_result
+) -> DatasetChecksum:
+    deadline = time.monotonic() + 5
+    checksum = cache.request(path, stat)
+    while checksum.status == "PENDING" and time.monotonic() < deadline:
+        time.sleep(0.01)
+        checksum = cache.request(path, stat)
+    return checksum
+
+
+def test_checksum_cache(tmp_path):
+    path = tmp_path / "MY_DATASET.tar"
+    content = os.urandom(3 * 1024 * 1024 + 17)
+    path.write_bytes(content)
+    cache = ChecksumCache(max_workers=1)
+    stat = os.stat(path)
+    assert cache.lookup(path, stat) is None
+
+    checksum = _wait_for_checksum(cache, path, stat)
+    assert checksum.status == "COMPLETE"
+    assert checksum.sha256 == hashlib.sha256(content).hexdigest()
+    assert checksum.size == len(content)
+    assert cache.lookup(path, stat) == checksum
+
+    # A modified file gets a new checksum
+    path.write_bytes(b"changed")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.lookup(path, os.stat(path)) is None
+    checksum = _wait_for_checksum(cache, path, os.stat(path))
+    assert checksum.sha256 == hashlib.sha256(b"changed").hexdigest()
+
+    cache.prune(tmp_path, set())
+    assert cache.lookup(path, os.stat(path)) is None
+
+
+def test_checksum_of_missing_file(tmp_path):
+    path = tmp_path / "MY_DATASET.tar"
+    path.write_bytes(b"content")
+    stat = os.stat(path)
+    os.remove(path)
+    cache = ChecksumCache(max_workers=1)
+    assert _wait_for_checksum(cache, path, stat).status == "FAILED"
+
+
+def test_failed_checksum_is_retried(tmp_path, mocker):
+    path = tmp_path / "MY_DATASET.tar"
+    path.write_bytes(b"content")
+    stat = os.stat(path)
+    sha256_mock = mocker.patch.object(
+        checksums,
+        "_sha256",
+        side_effect=[PermissionError("Permission denied"), "abc"],
+    )
+    cache = ChecksumCache(max_workers=1)
+    assert _wait_for_checksum(cache, path, stat).status == "FAILED"
+    assert cache.request(path, stat).status == "FAILED"
+    assert sha256_mock.call_count == 1
+
+    mocker.patch.object(checksums, "FAILED_RETRY_SECONDS", 0)
+    checksum = _wait_for_checksum(cache, path, stat)
+    assert (checksum.status, checksum.sha256) == ("COMPLETE", "abc")
+    assert sha256_mock.call_count == 2
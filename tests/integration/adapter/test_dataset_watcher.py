@@ -0,0 +1,126 @@
+import shutil
+import time
+
+import pytest
+
+from job_service.adapter.local_storage import dataset_watcher, input_directory
+from job_service.adapter.local_storage.dataset_watcher import DatasetWatcher
+
+INPUT_DIR = "tests/resources/input_directory"
+
+
+@pytest.fixture
+def input_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(input_directory, "INPUT_DIR", tmp_path)
+    monkeypatch.setattr(input_directory, "ARCHIVE_DIR", tmp_path / "archive")
+    return tmp_path
+
+
+def _dataset_names(watcher: DatasetWatcher) -> list[str] | None:
+    datasets = watcher.datasets
+    if datasets is None:
+        return None
+    return [dataset.dataset_name for dataset in datasets]
+
+
+def _wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _watch_for_new_datasets(watcher: DatasetWatcher, input_dir) -> None:
+    shutil.copyfile(
+        f"{INPUT_DIR}/MY_DATASET.tar", input_dir / "MY_DATASET.tar"
+    )
+    watcher.start()
+    try:
+        assert _wait_for(lambda: _dataset_names(watcher) == ["MY_DATASET"])
+
+        (input_dir / "archive").mkdir()
+        shutil.copyfile(
+            f"{INPUT_DIR}/YOUR_DATASET.tar",
+            input_dir / "archive" / "YOUR_DATASET.tar",
+        )
+        assert _wait_for(
+            lambda: _dataset_names(watcher) == ["MY_DATASET", "YOUR_DATASET"]
+        )
+        assert watcher.datasets[1].is_archived
+
+        (input_dir / "MY_DATASET.tar").unlink()
+        assert _wait_for(lambda: _dataset_names(watcher) == ["YOUR_DATASET"])
+    finally:
+        watcher.stop()
+    assert watcher.datasets is None
+
+
+def test_watcher_with_inotify(input_dir):
+    if dataset_watcher._Inotify.create() is None:
+        pytest.skip("inotify is not available")
+    # The interval is long enough that only inotify can find the changes
+    _watch_for_new_datasets(DatasetWatcher(interval_seconds=60), input_dir)
+
+
+def test_watcher_with_polling(input_dir, mocker):
+    mocker.patch.object(dataset_watcher._Inotify, "create", return_value=None)
+    _watch_for_new_datasets(DatasetWatcher(interval_seconds=0.05), input_dir)
+
+
+def test_refresh_only_when_running(input_dir, mocker):
+    scan_spy = mocker.spy(input_directory, "get_importable_datasets")
+    watcher = DatasetWatcher(interval_seconds=60)
+    watcher.refresh()
+    assert scan_spy.call_count == 0
+    assert watcher.datasets is None
+
+
+def _start_watcher(input_dir, mocker, dataset_names: list[str]):
+    for dataset_name in dataset_names:
+        shutil.copyfile(
+            f"{INPUT_DIR}/{dataset_name}.tar",
+            input_dir / f"{dataset_name}.tar",
+        )
+    mocker.patch.object(dataset_watcher._Inotify, "create", return_value=None)
+    watcher = DatasetWatcher(interval_seconds=60)
+    watcher.start()
+    assert _wait_for(lambda: _dataset_names(watcher) == dataset_names)
+    return watcher
+
+
+def test_apply_changes(input_dir, mocker):
+    watcher = _start_watcher(
+        input_dir, mocker, ["MY_DATASET", "OTHER_DATASET", "YOUR_DATASET"]
+    )
+    scan_spy = mocker.spy(input_directory, "get_importable_datasets")
+    try:
+        watcher.apply_changes(
+            deleted=["OTHER_DATASET"], archived=["MY_DATASET"]
+        )
+        assert _dataset_names(watcher) == ["YOUR_DATASET", "MY_DATASET"]
+        assert watcher.datasets[1].is_archived
+        assert scan_spy.call_count == 0
+    finally:
+        watcher.stop()
+
+
+def test_scan_during_changes_is_discarded(input_dir, mocker):
+    watcher = _start_watcher(input_dir, mocker, ["MY_DATASET"])
+    stale_datasets = watcher.datasets
+
+    def scan_during_delete(*args, **kwargs):
+        watcher.apply_changes(deleted=["MY_DATASET"], archived=[])
+        return stale_datasets
+
+    mocker.patch.object(
+        input_directory,
+        "get_importable_datasets",
+        side_effect=scan_during_delete,
+    )
+    try:
+        assert not watcher.refresh()
+        assert _dataset_names(watcher) == []
+    finally:
+        watcher.stop()
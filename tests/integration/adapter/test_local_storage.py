@@ -1,22 +1,58 @@
-from job_service.adapter.local_storage import input_directory
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import threading
+import time
+from tarfile import ReadError
+
+import pytest
+
+from job_service.adapter import db
+from job_service.adapter.local_storage import (
+    checksums,
+    input_directory,
+    tar_probe,
+)
 from job_service.adapter.local_storage.input_directory import ImportableDataset
+from job_service.adapter.local_storage.tar_probe import (
+    BLOCK_SIZE,
+    NotATarFile,
+    TarMemberReader,
+    iter_tar_members,
+)
+from job_service.config import environment
+from job_service.exceptions import NotFoundException
 
+INPUT_DIR = "tests/resources/input_directory"
 
 expected_datasets = [
     ImportableDataset(
-        dataset_name="MY_DATASET", has_data=True, has_metadata=True
+        dataset_name="MY_DATASET",
+        has_data=True,
+        has_metadata=True,
+        size=10240,
     ),
     ImportableDataset(
-        dataset_name="YOUR_DATASET", has_data=False, has_metadata=True
+        dataset_name="YOUR_DATASET",
+        has_data=False,
+        has_metadata=True,
+        size=1536,
+        member_count=1,
     ),
     ImportableDataset(
-        dataset_name="OTHER_DATASET", has_data=True, has_metadata=True
+        dataset_name="OTHER_DATASET",
+        has_data=True,
+        has_metadata=True,
+        size=10240,
     ),
     ImportableDataset(
         dataset_name="YET_ANOTHER_DATASET",
         has_data=True,
         has_metadata=True,
         is_archived=True,
+        size=10240,
     ),
 ]
 
@@ -26,3 +62,470 @@ def test_get_importable_datasets():
     assert len(actual_datasets) == 4
     for dataset in expected_datasets:
         assert dataset in actual_datasets
+
+
+def _copy_input_file(file_name: str, dir_path) -> None:
+    shutil.copyfile(f"{INPUT_DIR}/{file_name}", dir_path / file_name)
+
+
+def test_get_datasets_in_directory_reuses_index(tmp_path, mocker):
+    _copy_input_file("MY_DATASET.tar", tmp_path)
+    _copy_input_file("NO_DATASET.tar", tmp_path)
+    (tmp_path / "BROKEN_DATASET.tar").write_bytes(b"not a tar file")
+    probe_spy = mocker.spy(input_directory, "_probe_dataset")
+
+    datasets = input_directory.get_datasets_in_directory(tmp_path)
+    assert [dataset.dataset_name for dataset in datasets] == ["MY_DATASET"]
+    assert probe_spy.call_count == 3
+
+    assert input_directory.get_datasets_in_directory(tmp_path) == datasets
+    assert probe_spy.call_count == 3
+
+    stat = (tmp_path / "MY_DATASET.tar").stat()
+    os.utime(
+        tmp_path / "MY_DATASET.tar",
+        ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000),
+    )
+    assert input_directory.get_datasets_in_directory(tmp_path) == datasets
+    assert probe_spy.call_count == 4
+
+    os.remove(tmp_path / "MY_DATASET.tar")
+    assert input_directory.get_datasets_in_directory(tmp_path) == []
+
+
+def test_iter_tar_members():
+    members = {
+        member.name: member
+        for member in iter_tar_members(f"{INPUT_DIR}/MY_DATASET.tar")
+    }
+    assert {"MY_DATASET.json", "chunks", "chunks/1.csv.encr"} <= set(members)
+    chunk = members["chunks/1.csv.encr"]
+    with open(f"{INPUT_DIR}/MY_DATASET.tar", "rb") as f:
+        f.seek(chunk.offset_data)
+        assert len(f.read(chunk.size)) == chunk.size
+    assert [
+        member.name
+        for member in iter_tar_members(f"{INPUT_DIR}/YOUR_DATASET.tar")
+    ] == ["YOUR_DATASET.json"]
+
+
+def test_iter_tar_members_invalid_files(tmp_path):
+    (tmp_path / "GARBAGE.tar").write_bytes(b"not a tar file" * 100)
+    (tmp_path / "EMPTY.tar").write_bytes(b"")
+    with pytest.raises(NotATarFile):
+        list(iter_tar_members(tmp_path / "GARBAGE.tar"))
+    with pytest.raises(NotATarFile):
+        list(iter_tar_members(tmp_path / "EMPTY.tar"))
+
+    with open(f"{INPUT_DIR}/MY_DATASET.tar", "rb") as f:
+        truncated = f.read(BLOCK_SIZE + 10)
+    (tmp_path / "TRUNCATED.tar").write_bytes(truncated)
+    with pytest.raises(ReadError):
+        list(iter_tar_members(tmp_path / "TRUNCATED.tar"))
+
+
+def test_probe_truncated_member_data(tmp_path):
+    with open(f"{INPUT_DIR}/MY_DATASET.tar", "rb") as f:
+        content = f.read()
+    [chunk] = [
+        member
+        for member in iter_tar_members(f"{INPUT_DIR}/MY_DATASET.tar")
+        if member.name == "chunks/1.csv.encr"
+    ]
+    truncated = content[: chunk.offset_data + chunk.size // 2]
+    (tmp_path / "MY_DATASET.tar").write_bytes(truncated)
+    with pytest.raises(ReadError):
+        list(iter_tar_members(tmp_path / "MY_DATASET.tar"))
+    # The probe stops once the metadata and the chunks are found, so it
+    # does not read the truncated member after them
+    assert input_directory._probe_dataset(
+        tmp_path / "MY_DATASET.tar", "MY_DATASET", False
+    ) == ImportableDataset(
+        dataset_name="MY_DATASET", has_data=True, has_metadata=True
+    )
+
+    # A truncated member before the chunks is found
+    [symkey] = [
+        member
+        for member in iter_tar_members(f"{INPUT_DIR}/MY_DATASET.tar")
+        if member.name == "MY_DATASET.symkey.encr"
+    ]
+    truncated = content[: symkey.offset_data + symkey.size // 2]
+    (tmp_path / "MY_DATASET.tar").write_bytes(truncated)
+    assert (
+        input_directory._probe_dataset(
+            tmp_path / "MY_DATASET.tar", "MY_DATASET", False
+        )
+        is None
+    )
+
+
+def test_probe_stops_after_names_are_found(tmp_path, mocker):
+    _copy_input_file("MY_DATASET.tar", tmp_path)
+    pread_spy = mocker.spy(tar_probe.os, "pread")
+    dataset = input_directory._probe_dataset(
+        tmp_path / "MY_DATASET.tar", "MY_DATASET", False
+    )
+    assert dataset.has_data
+    assert dataset.member_count is None
+    # chunks is the fourth of five members, so fewer headers are read
+    # than by a full walk
+    headers_read = pread_spy.call_count
+    pread_spy.reset_mock()
+    list(tar_probe.iter_tar_members(tmp_path / "MY_DATASET.tar"))
+    assert pread_spy.call_count > headers_read
+
+    _copy_input_file("YOUR_DATASET.tar", tmp_path)
+    dataset = input_directory._probe_dataset(
+        tmp_path / "YOUR_DATASET.tar", "YOUR_DATASET", False
+    )
+    assert not dataset.has_data
+    assert dataset.member_count == 1
+
+
+def test_probe_compressed_dataset(tmp_path):
+    with open(f"{INPUT_DIR}/MY_DATASET.tar", "rb") as f:
+        (tmp_path / "MY_DATASET.tar").write_bytes(gzip.compress(f.read()))
+    assert input_directory._probe_dataset(
+        tmp_path / "MY_DATASET.tar", "MY_DATASET", False
+    ) == ImportableDataset(
+        dataset_name="MY_DATASET",
+        has_data=True,
+        has_metadata=True,
+    )
+
+
+def test_get_importable_datasets_order():
+    assert [
+        dataset.dataset_name
+        for dataset in input_directory.get_importable_datasets()
+    ] == ["MY_DATASET", "OTHER_DATASET", "YOUR_DATASET", "YET_ANOTHER_DATASET"]
+
+
+def test_get_datasets_in_directory_probe_timeout(tmp_path, mocker):
+    _copy_input_file("MY_DATASET.tar", tmp_path)
+    _copy_input_file("YOUR_DATASET.tar", tmp_path)
+    slow_probe_finished = threading.Event()
+    probe_dataset = input_directory._probe_dataset
+
+    def slow_probe(item_path, dataset_name, *args):
+        if dataset_name != "MY_DATASET":
+            return probe_dataset(item_path, dataset_name, *args)
+        time.sleep(0.2)
+        dataset = probe_dataset(item_path, dataset_name, *args)
+        slow_probe_finished.set()
+        return dataset
+
+    probe_mock = mocker.patch.object(
+        input_directory, "_probe_dataset", side_effect=slow_probe
+    )
+    mocker.patch.dict(
+        environment._ENVIRONMENT_VARIABLES,
+        {"DATASET_PROBE_TIMEOUT_SECONDS": 0.05},
+    )
+    datasets = input_directory.get_datasets_in_directory(tmp_path)
+    assert [
+        (dataset.dataset_name, dataset.has_metadata, dataset.is_probing)
+        for dataset in datasets
+    ] == [("MY_DATASET", False, True), ("YOUR_DATASET", True, None)]
+
+    # The timed out probe is indexed once it completes
+    assert slow_probe_finished.wait(timeout=5)
+    time.sleep(0.01)
+    datasets = input_directory.get_datasets_in_directory(tmp_path)
+    assert [dataset.dataset_name for dataset in datasets] == [
+        "MY_DATASET",
+        "YOUR_DATASET",
+    ]
+    assert probe_mock.call_count == 2
+
+
+def test_probe_timeout_is_shared_by_all_probes(tmp_path, mocker):
+    for dataset_name in ["A_DATASET", "B_DATASET", "C_DATASET"]:
+        shutil.copyfile(
+            f"{INPUT_DIR}/MY_DATASET.tar", tmp_path / f"{dataset_name}.tar"
+        )
+    release_probes = threading.Event()
+
+    def blocked_probe(*args):
+        release_probes.wait(timeout=5)
+
+    mocker.patch.object(
+        input_directory, "_probe_dataset", side_effect=blocked_probe
+    )
+    mocker.patch.dict(
+        environment._ENVIRONMENT_VARIABLES,
+        {"DATASET_PROBE_TIMEOUT_SECONDS": 0.1},
+    )
+    start = time.monotonic()
+    try:
+        datasets = input_directory.get_datasets_in_directory(tmp_path)
+        assert time.monotonic() - start < 0.25
+        assert [dataset.is_probing for dataset in datasets] == [True] * 3
+    finally:
+        release_probes.set()
+
+
+def test_get_datasets_in_directory_skips_failed_probes(tmp_path, mocker):
+    _copy_input_file("MY_DATASET.tar", tmp_path)
+    _copy_input_file("YOUR_DATASET.tar", tmp_path)
+    probe_dataset = input_directory._probe_dataset
+
+    def failing_probe(item_path, dataset_name, *args):
+        if dataset_name == "MY_DATASET":
+            raise PermissionError("Permission denied")
+        return probe_dataset(item_path, dataset_name, *args)
+
+    mocker.patch.object(
+        input_directory, "_probe_dataset", side_effect=failing_probe
+    )
+    datasets = input_directory.get_datasets_in_directory(tmp_path)
+    assert [dataset.dataset_name for dataset in datasets] == ["YOUR_DATASET"]
+
+
+def test_get_datasets_in_directory_reuses_catalogue(tmp_path, mocker):
+    _copy_input_file("MY_DATASET.tar", tmp_path)
+    _copy_input_file("NO_DATASET.tar", tmp_path)
+    probe_spy = mocker.spy(input_directory, "_probe_dataset")
+
+    datasets = input_directory.get_datasets_in_directory(tmp_path)
+    assert probe_spy.call_count == 2
+    catalogue = db.get_database_client().get_dataset_probes(str(tmp_path))
+    assert sorted(
+        (probe.dataset_name, probe.has_metadata) for probe in catalogue
+    ) == [("MY_DATASET", True), ("NO_DATASET", False)]
+
+    # Probe results survive a restart of the process
+    input_directory._DATASET_INDEX.clear()
+    assert input_directory.get_datasets_in_directory(tmp_path) == datasets
+    assert probe_spy.call_count == 2
+
+    os.remove(tmp_path / "NO_DATASET.tar")
+    input_directory._DATASET_INDEX.clear()
+    input_directory.get_datasets_in_directory(tmp_path)
+    catalogue = db.get_database_client().get_dataset_probes(str(tmp_path))
+    assert [probe.dataset_name for probe in catalogue] == ["MY_DATASET"]
+
+
+def test_apply_bulk_action(tmp_path, monkeypatch, mocker):
+    monkeypatch.setattr(input_directory, "INPUT_DIR", tmp_path)
+    monkeypatch.setattr(input_directory, "ARCHIVE_DIR", tmp_path / "archive")
+    _copy_input_file("MY_DATASET.tar", tmp_path)
+    _copy_input_file("OTHER_DATASET.tar", tmp_path)
+    _copy_input_file("YOUR_DATASET.tar", tmp_path)
+    input_directory.get_importable_datasets()
+    probe_spy = mocker.spy(input_directory, "_probe_dataset")
+
+    results = input_directory.apply_bulk_action(
+        input_directory.BulkAction.ARCHIVE,
+        ["MY_DATASET", "OTHER_DATASET", "MISSING_DATASET", "BAD+NAME"],
+    )
+    assert [result.status for result in results] == [
+        "ARCHIVED",
+        "ARCHIVED",
+        "NOT_FOUND",
+        "INVALID_NAME",
+    ]
+    assert [
+        (dataset.dataset_name, dataset.is_archived)
+        for dataset in input_directory.get_importable_datasets()
+    ] == [
+        ("YOUR_DATASET", False),
+        ("MY_DATASET", True),
+        ("OTHER_DATASET", True),
+    ]
+    assert probe_spy.call_count == 0
+
+    _copy_input_file("MY_DATASET.tar", tmp_path)
+    results = input_directory.apply_bulk_action(
+        input_directory.BulkAction.ARCHIVE, ["MY_DATASET"]
+    )
+    assert results[0].status == "ALREADY_ARCHIVED"
+    assert (tmp_path / "MY_DATASET.tar").exists()
+
+    results = input_directory.apply_bulk_action(
+        input_directory.BulkAction.DELETE, ["MY_DATASET", "YOUR_DATASET"]
+    )
+    assert [result.status for result in results] == ["DELETED", "DELETED"]
+    assert sorted(os.listdir(tmp_path)) == ["archive"]
+
+
+def _wait_for_saved_checksum(dir_path) -> str:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        [probe] = db.get_database_client().get_dataset_probes(str(dir_path))
+        if probe.sha256 is not None:
+            return probe.sha256
+        time.sleep(0.01)
+    raise AssertionError(f"No checksum saved in {dir_path}")
+
+
+def test_checksums_survive_restart_and_archiving(
+    tmp_path, monkeypatch, mocker
+):
+    monkeypatch.setattr(input_directory, "INPUT_DIR", tmp_path)
+    monkeypatch.setattr(input_directory, "ARCHIVE_DIR", tmp_path / "archive")
+    _copy_input_file("MY_DATASET.tar", tmp_path)
+    input_directory.get_importable_datasets()
+    sha256 = _wait_for_saved_checksum(tmp_path)
+
+    input_directory.apply_bulk_action(
+        input_directory.BulkAction.ARCHIVE, ["MY_DATASET"]
+    )
+    [probe] = db.get_database_client().get_dataset_probes(
+        str(tmp_path / "archive")
+    )
+    assert probe.sha256 == sha256
+
+    input_directory._DATASET_INDEX.clear()
+    input_directory.get_checksum_cache().clear()
+    hash_spy = mocker.spy(checksums, "_sha256")
+    [dataset] = input_directory.get_importable_datasets()
+    assert input_directory.with_checksum(dataset).sha256 == sha256
+    assert hash_spy.call_count == 0
+
+    # Not returned once the file has changed
+    archived_path = tmp_path / "archive" / "MY_DATASET.tar"
+    stat = os.stat(archived_path)
+    os.utime(
+        archived_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000)
+    )
+    assert input_directory.with_checksum(dataset).sha256 is None
+
+
+def _write_tar(path, members: dict[str, bytes], mode: str = "w") -> None:
+    with tarfile.open(path, mode) as tar:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+
+def test_tar_member_reader(tmp_path):
+    metadata = b'{"shortName": "MY_DATASET"}' * 5000
+    _write_tar(
+        tmp_path / "MY_DATASET.tar",
+        {"chunks/1.csv.encr": os.urandom(2000), "MY_DATASET.json": metadata},
+    )
+    reader = TarMemberReader(
+        tmp_path / "MY_DATASET.tar", "MY_DATASET.json", chunk_size=4096
+    )
+    chunks = list(reader)
+    assert b"".join(chunks) == metadata
+    assert max(len(chunk) for chunk in chunks) == 4096
+
+    with pytest.raises(KeyError):
+        TarMemberReader(tmp_path / "MY_DATASET.tar", "OTHER_DATASET.json")
+
+
+def test_open_dataset_metadata(tmp_path, monkeypatch):
+    monkeypatch.setattr(input_directory, "INPUT_DIR", tmp_path)
+    monkeypatch.setattr(input_directory, "ARCHIVE_DIR", tmp_path / "archive")
+    metadata = b'{"shortName": "MY_DATASET"}'
+    _write_tar(tmp_path / "MY_DATASET.tar", {"MY_DATASET.json": metadata})
+    _write_tar(
+        tmp_path / "OTHER_DATASET.tar",
+        {"OTHER_DATASET.json": metadata},
+        mode="w:gz",
+    )
+    _write_tar(tmp_path / "NO_DATASET.tar", {"chunks/1.csv.encr": b""})
+
+    assert b"".join(input_directory.open_dataset_metadata("MY_DATASET")) == (
+        metadata
+    )
+    assert (
+        b"".join(input_directory.open_dataset_metadata("OTHER_DATASET"))
+        == metadata
+    )
+    with pytest.raises(NotFoundException):
+        input_directory.open_dataset_metadata("NO_DATASET")
+    with pytest.raises(NotFoundException):
+        input_directory.open_dataset_metadata("MISSING_DATASET")
+
+
+@pytest.mark.parametrize("mode", ["w", "w:gz"])
+def test_open_dataset_metadata_directory(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(input_directory, "INPUT_DIR", tmp_path)
+    with tarfile.open(tmp_path / "MY_DATASET.tar", mode) as tar:
+        metadata_dir = tarfile.TarInfo("MY_DATASET.json")
+        metadata_dir.type = tarfile.DIRTYPE
+        tar.addfile(metadata_dir)
+    with pytest.raises(NotFoundException):
+        input_directory.open_dataset_metadata("MY_DATASET")
+
+
+def test_get_datasets_in_directory_skips_uploads(tmp_path, mocker):
+    _copy_input_file("MY_DATASET.tar", tmp_path)
+    _copy_input_file("OTHER_DATASET.tar", tmp_path)
+    _copy_input_file("YOUR_DATASET.tar", tmp_path)
+    os.rename(
+        tmp_path / "YOUR_DATASET.tar", tmp_path / "YOUR_DATASET.tar.part"
+    )
+    (tmp_path / "OTHER_DATASET.lock").touch()
+    probe_spy = mocker.spy(input_directory, "_probe_dataset")
+
+    datasets = input_directory.get_datasets_in_directory(tmp_path)
+    assert [
+        (dataset.dataset_name, dataset.is_uploading) for dataset in datasets
+    ] == [
+        ("MY_DATASET", None),
+        ("OTHER_DATASET", True),
+        ("YOUR_DATASET", True),
+    ]
+    assert datasets[1].size == 10240
+    assert not datasets[1].has_metadata
+    assert probe_spy.call_count == 1
+
+    # Recently modified files are uploading until they are settled
+    mocker.patch.dict(
+        environment._ENVIRONMENT_VARIABLES,
+        {"DATASET_UPLOAD_SETTLE_SECONDS": 60},
+    )
+    os.remove(tmp_path / "OTHER_DATASET.lock")
+    (tmp_path / "MY_DATASET.tar").touch()
+    datasets = input_directory.get_datasets_in_directory(tmp_path)
+    assert [dataset.is_uploading for dataset in datasets] == [
+        True,
+        True,
+        True,
+    ]
+    assert probe_spy.call_count == 1
+
+    stat = (tmp_path / "MY_DATASET.tar").stat()
+    os.utime(
+        tmp_path / "MY_DATASET.tar",
+        ns=(stat.st_atime_ns, stat.st_mtime_ns - 120_000_000_000),
+    )
+    datasets = input_directory.get_datasets_in_directory(tmp_path)
+    assert datasets[0].is_uploading is None
+    assert datasets[0].has_metadata
+    assert probe_spy.call_count == 2
+
+
+def test_files_are_probed_once_their_size_is_settled(tmp_path, mocker):
+    mocker.patch.dict(
+        environment._ENVIRONMENT_VARIABLES,
+        {"DATASET_UPLOAD_SETTLE_SECONDS": 60},
+    )
+    probe_spy = mocker.spy(input_directory, "_probe_dataset")
+    path = tmp_path / "MY_DATASET.tar"
+    with open(f"{INPUT_DIR}/MY_DATASET.tar", "rb") as f:
+        content = f.read()
+
+    def write_with_old_mtime(data: bytes) -> None:
+        # Uploads can keep the modification time of the source file
+        path.write_bytes(data)
+        os.utime(path, (time.time() - 3600, time.time() - 3600))
+
+    write_with_old_mtime(content[:5120])
+    [dataset] = input_directory.get_datasets_in_directory(tmp_path)
+    assert dataset.is_uploading
+    write_with_old_mtime(content)
+    [dataset] = input_directory.get_datasets_in_directory(tmp_path)
+    assert dataset.is_uploading
+    assert probe_spy.call_count == 0
+
+    [dataset] = input_directory.get_datasets_in_directory(tmp_path)
+    assert dataset.is_uploading is None
+    assert dataset.has_metadata
+    assert probe_spy.call_count == 1
@@ -1,10 +1,24 @@
+import json
+import logging
+import time
+
 import pytest
 
-from job_service.adapter.auth import AuthClient
+from job_service.adapter.auth import (
+    AuthClient,
+    VerifiedTokenCache,
+    get_auth_client,
+)
+from job_service.config import environment
 from job_service.exceptions import AuthError
 from job_service.adapter.db.models import UserInfo
 from tests.resources import test_data
-from tests.util import generate_rsa_key_pairs, encode_jwt_payload
+from tests.util import (
+    encode_jwt_payload,
+    generate_rsa_key_pairs,
+    public_jwk,
+    serve_jwks,
+)
 
 JWT_PRIVATE_KEY, JWT_PUBLIC_KEY = generate_rsa_key_pairs()
 JWT_INVALID_PRIVATE_KEY, _ = generate_rsa_key_pairs()
@@ -107,3 +121,164 @@ def test_auth_missing_user_info_token():
         )
         auth_client.authorize_user(auth_token, None)
     assert "Unauthorized. No user info token was provided" in str(e)
+
+
+def test_get_auth_client_is_shared():
+    assert get_auth_client() is get_auth_client()
+
+
+def test_signing_keys_are_cached(mocker):
+    with serve_jwks({"keys": [public_jwk(JWT_PUBLIC_KEY, "key-1")]}) as (
+        jwks_url,
+        jwks_requests,
+    ):
+        mocker.patch.dict(
+            environment._ENVIRONMENT_VARIABLES, {"JWKS_URL": jwks_url}
+        )
+        client = AuthClient()
+        for request_number in range(3):
+            # Distinct tokens, so that none are served by the token cache
+            auth_token = encode_jwt_payload(
+                {
+                    **test_data.valid_authorization_payload,
+                    "jti": str(request_number),
+                },
+                JWT_PRIVATE_KEY,
+                "key-1",
+            )
+            user_info_token = encode_jwt_payload(
+                test_data.valid_user_info_payload, JWT_PRIVATE_KEY, "key-1"
+            )
+            assert client.authorize_user(auth_token, user_info_token) == (
+                expected_user_info
+            )
+    assert len(jwks_requests) == 1
+    stats = client.signing_key_stats()
+    assert stats.requests == 3
+    assert stats.fetches == 1
+    assert stats.cache_hits == 2
+
+
+def test_verified_tokens_are_cached(mocker):
+    client = AuthClient()
+    get_signing_key = mocker.Mock(return_value=JWT_PUBLIC_KEY.decode("utf-8"))
+    client._get_signing_key = get_signing_key
+    auth_token = encode_jwt_payload(
+        test_data.valid_authorization_payload, JWT_PRIVATE_KEY
+    )
+    user_info_token = encode_jwt_payload(
+        test_data.valid_user_info_payload, JWT_PRIVATE_KEY
+    )
+    for _ in range(3):
+        assert client.authorize_user(auth_token, user_info_token) == (
+            expected_user_info
+        )
+    get_signing_key.assert_called_once()
+    stats = client.token_cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (2, 1, 1)
+    assert stats.hit_rate == 2 / 3
+
+
+def test_stats_are_logged_when_keys_are_loaded(tmp_path, mocker, caplog):
+    jwks_file = tmp_path / "jwks.json"
+    jwks_file.write_text(
+        json.dumps({"keys": [public_jwk(JWT_PUBLIC_KEY, "key-1")]})
+    )
+    mocker.patch.dict(
+        environment._ENVIRONMENT_VARIABLES, {"JWKS_FILE": str(jwks_file)}
+    )
+    client = AuthClient()
+    with caplog.at_level(logging.INFO):
+        client.signing_keys.refresh()
+    assert [record.message for record in caplog.records] == [
+        "Token cache: 0 hits, 0 misses (0.0% hit rate), 0 entries. "
+        "Signing keys: 0 requests, 0 cache hits, 1 fetches, "
+        "0 of them by requests"
+    ]
+
+
+def test_failed_authorization_is_not_cached():
+    client = AuthClient()
+    client._get_signing_key = auth_client._get_signing_key
+    auth_token = encode_jwt_payload(
+        test_data.authorization_payload_wrong_accreditation, JWT_PRIVATE_KEY
+    )
+    user_info_token = encode_jwt_payload(
+        test_data.valid_user_info_payload, JWT_PRIVATE_KEY
+    )
+    for _ in range(2):
+        with pytest.raises(AuthError):
+            client.authorize_user(auth_token, user_info_token)
+    assert client.token_cache.stats().size == 0
+
+
+def test_verified_token_cache_expiry(mocker):
+    cache = VerifiedTokenCache(max_size=10)
+    mocker.patch("job_service.adapter.auth.time.time", return_value=1000)
+    cache.put("key", expected_user_info, expires_at=1001, kid="key-1")
+    assert cache.get("key") == expected_user_info
+    mocker.patch("job_service.adapter.auth.time.time", return_value=1001)
+    assert cache.get("key") is None
+    assert cache.stats() == (1, 1, 0)
+
+
+def test_verified_token_cache_evicts_least_recently_used():
+    cache = VerifiedTokenCache(max_size=2)
+    expires_at = time.time() + 3600
+    cache.put("first", expected_user_info, expires_at, "key-1")
+    cache.put("second", expected_user_info, expires_at, "key-1")
+    assert cache.get("first") is not None
+    cache.put("third", expected_user_info, expires_at, "key-1")
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+
+
+def test_verified_token_cache_disabled():
+    cache = VerifiedTokenCache(max_size=0)
+    cache.put("key", expected_user_info, time.time() + 3600, "key-1")
+    assert cache.get("key") is None
+
+
+def test_verified_token_cache_retain_kids():
+    cache = VerifiedTokenCache(max_size=10)
+    expires_at = time.time() + 3600
+    cache.put("old", expected_user_info, expires_at, "key-1")
+    cache.put("new", expected_user_info, expires_at, "key-2")
+    cache.put("no-kid", expected_user_info, expires_at, None)
+    cache.retain_kids({"key-1", "key-2"})
+    assert cache.get("no-kid") is None
+    cache.retain_kids({"key-2"})
+    assert cache.get("old") is None
+    assert cache.get("new") == expected_user_info
+
+
+def test_cached_tokens_are_dropped_with_their_key(tmp_path, mocker):
+    jwks_file = tmp_path / "jwks.json"
+    jwks_file.write_text(
+        json.dumps({"keys": [public_jwk(JWT_PUBLIC_KEY, "key-1")]})
+    )
+    mocker.patch.dict(
+        environment._ENVIRONMENT_VARIABLES, {"JWKS_FILE": str(jwks_file)}
+    )
+    client = AuthClient()
+    auth_token = encode_jwt_payload(
+        test_data.valid_authorization_payload, JWT_PRIVATE_KEY, "key-1"
+    )
+    user_info_token = encode_jwt_payload(
+        test_data.valid_user_info_payload, JWT_PRIVATE_KEY, "key-1"
+    )
+    assert client.authorize_user(auth_token, user_info_token) == (
+        expected_user_info
+    )
+    assert client.token_cache.stats().size == 1
+
+    # key-1 is revoked, and the refresh thread loads the new key set
+    _, rotated_public_key = generate_rsa_key_pairs()
+    jwks_file.write_text(
+        json.dumps({"keys": [public_jwk(rotated_public_key, "key-2")]})
+    )
+    client.signing_keys.refresh()
+    assert client.token_cache.stats().size == 0
+    with pytest.raises(AuthError):
+        client.authorize_user(auth_token, user_info_token)
@@ -0,0 +1,48 @@
+from unittest.mock import Mock
+
+from job_service.adapter import db
+from job_service.adapter.db.models import (
+    Job,
+    JobParameters,
+    JobStatus,
+    UserInfo,
+)
+from job_service.adapter.job_events import JobEventBroker
+from job_service.adapter.lease_sweeper import LeaseSweeper
+
+
+RELEASED_JOB = Job(
+    job_id="2",
+    status=JobStatus("queued"),
+    parameters=JobParameters.model_validate(
+        {"target": "MY_DATASET", "operation": "ADD"}
+    ),
+    created_at="2022-05-18T11:40:22.519222",
+    created_by=UserInfo(
+        user_id="123-123-123", first_name="Data", last_name="Admin"
+    ),
+)
+
+
+def test_sweep(mocker):
+    mock_db_client = Mock()
+    mock_db_client.requeue_expired_jobs.return_value = [RELEASED_JOB]
+    mocker.patch.object(db, "get_database_client", return_value=mock_db_client)
+    broker = JobEventBroker()
+
+    released_jobs = LeaseSweeper(30, 3, broker).sweep()
+
+    assert released_jobs == [RELEASED_JOB]
+    mock_db_client.requeue_expired_jobs.assert_called_once_with(3)
+    mock_db_client.update_target.assert_called_once_with(RELEASED_JOB)
+    assert [event.event_type for event in broker.events_after(0)] == [
+        "status",
+        "target",
+    ]
+
+
+def test_start_and_stop():
+    sweeper = LeaseSweeper(30, 3, JobEventBroker())
+    sweeper.start()
+    sweeper.stop()
+    assert sweeper._thread is None
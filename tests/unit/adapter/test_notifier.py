@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+from job_service.adapter.notifier import ChangeNotifier
+
+
+def test_wait_times_out():
+    notifier = ChangeNotifier()
+    assert asyncio.run(notifier.wait(0.01)) is False
+    assert notifier.waiting == 0
+
+
+def test_notify_from_other_thread():
+    notifier = ChangeNotifier()
+
+    async def wait_and_notify():
+        waiter = asyncio.create_task(notifier.wait(5))
+        while notifier.waiting == 0:
+            await asyncio.sleep(0)
+        threading.Thread(target=notifier.notify_all).start()
+        return await waiter
+
+    assert asyncio.run(wait_and_notify()) is True
+    assert notifier.version == 1
+
+
+def test_wait_returns_if_version_moved():
+    notifier = ChangeNotifier()
+    version = notifier.version
+    notifier.notify_all()
+    assert asyncio.run(notifier.wait(5, version)) is True
@@ -0,0 +1,102 @@
+import json
+import time
+
+import pytest
+
+from job_service.adapter import signing_keys
+from job_service.adapter.signing_keys import SigningKeyStore
+from job_service.exceptions import AuthError
+from tests.util import generate_rsa_key_pairs, public_jwk, serve_jwks
+
+_, PUBLIC_KEY = generate_rsa_key_pairs()
+_, ROTATED_PUBLIC_KEY = generate_rsa_key_pairs()
+
+
+def _write_jwks(path, *jwks):
+    path.write_text(json.dumps({"keys": list(jwks)}))
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_keys_from_file(tmp_path):
+    jwks_file = tmp_path / "jwks.json"
+    _write_jwks(jwks_file, public_jwk(PUBLIC_KEY, "key-1"))
+    store = SigningKeyStore("http://unused", jwks_file)
+    assert store.get_signing_key("key-1").key_id == "key-1"
+    assert store.get_signing_key(None).key_id == "key-1"
+    assert store.stats() == (2, 1, 1)
+    assert store.stats().cache_hits == 1
+
+
+def test_key_rotation(tmp_path):
+    jwks_file = tmp_path / "jwks.json"
+    _write_jwks(jwks_file, public_jwk(PUBLIC_KEY, "key-1"))
+    store = SigningKeyStore("http://unused", jwks_file)
+    store.get_signing_key("key-1")
+
+    _write_jwks(jwks_file, public_jwk(ROTATED_PUBLIC_KEY, "key-2"))
+    assert store.get_signing_key("key-2").key_id == "key-2"
+    assert store.stats().fetches == 2
+    # Removed keys are no longer accepted
+    with pytest.raises(AuthError) as e:
+        store.get_signing_key("key-1")
+    assert "Unknown signing key key-1" in str(e)
+
+
+def test_unknown_kid_refresh_cooldown():
+    with serve_jwks({"keys": [public_jwk(PUBLIC_KEY, "key-1")]}) as (
+        jwks_url,
+        jwks_requests,
+    ):
+        store = SigningKeyStore(jwks_url)
+        store.get_signing_key("key-1")
+        for _ in range(3):
+            with pytest.raises(AuthError):
+                store.get_signing_key("made-up")
+    # One initial fetch, and one refresh until the cooldown has passed
+    assert len(jwks_requests) == 2
+
+
+def test_stale_keys_are_used_while_refreshing(mocker):
+    mocker.patch.object(signing_keys, "REFRESH_COOLDOWN_SECONDS", 0)
+    with serve_jwks({"keys": [public_jwk(PUBLIC_KEY, "key-1")]}) as (
+        jwks_url,
+        jwks_requests,
+    ):
+        store = SigningKeyStore(jwks_url, refresh_interval_seconds=0)
+        store.get_signing_key("key-1")
+        _wait_for(lambda: len(jwks_requests) >= 2)
+    # JWKS_URL is no longer available, the stale key is still used
+    assert store.get_signing_key("key-1").key_id == "key-1"
+
+
+def test_first_load_failure_is_raised(tmp_path):
+    store = SigningKeyStore("http://unused", tmp_path / "missing.json")
+    with pytest.raises(FileNotFoundError):
+        store.get_signing_key("key-1")
+
+
+def test_background_refresh(tmp_path):
+    jwks_file = tmp_path / "jwks.json"
+    _write_jwks(jwks_file, public_jwk(PUBLIC_KEY, "key-1"))
+    store = SigningKeyStore(
+        "http://unused", jwks_file, refresh_interval_seconds=0.01
+    )
+    store.start()
+    try:
+        _wait_for(lambda: store.stats().fetches >= 1)
+        _write_jwks(jwks_file, public_jwk(ROTATED_PUBLIC_KEY, "key-2"))
+        _wait_for(lambda: store._find("key-2") is not None)
+    finally:
+        store.stop()
+    assert store.get_signing_key("key-2").key_id == "key-2"
+    stats = store.stats()
+    assert stats.requests == 1
+    # Loads by the refresh thread are not cache misses
+    assert stats.request_fetches == 0
+    assert stats.cache_hits == 1
@@ -1,8 +1,20 @@
 from job_service.app import app
+from job_service.api import importable_datasets
+from job_service.config.compression import _preferred_encoding
+from job_service.adapter.local_storage.input_directory import (
+    ImportableDataset,
+)
 from fastapi.testclient import TestClient
 
 client = TestClient(app)
 
+LARGE_DATASET_LIST = [
+    ImportableDataset(
+        dataset_name=f"DATASET_{i}", has_data=True, has_metadata=True
+    )
+    for i in range(100)
+]
+
 
 def test_client_sends_x_request_id():
     response = client.get("/health/alive", headers={"X-Request-ID": "abc123"})
@@ -16,3 +28,45 @@ def test_client_does_not_send_x_request_id():
     # Check that header is set (non-empty)
     assert "X-Request-ID" in response.headers
     assert response.headers["X-Request-ID"] != ""
+
+
+def test_large_response_is_compressed(mocker):
+    mocker.patch.object(
+        importable_datasets.input_directory,
+        "get_importable_datasets",
+        return_value=LARGE_DATASET_LIST,
+    )
+    response = client.get(
+        "/importable-datasets", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()) == len(LARGE_DATASET_LIST)
+
+    response = client.get(
+        "/importable-datasets",
+        headers={"Accept-Encoding": "gzip;q=0.5, deflate"},
+    )
+    assert response.headers["Content-Encoding"] == "deflate"
+    assert len(response.json()) == len(LARGE_DATASET_LIST)
+
+    response = client.get(
+        "/importable-datasets", headers={"Accept-Encoding": "identity"}
+    )
+    assert "Content-Encoding" not in response.headers
+
+
+def test_health_response_is_not_compressed():
+    response = client.get(
+        "/health/alive", headers={"Accept-Encoding": "gzip, deflate"}
+    )
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+
+def test_preferred_encoding():
+    assert _preferred_encoding("gzip, deflate") == "gzip"
+    assert _preferred_encoding("deflate") == "deflate"
+    assert _preferred_encoding("*") == "gzip"
+    assert _preferred_encoding("gzip;q=0, deflate;q=0") is None
+    assert _preferred_encoding("") is None
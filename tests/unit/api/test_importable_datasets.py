@@ -1,13 +1,32 @@
+import hashlib
+import io
 import os
 import shutil
+import tarfile
+import time
 
 from fastapi.testclient import TestClient
 
+from job_service.adapter.local_storage import input_directory
+from job_service.adapter.local_storage.dataset_watcher import (
+    DatasetWatcher,
+    get_dataset_watcher,
+)
+from job_service.adapter.local_storage.input_directory import ImportableDataset
 from job_service.app import app
 
 client = TestClient(app)
 
 
+def _without_checksums(datasets: list[dict]) -> list[dict]:
+    # Checksums are computed in the background, and are only included
+    # once they are done
+    return [
+        {key: value for key, value in dataset.items() if key != "sha256"}
+        for dataset in datasets
+    ]
+
+
 def teardown_module():
     os.remove("tests/resources/input_directory/DATASET_WITH_INVAL&D_NAM+E.tar")
 
@@ -22,28 +41,33 @@ def test_get_files():
             "hasData": True,
             "hasMetadata": True,
             "isArchived": False,
+            "size": 10240,
         },
         {
             "datasetName": "YOUR_DATASET",
             "hasData": False,
             "hasMetadata": True,
             "isArchived": False,
+            "size": 1536,
+            "memberCount": 1,
         },
         {
             "datasetName": "OTHER_DATASET",
             "hasData": True,
             "hasMetadata": True,
             "isArchived": False,
+            "size": 10240,
         },
         {
             "datasetName": "YET_ANOTHER_DATASET",
             "hasData": True,
             "hasMetadata": True,
             "isArchived": True,
+            "size": 10240,
         },
     ]
     for dataset in expected_datasets:
-        assert dataset in response.json()
+        assert dataset in _without_checksums(response.json())
 
 
 def test_get_invalid_name_files():
@@ -60,28 +84,33 @@ def test_get_invalid_name_files():
             "hasData": True,
             "hasMetadata": True,
             "isArchived": False,
+            "size": 10240,
         },
         {
             "datasetName": "YOUR_DATASET",
             "hasData": False,
             "hasMetadata": True,
             "isArchived": False,
+            "size": 1536,
+            "memberCount": 1,
         },
         {
             "datasetName": "OTHER_DATASET",
             "hasData": True,
             "hasMetadata": True,
             "isArchived": False,
+            "size": 10240,
         },
         {
             "datasetName": "YET_ANOTHER_DATASET",
             "hasData": True,
             "hasMetadata": True,
             "isArchived": True,
+            "size": 10240,
         },
     ]
     for dataset in expected_datasets:
-        assert dataset in response.json()
+        assert dataset in _without_checksums(response.json())
 
 
 def test_delete_importable_datasets_api():
@@ -108,3 +137,178 @@ def test_delete_nonexisting_dataset():
 def test_delete_invalid_name_dataset():
     response = client.delete("/importable-datasets/INVALID_NAME_DATASET++")
     assert response.status_code == 400
+
+
+def test_get_files_from_watcher(mocker):
+    watcher = DatasetWatcher()
+    mocker.patch.object(
+        DatasetWatcher,
+        "datasets",
+        new_callable=mocker.PropertyMock,
+        return_value=[
+            ImportableDataset(
+                dataset_name="WATCHED_DATASET",
+                has_data=True,
+                has_metadata=True,
+            )
+        ],
+    )
+    scan_spy = mocker.spy(input_directory, "get_importable_datasets")
+    app.dependency_overrides[get_dataset_watcher] = lambda: watcher
+    try:
+        response = client.get("/importable-datasets")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "datasetName": "WATCHED_DATASET",
+            "hasData": True,
+            "hasMetadata": True,
+            "isArchived": False,
+        }
+    ]
+    assert scan_spy.call_count == 0
+
+
+def _dataset_names(response) -> list[str]:
+    return [dataset["datasetName"] for dataset in response.json()]
+
+
+def test_get_files_filtered():
+    response = client.get(
+        "/importable-datasets", params={"includeArchived": "false"}
+    )
+    assert response.status_code == 200
+    assert _dataset_names(response) == [
+        "MY_DATASET",
+        "OTHER_DATASET",
+        "YOUR_DATASET",
+    ]
+
+    response = client.get("/importable-datasets", params={"prefix": "Y"})
+    assert _dataset_names(response) == ["YOUR_DATASET", "YET_ANOTHER_DATASET"]
+
+    response = client.get("/importable-datasets", params={"hasData": "false"})
+    assert _dataset_names(response) == ["YOUR_DATASET"]
+
+
+def test_get_files_paginated():
+    response = client.get("/importable-datasets", params={"limit": 3})
+    assert response.status_code == 200
+    assert _dataset_names(response) == [
+        "MY_DATASET",
+        "OTHER_DATASET",
+        "YOUR_DATASET",
+    ]
+    assert response.headers["X-Next-Cursor"] == "YOUR_DATASET"
+
+    response = client.get(
+        "/importable-datasets",
+        params={"limit": 3, "cursor": response.headers["X-Next-Cursor"]},
+    )
+    assert _dataset_names(response) == ["YET_ANOTHER_DATASET"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get(
+        "/importable-datasets",
+        params={"cursor": "archive/YET_ANOTHER_DATASET"},
+    )
+    assert response.json() == []
+    assert client.get("/importable-datasets?limit=0").status_code == 400
+
+
+def test_get_files_skips_archive_scan(mocker):
+    list_spy = mocker.spy(input_directory, "_list_tar_files")
+    client.get("/importable-datasets", params={"includeArchived": "false"})
+    assert [call.args[0] for call in list_spy.call_args_list] == [
+        input_directory.INPUT_DIR
+    ]
+
+
+def test_bulk_importable_datasets(tmp_path, monkeypatch):
+    monkeypatch.setattr(input_directory, "INPUT_DIR", tmp_path)
+    monkeypatch.setattr(input_directory, "ARCHIVE_DIR", tmp_path / "archive")
+    shutil.copyfile(
+        "tests/resources/input_directory/MY_DATASET.tar",
+        tmp_path / "MY_DATASET.tar",
+    )
+    response = client.post(
+        "/importable-datasets/bulk",
+        json={
+            "action": "ARCHIVE",
+            "datasetNames": ["MY_DATASET", "NONEXISTING_DATASET"],
+        },
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {"datasetName": "MY_DATASET", "status": "ARCHIVED"},
+        {
+            "datasetName": "NONEXISTING_DATASET",
+            "status": "NOT_FOUND",
+            "message": "File NONEXISTING_DATASET not found",
+        },
+    ]
+    assert (tmp_path / "archive" / "MY_DATASET.tar").exists()
+
+    response = client.post(
+        "/importable-datasets/bulk",
+        json={"action": "COPY", "datasetNames": ["MY_DATASET"]},
+    )
+    assert response.status_code == 400
+    response = client.post(
+        "/importable-datasets/bulk",
+        json={"action": "DELETE", "datasetNames": []},
+    )
+    assert response.status_code == 400
+
+
+def test_get_checksum():
+    with open("tests/resources/input_directory/MY_DATASET.tar", "rb") as f:
+        expected_sha256 = hashlib.sha256(f.read()).hexdigest()
+    deadline = time.monotonic() + 5
+    while True:
+        response = client.get("/importable-datasets/MY_DATASET/checksum")
+        assert response.status_code == 200
+        if response.json()["status"] != "PENDING":
+            break
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert response.json()["status"] == "COMPLETE"
+    assert response.json()["sha256"] == expected_sha256
+    assert response.json()["size"] == 10240
+
+    response = client.get("/importable-datasets", params={"prefix": "MY_"})
+    assert response.json()[0]["sha256"] == expected_sha256
+
+    response = client.get("/importable-datasets/YET_ANOTHER_DATASET/checksum")
+    assert response.status_code == 200
+    assert (
+        client.get(
+            "/importable-datasets/NONEXISTING_DATASET/checksum"
+        ).status_code
+        == 404
+    )
+    assert (
+        client.get("/importable-datasets/INVALID+NAME/checksum").status_code
+        == 400
+    )
+
+
+def test_get_metadata(tmp_path, monkeypatch):
+    monkeypatch.setattr(input_directory, "INPUT_DIR", tmp_path)
+    monkeypatch.setattr(input_directory, "ARCHIVE_DIR", tmp_path / "archive")
+    metadata = b'{"shortName": "MY_DATASET"}'
+    with tarfile.open(tmp_path / "MY_DATASET.tar", "w") as tar:
+        info = tarfile.TarInfo("MY_DATASET.json")
+        info.size = len(metadata)
+        tar.addfile(info, io.BytesIO(metadata))
+
+    response = client.get("/importable-datasets/MY_DATASET/metadata")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/json"
+    assert response.json() == {"shortName": "MY_DATASET"}
+    assert (
+        client.get("/importable-datasets/MISSING_DATASET/metadata").status_code
+        == 404
+    )
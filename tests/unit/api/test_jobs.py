@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from unittest.mock import Mock
@@ -5,12 +7,15 @@ from unittest.mock import Mock
 from fastapi.testclient import TestClient
 
 from job_service.app import app
+from job_service.api import jobs
 from job_service.adapter import db, auth
+from job_service.adapter.job_events import JobEventBroker, get_job_event_broker
 from job_service.config import environment
-from job_service.exceptions import NotFoundException
+from job_service.exceptions import JobLeaseException, NotFoundException
 from job_service.adapter.db.models import (
     Job,
     JobStatus,
+    Operation,
     UserInfo,
     JobParameters,
 )
@@ -77,6 +82,11 @@ BUMP_JOB_REQUEST = {
     ]
 }
 UPDATE_JOB_REQUEST = {"status": "initiated", "log": "extra logging"}
+CLAIM_JOB_REQUEST = {
+    "workerId": "worker-1",
+    "operations": ["ADD", "CHANGE"],
+    "leaseSeconds": 120,
+}
 
 
 @pytest.fixture
@@ -87,6 +97,8 @@ def mock_db_client():
     mock.get_jobs.return_value = JOB_LIST
     mock.new_job.return_value = JOB_LIST[0]
     mock.update_job.return_value = JOB_LIST[0]
+    mock.claim_job.return_value = JOB_LIST[0]
+    mock.heartbeat_job.return_value = JOB_LIST[0]
     return mock
 
 
@@ -98,9 +110,15 @@ def mock_auth_client():
 
 
 @pytest.fixture
-def client(mock_db_client, mock_auth_client):
+def broker():
+    return JobEventBroker()
+
+
+@pytest.fixture
+def client(mock_db_client, mock_auth_client, broker):
     app.dependency_overrides[db.get_database_client] = lambda: mock_db_client
     app.dependency_overrides[auth.get_auth_client] = lambda: mock_auth_client
+    app.dependency_overrides[get_job_event_broker] = lambda: broker
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -156,11 +174,77 @@ def test_update_job(client, mock_db_client):
         JobStatus(UPDATE_JOB_REQUEST["status"]),
         None,
         UPDATE_JOB_REQUEST["log"],
+        None,
     )
     assert response.status_code == 200
     assert response.json() == {"message": f"Updated job with jobId {JOB_ID}"}
 
 
+def test_claim_job(client, mock_db_client, broker):
+    response = client.post("/jobs/claim", json=CLAIM_JOB_REQUEST)
+    mock_db_client.claim_job.assert_called_once_with(
+        "worker-1", [Operation.ADD, Operation.CHANGE], 120
+    )
+    mock_db_client.update_target.assert_called_once()
+    assert response.status_code == 200
+    assert response.json() == JOB_LIST[0].model_dump(
+        exclude_none=True, by_alias=True
+    )
+    assert [event.event_type for event in broker.events_after(0)] == [
+        "status",
+        "target",
+    ]
+
+
+def test_claim_job_nothing_queued(client, mock_db_client):
+    mock_db_client.claim_job.return_value = None
+    response = client.post("/jobs/claim", json={"workerId": "worker-1"})
+    mock_db_client.claim_job.assert_called_once_with("worker-1", None, 300)
+    mock_db_client.update_target.assert_not_called()
+    assert response.status_code == 204
+
+
+def test_claim_job_bad_request(client, mock_db_client):
+    response = client.post(
+        "/jobs/claim", json={"workerId": "worker-1", "leaseSeconds": 0}
+    )
+    mock_db_client.claim_job.assert_not_called()
+    assert response.status_code == 400
+
+
+def test_heartbeat_job(client, mock_db_client):
+    response = client.put(
+        f"/jobs/{JOB_ID}/heartbeat",
+        json={"workerId": "worker-1", "leaseSeconds": 60},
+    )
+    mock_db_client.heartbeat_job.assert_called_once_with(
+        JOB_ID, "worker-1", 60
+    )
+    assert response.status_code == 200
+
+
+def test_heartbeat_job_lease_lost(client, mock_db_client):
+    mock_db_client.heartbeat_job.side_effect = JobLeaseException("lease lost")
+    response = client.put(
+        f"/jobs/{JOB_ID}/heartbeat", json={"workerId": "worker-1"}
+    )
+    assert response.status_code == 409
+    assert response.json() == {"message": "lease lost"}
+
+
+def test_update_job_lease_lost(client, mock_db_client):
+    mock_db_client.update_job.side_effect = JobLeaseException("lease lost")
+    response = client.put(
+        f"/jobs/{JOB_ID}",
+        json={"status": "decrypting", "workerId": "worker-1"},
+    )
+    mock_db_client.update_job.assert_called_once_with(
+        JOB_ID, JobStatus("decrypting"), None, None, "worker-1"
+    )
+    mock_db_client.update_target.assert_not_called()
+    assert response.status_code == 409
+
+
 def test_update_job_bad_request(client, mock_db_client):
     response = client.put(
         f"/jobs/{JOB_ID}",
@@ -181,3 +265,94 @@ def test_update_job_disabled_bump(client):
             "status": "FAILED",
         },
     ]
+
+
+class DisconnectingRequest:
+    def __init__(self, polls: int):
+        self.polls = polls
+
+    async def is_disconnected(self) -> bool:
+        self.polls -= 1
+        return self.polls < 0
+
+
+def _collect_events(broker, last_event_id, job_id=None, reset=False):
+    async def collect():
+        request = DisconnectingRequest(polls=1)
+        return [
+            message
+            async for message in jobs._stream_job_events(
+                request, broker, last_event_id, job_id, reset
+            )
+        ]
+
+    return asyncio.run(collect())
+
+
+def test_new_job_publishes_events(client, broker):
+    client.post("/jobs", json=NEW_JOB_REQUEST)
+    events = broker.events_after(0)
+    assert [event.event_type for event in events] == [
+        "created",
+        "target",
+        "created",
+        "target",
+    ]
+    assert events[0].data["jobId"] == JOB_ID
+
+
+def test_update_job_publishes_events(client, broker):
+    client.put(f"/jobs/{JOB_ID}", json=UPDATE_JOB_REQUEST)
+    events = broker.events_after(0)
+    assert [event.event_type for event in events] == [
+        "status",
+        "log",
+        "target",
+    ]
+    assert events[1].data == {"jobId": JOB_ID, "message": "extra logging"}
+
+
+def test_stream_job_events_resumes_after_last_event_id(broker):
+    broker.publish("status", "1", {"jobId": "1", "status": "initiated"})
+    broker.publish("status", "2", {"jobId": "2", "status": "initiated"})
+    broker.publish("log", "2", {"jobId": "2", "message": "hello"})
+
+    epoch = broker.epoch
+    assert _collect_events(broker, 1) == [
+        f'id: {epoch}-2\nevent: status\ndata: {{"jobId": "2", "status": "initiated"}}\n\n',
+        f'id: {epoch}-3\nevent: log\ndata: {{"jobId": "2", "message": "hello"}}\n\n',
+    ]
+    assert _collect_events(broker, 0, job_id="1") == [
+        f'id: {epoch}-1\nevent: status\ndata: {{"jobId": "1", "status": "initiated"}}\n\n',
+    ]
+
+
+def test_stream_job_events_starts_with_reset(broker):
+    broker.publish("status", "1", {"jobId": "1", "status": "initiated"})
+
+    assert _collect_events(broker, 1, reset=True)[0] == (
+        f"id: {broker.epoch}-1\nevent: reset\ndata: {{}}\n\n"
+    )
+
+
+def test_resume_after_last_event_id():
+    broker = JobEventBroker(history_size=2)
+    for job_id in ["1", "2", "3"]:
+        broker.publish(
+            "status", job_id, {"jobId": job_id, "status": "initiated"}
+        )
+
+    assert broker.resume_after(f"{broker.epoch}-3") == 3
+    assert broker.resume_after(f"{broker.epoch}-1") == 1
+    # The event after id 0 is no longer buffered
+    assert broker.resume_after(f"{broker.epoch}-0") is None
+    # Ids from a previous process, or ahead of this one
+    assert broker.resume_after("00000000-2") is None
+    assert broker.resume_after(f"{broker.epoch}-4") is None
+    assert broker.resume_after("3") is None
+
+
+def test_get_events_for_missing_job(client, mock_db_client):
+    mock_db_client.get_job.side_effect = NotFoundException(NOT_FOUND_MESSAGE)
+    response = client.get(f"/jobs/{JOB_ID}/events")
+    assert response.status_code == 404
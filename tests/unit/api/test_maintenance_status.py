@@ -1,7 +1,9 @@
 import pytest
+from datetime import datetime
 from unittest.mock import Mock
 
 from job_service.adapter import db
+from job_service.config import environment
 from fastapi.testclient import TestClient
 
 from job_service.app import app
@@ -101,3 +103,62 @@ def test_get_maintenance_history(client, mock_db_client):
     mock_db_client.get_maintenance_history.assert_called_once()
     assert response.status_code == 200
     assert response.json() == RESPONSE_FROM_DB
+
+
+def test_get_maintenance_status_changed_after(client, mock_db_client):
+    response = client.get(
+        "/maintenance-status?waitForChangeAfter=2023-08-30T00:00:00"
+    )
+    mock_db_client.get_latest_maintenance_status.assert_called_once()
+    assert response.status_code == 200
+    assert response.json() == RESPONSE_FROM_DB[0]
+
+
+def test_get_maintenance_status_wait_times_out(client, mock_db_client):
+    response = client.get(
+        "/maintenance-status"
+        "?waitForChangeAfter=2023-08-31T16:26:27.575276&timeout=0.1"
+    )
+    mock_db_client.get_latest_maintenance_status.assert_called_once()
+    assert response.status_code == 200
+    assert response.json() == RESPONSE_FROM_DB[0]
+
+
+def test_get_maintenance_status_invalid_timeout(client, mock_db_client):
+    response = client.get(
+        "/maintenance-status"
+        "?waitForChangeAfter=2023-08-31T16:26:27.575276&timeout=3600"
+    )
+    mock_db_client.get_latest_maintenance_status.assert_not_called()
+    assert response.status_code == 400
+
+
+def test_get_maintenance_history_with_filters(client, mock_db_client):
+    response = client.get(
+        "/maintenance-history?limit=2&before=2023-08-31T00:00:00"
+    )
+    mock_db_client.get_maintenance_history.assert_called_once_with(
+        limit=2, before=datetime(2023, 8, 31), after=None
+    )
+    assert response.status_code == 200
+
+
+def test_get_maintenance_history_invalid_limit(client, mock_db_client):
+    response = client.get("/maintenance-history?limit=0")
+    mock_db_client.get_maintenance_history.assert_not_called()
+    assert response.status_code == 400
+
+
+def test_set_maintenance_status_compacts_history(client, mock_db_client):
+    environment._ENVIRONMENT_VARIABLES[
+        "MAINTENANCE_HISTORY_RETENTION_DAYS"
+    ] = 30
+    try:
+        client.post(
+            "/maintenance-status", json=MAINTENANCE_STATUS_REQUEST_VALID
+        )
+    finally:
+        environment._ENVIRONMENT_VARIABLES[
+            "MAINTENANCE_HISTORY_RETENTION_DAYS"
+        ] = 0
+    mock_db_client.compact_maintenance_history.assert_called_once()
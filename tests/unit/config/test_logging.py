@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+from job_service.config import logging as logging_config
+from fastapi.testclient import TestClient
+
+from job_service.app import app
+from job_service.config.logging import AccessLogSampler, QueueLogHandler
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self, unblock: threading.Event | None = None):
+        super().__init__()
+        self.records = []
+        self.threads = []
+        self.unblock = unblock
+        self.writing = threading.Event()
+
+    def emit(self, record):
+        self.writing.set()
+        if self.unblock is not None:
+            assert self.unblock.wait(timeout=5)
+        self.records.append(record)
+        self.threads.append(threading.current_thread().name)
+
+
+def _logger(handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger("test_queue_log_handler")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def test_records_are_written_directly_when_not_started():
+    target = RecordingHandler()
+    _logger(QueueLogHandler(target, 10)).info("hello %s", "world")
+    assert [record.getMessage() for record in target.records] == [
+        "hello world"
+    ]
+    assert target.threads == [threading.current_thread().name]
+
+
+def test_records_keep_request_context():
+    target = RecordingHandler()
+    handler = QueueLogHandler(target, 10)
+    handler.start()
+    token = logging_config.url.set("http://testserver/jobs")
+    try:
+        _logger(handler).info("responded")
+    finally:
+        logging_config.url.reset(token)
+    handler.stop()
+    [record] = target.records
+    assert target.threads != [threading.current_thread().name]
+    assert record.request_context["url"] == "http://testserver/jobs"
+
+
+def test_full_queue_drops_records_and_reports_them():
+    unblock = threading.Event()
+    target = RecordingHandler(unblock)
+    handler = QueueLogHandler(target, 2)
+    handler.start()
+    logger = _logger(handler)
+    logger.info("first")
+    # The listener is blocked writing the first record
+    assert target.writing.wait(timeout=5)
+    for message in ["queued", "queued too", "dropped", "also dropped"]:
+        logger.info(message)
+    assert handler.dropped == 2
+    unblock.set()
+    deadline = time.monotonic() + 5
+    while len(target.records) < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    logger.info("after")
+    handler.stop()
+    assert [record.getMessage() for record in target.records] == [
+        "first",
+        "queued",
+        "queued too",
+        "Dropped 2 log records, the log queue was full",
+        "after",
+    ]
+
+
+def test_access_log_sampling(mocker):
+    sampler = AccessLogSampler({"/health/alive": 0, "/jobs": 0.5}, 1000, 60)
+    mocker.patch.object(logging_config.random, "random", return_value=0.7)
+    assert not sampler.should_log("/health/alive", 200, 3)
+    assert not sampler.should_log("/jobs", 200, 3)
+    assert sampler.should_log("/targets", 200, 3)
+    # Errors and slow requests are always logged
+    assert sampler.should_log("/health/alive", 500, 3)
+    assert sampler.should_log("/jobs", 404, 3)
+    assert sampler.should_log("/jobs", 200, 1000)
+    mocker.patch.object(logging_config.random, "random", return_value=0.2)
+    assert sampler.should_log("/jobs", 200, 3)
+
+
+def test_access_log_summaries(mocker):
+    clock = mocker.patch.object(logging_config, "monotonic", return_value=0)
+    sampler = AccessLogSampler({"/health/alive": 0, "/jobs": 0}, 1000, 60)
+    sampler.should_log("/health/alive", 200, 3)
+    sampler.should_log("/health/alive", 200, 3)
+    sampler.should_log("/jobs", 200, 3)
+    clock.return_value = 30
+    assert sampler.take_summaries() == []
+    clock.return_value = 60
+    assert sampler.take_summaries() == [
+        "Suppressed 2 access log lines for /health/alive in the last 60 seconds",
+        "Suppressed 1 access log lines for /jobs in the last 60 seconds",
+    ]
+    clock.return_value = 120
+    assert sampler.take_summaries() == []
+
+
+def test_health_checks_are_not_logged(caplog):
+    client = TestClient(app)
+    with caplog.at_level(logging.INFO):
+        client.get("/health/alive")
+        client.get("/jobs/events/unknown")
+    responded = [
+        record for record in caplog.records if record.message == "responded"
+    ]
+    # Only the failed request is logged
+    assert len(responded) == 1
@@ -37,3 +37,22 @@ def test_invalid_new_jobs_requests():
     for job in INVALID_JOB_REQUESTS["jobs"]:
         with pytest.raises((ValidationError, TypeError)):
             NewJobRequest(**job)
+
+
+def test_new_job_request_priority():
+    add_job = NewJobRequest(
+        operation="ADD", target="MY_DATASET"
+    ).generate_job_from_request(JOB_ID, USER_INFO)
+    set_status_job = NewJobRequest(
+        operation="SET_STATUS",
+        target="MY_DATASET",
+        releaseStatus="PENDING_RELEASE",
+    ).generate_job_from_request(JOB_ID, USER_INFO)
+    assert set_status_job.priority > add_job.priority
+
+    urgent_add_job = NewJobRequest(
+        operation="ADD", target="MY_DATASET", priority=50
+    ).generate_job_from_request(JOB_ID, USER_INFO)
+    assert urgent_add_job.priority == 50
+    with pytest.raises(ValidationError):
+        NewJobRequest(operation="ADD", target="MY_DATASET", priority=101)
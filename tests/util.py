@@ -1,11 +1,17 @@
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import jwt
+from jwt.algorithms import RSAAlgorithm
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 
 
-def generate_rsa_key_pairs():
+def generate_rsa_key_pairs(key_size: int = 2048):
     private_key = rsa.generate_private_key(
-        public_exponent=65537, key_size=2048
+        public_exponent=65537, key_size=key_size
     )
     public_key = private_key.public_key()
 
@@ -22,5 +28,46 @@ def generate_rsa_key_pairs():
     return serialized_private_key, serialized_public_key
 
 
-def encode_jwt_payload(payload, private_key):
-    return jwt.encode(payload, private_key, algorithm="RS256")
+def encode_jwt_payload(payload, private_key, kid=None, algorithm="RS256"):
+    headers = {"kid": kid} if kid is not None else None
+    return jwt.encode(
+        payload, private_key, algorithm=algorithm, headers=headers
+    )
+
+
+def public_jwk(public_key: bytes, kid: str, algorithm: str = "RS256") -> dict:
+    jwk = json.loads(
+        RSAAlgorithm.to_jwk(serialization.load_pem_public_key(public_key))
+    )
+    return {**jwk, "kid": kid, "alg": algorithm, "use": "sig"}
+
+
+@contextmanager
+def serve_jwks(jwks: dict):
+    """
+    Serves jwks on localhost, yields the url and a list that counts
+    the requests made.
+    """
+    requests = []
+
+    class JwksHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            body = json.dumps(jwks).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JwksHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/jwks", requests
+    finally:
+        server.shutdown()
+        server.server_close()